@@ -0,0 +1,124 @@
+import logging
+import time
+from typing import Iterable, List
+
+from app.models import StreamSession
+
+log = logging.getLogger("activity")
+
+
+class ActivityModel:
+    """
+    The last ``get_activity`` result of each Tautulli server, kept as
+    sessions by ``session_key``, so the streams board can be re-rendered
+    between fetches with each playing session's offset, progress and ETA
+    moved on by the time elapsed since that server's fetch.
+
+    A server's fetch is due when its last one is older than the refresh
+    interval, when ``invalidate`` was called (a Tautulli webhook reported a
+    session starting, stopping, pausing or resuming), when one of its
+    playing sessions is predicted to have reached its end, or when its last
+    answer was stale. Stale sessions (a down server's cached ones) are
+    shown as they are; the other servers keep being extrapolated.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        # server -> session_key -> session
+        self._sessions: dict[str, dict[str, StreamSession]] = {}
+        self._fetched_at: dict[str, float] = {}
+        self._due: set[str] = set()
+        self._stale: set[str] = set()
+        self.full_fetches = 0
+        self.renders = 0
+        self.changes = 0
+
+    def invalidate(self) -> None:
+        """Fetch every server in full on the next render."""
+        self._due.update(self._fetched_at)
+
+    def reset(self) -> None:
+        """Forget all servers (the Tautulli configuration changed)."""
+        self._sessions.clear()
+        self._fetched_at.clear()
+        self._due.clear()
+        self._stale.clear()
+
+    def due(self, servers: Iterable[str], refresh_seconds: float) -> List[str]:
+        """Which of ``servers`` need a full fetch."""
+        now = self._clock()
+        return [name for name in servers if self._server_due(name, now, refresh_seconds)]
+
+    def _server_due(self, name: str, now: float, refresh_seconds: float) -> bool:
+        if name in self._due or name in self._stale or name not in self._fetched_at:
+            return True
+        elapsed = now - self._fetched_at[name]
+        if elapsed >= refresh_seconds:
+            return True
+        # a session that has played to its end has most likely stopped
+        return any(
+            s.state == "playing" and s.duration_ms > 0
+            and s.view_offset_ms + elapsed * 1000 >= s.duration_ms
+            for s in self._sessions[name].values()
+        )
+
+    def update(self, server: str, sessions: List[StreamSession]) -> None:
+        """Replace ``server``'s sessions with a full fetch's."""
+        fresh = self._keyed(sessions)
+        old = self._sessions.get(server, {})
+        if fresh.keys() != old.keys() or any(old[k].state != s.state for k, s in fresh.items()):
+            self.changes += 1
+            log.debug("Activity on %s changed: %d -> %d sessions", server or "primary", len(old), len(fresh))
+        self._store(server, fresh)
+        self._stale.discard(server)
+        self.full_fetches += 1
+
+    def freeze(self, server: str, sessions: List[StreamSession]) -> None:
+        """Sessions a down server's client served from its cache: shown as is, refetched next render."""
+        self._store(server, self._keyed(sessions))
+        self._stale.add(server)
+
+    def forget(self, server: str) -> None:
+        """``server`` is down with nothing cached."""
+        self._sessions.pop(server, None)
+        self._fetched_at.pop(server, None)
+        self._due.discard(server)
+        self._stale.discard(server)
+
+    def known(self) -> bool:
+        """Whether any server has answered, even if only with stale data."""
+        return bool(self._sessions)
+
+    def _store(self, server: str, sessions: dict) -> None:
+        self._sessions[server] = sessions
+        self._fetched_at[server] = self._clock()
+        self._due.discard(server)
+
+    @staticmethod
+    def _keyed(sessions: List[StreamSession]) -> dict:
+        return {s.session_key or f"#{i}": s for i, s in enumerate(sessions)}
+
+    def sessions(self) -> List[StreamSession]:
+        """The sessions as of now, extrapolated from each server's last full fetch."""
+        now = self._clock()
+        self.renders += 1
+        out = []
+        for server, sessions in self._sessions.items():
+            if server in self._stale:
+                out.extend(sessions.values())
+            else:
+                elapsed = now - self._fetched_at[server]
+                out.extend(s.advanced(elapsed) for s in sessions.values())
+        return out
+
+    def report(self) -> dict:
+        now = self._clock()
+        ages = [now - t for name, t in self._fetched_at.items() if name not in self._stale]
+        return {
+            "sessions": sum(len(s) for s in self._sessions.values()),
+            "age": round(max(ages), 1) if ages else None,
+            "stale_servers": sorted(name or "primary" for name in self._stale),
+            "full_fetches": self.full_fetches,
+            "renders": self.renders,
+            "changes": self.changes,
+        }
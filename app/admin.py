@@ -1,15 +1,24 @@
 import asyncio
+import base64
+import hmac
+import inspect
 import logging
+from typing import Any, Optional, Protocol
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, FileResponse, Response, StreamingResponse
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.store import load_config, save_config, load_admin, save_admin, verify_password
-from app.config import Settings
-from app.bot import BotManager
+from app.config import Settings, TautulliServer
+from app.snapshots import SnapshotCache
 
 log = logging.getLogger("admin")
 
+SSE_HEARTBEAT_SECONDS = 15
+# URL name -> snapshot board
+SNAPSHOT_BOARDS = {"streams": "streams", "downloads": "downloads", "stats": "stats", "plex-counts": "plex_counts"}
+_EVENT_NAMES = {board: name for name, board in SNAPSHOT_BOARDS.items()}
+
 
 def html_base(body: str, title="Discord Media Bot — Admin") -> HTMLResponse:
     return HTMLResponse(f"""<!doctype html>
@@ -260,7 +269,35 @@ async function restartBot() {{
 </body></html>""")
 
 
-def build_app(bot: BotManager) -> FastAPI:
+class BotApi(Protocol):
+    """
+    What the admin app needs from the bot: ``app.bot.BotManager`` in
+    process, or ``app.ipc.BotProxy`` in an admin-only process, which must
+    not import discord.py and the board stack.
+    """
+
+    status: str
+    last_error: Optional[str]
+    cfg: Optional[Settings]
+    timings: Any
+    snapshots: SnapshotCache
+
+    def metrics(self) -> Any: ...
+    def memory_report(self) -> Any: ...
+    def trends_report(self, resolution: str = "1h", points: int = 24) -> Any: ...
+    async def thumbnail(self, key: str) -> Optional[tuple[str, str]]: ...
+    async def arr_event(self, service: str, payload: dict) -> str: ...
+    async def activity_changed(self) -> str: ...
+    async def reload(self, cfg: Settings) -> None: ...
+    async def restart(self, cfg: Settings) -> None: ...
+
+
+async def _resolve(value):
+    """BotManager answers in-process; a BotProxy (two-process mode) answers over IPC with an awaitable."""
+    return await value if inspect.isawaitable(value) else value
+
+
+def build_app(bot: BotApi) -> FastAPI:
     admin = load_admin()
     secret_key = (admin or {}).get("secret_key", "dev-secret-change-me")
     app = FastAPI()
@@ -272,6 +309,14 @@ def build_app(bot: BotManager) -> FastAPI:
             return '<span class="badge badge-green">RUNNING</span>'
         return f'<span class="badge badge-red">{("ERROR" if st=="error" else "STOPPED")}</span>'
 
+    def startup_summary() -> str:
+        phases = bot.timings.report()["phases"]
+        parts = [
+            f"{name.replace('_', ' ')} {p['duration']:.2f}s"
+            for name, p in phases.items() if p["duration"] is not None
+        ]
+        return " · ".join(parts) or "pending"
+
     # ---------- Setup ----------
     @app.get("/setup", response_class=HTMLResponse)
     def setup_page():
@@ -343,8 +388,25 @@ def build_app(bot: BotManager) -> FastAPI:
             return RedirectResponse("/login", status_code=303)
 
         cfg = load_config()
+        # the configured extra servers plus a blank row for adding one
+        extra_servers = "".join(f"""
+    <div class="row">
+      <div>
+        <label>Name</label>
+        <input name="tautulli_servers.{i}.name" value="{s.name}" placeholder="4K"/>
+      </div>
+      <div>
+        <label>Base URL</label>
+        <input name="tautulli_servers.{i}.url" value="{s.url}" placeholder="http://tautulli-4k:8181"/>
+      </div>
+      <div>
+        <label>API Key</label>
+        <input name="tautulli_servers.{i}.api_key" type="password" value="{s.api_key}"/>
+      </div>
+    </div>""" for i, s in enumerate([*cfg.tautulli_servers, TautulliServer()]))
         return html_base(f"""
 <h1>Discord Media Bot — Admin <span class="right">{status_badge()}</span></h1>
+<p class="muted">Startup: {startup_summary()}</p>
 <form method="post" action="/save">
   <fieldset>
     <legend>General</legend>
@@ -360,6 +422,16 @@ def build_app(bot: BotManager) -> FastAPI:
         <input name="general.message_id_file" value="{cfg.general.message_id_file or ''}"/>
       </div>
     </div>
+    <div class="row">
+      <div>
+        <label>State Database</label>
+        <input name="general.state_db" value="{cfg.general.state_db or ''}"/>
+      </div>
+      <div>
+        <label>Public URL (for poster thumbnails)</label>
+        <input name="general.public_url" value="{cfg.general.public_url or ''}" placeholder="https://mediabot.example.com"/>
+      </div>
+    </div>
     <div class="row">
       <div>
         <label>CA Cert Path</label>
@@ -372,6 +444,48 @@ def build_app(bot: BotManager) -> FastAPI:
         </div>
       </div>
     </div>
+    <div class="row">
+      <div>
+        <label>Slash Command Snapshot Max Age (s)</label>
+        <input name="general.snapshot_max_age" type="number" min="10" max="3600" value="{cfg.general.snapshot_max_age}"/>
+      </div>
+      <div>
+        <label>Discord Transport</label>
+        <select name="general.transport">
+          <option value="gateway" {'selected' if cfg.general.transport == 'gateway' else ''}>Gateway (slash commands)</option>
+          <option value="webhook" {'selected' if cfg.general.transport == 'webhook' else ''}>Webhooks only (no gateway)</option>
+        </select>
+      </div>
+      <div>
+        <label>Discord Client Profile</label>
+        <select name="general.discord_profile">
+          <option value="lean" {'selected' if cfg.general.discord_profile == 'lean' else ''}>Lean (guilds only)</option>
+          <option value="default" {'selected' if cfg.general.discord_profile == 'default' else ''}>Default intents</option>
+        </select>
+      </div>
+    </div>
+    <div class="row">
+      <div>
+        <label>API Token (read-only snapshot API)</label>
+        <input name="general.api_token" type="password" value="{cfg.general.api_token or ''}" placeholder="Leave empty for admin session only"/>
+      </div>
+      <div>
+        <label>Webhook Token (Radarr / Sonarr / Tautulli)</label>
+        <input name="general.webhook_token" type="password" value="{cfg.general.webhook_token or ''}" placeholder="Leave empty to disable /webhooks/..."/>
+      </div>
+    </div>
+    <div class="row">
+      <div>
+        <label>Memory Budget (MB)</label>
+        <input name="general.memory_budget_mb" type="number" min="1" value="{cfg.general.memory_budget_mb or ''}" placeholder="No limit"/>
+      </div>
+      <div>
+        <label> Trace allocations (tracemalloc) </label>
+        <div class="checkbox-block">
+          <input name="general.trace_memory" type="checkbox" {'checked' if cfg.general.trace_memory else ''}>
+        </div>
+      </div>
+    </div>
   </fieldset>
 
   <fieldset>
@@ -387,7 +501,12 @@ def build_app(bot: BotManager) -> FastAPI:
         <input name="tautulli_api_key" type="password" value="{cfg.tautulli_api_key or ''}"
                {'required' if cfg.streams.channel_id else ''}/>
       </div>
+      <div>
+        <label>Name (shown when several servers are set)</label>
+        <input name="tautulli_name" value="{cfg.tautulli_name}" placeholder="Primary"/>
+      </div>
     </div>
+    <p class="muted">More Tautulli servers: their streams, play history and library counts are merged into the same boards. The name labels each server's streams and keys its play history, so keep it stable.</p>{extra_servers}
   </fieldset>
 
   <fieldset>
@@ -402,6 +521,22 @@ def build_app(bot: BotManager) -> FastAPI:
         <input name="general.update_seconds" type="number" value="{cfg.general.update_seconds}"/>
       </div>
     </div>
+    <div class="row">
+      <div>
+        <label>Full Activity Fetch Every (seconds, 0 = every update; needs a Webhook Token)</label>
+        <input name="streams.activity_refresh_seconds" type="number" min="0" max="3600" value="{cfg.streams.activity_refresh_seconds}"/>
+      </div>
+    </div>
+    <div class="row">
+      <div>
+        <label>Max Messages</label>
+        <input name="streams.max_pages" type="number" min="1" max="20" value="{cfg.streams.max_pages}"/>
+      </div>
+      <div>
+        <label>Compact Table Above (sessions, 0 = never)</label>
+        <input name="streams.compact_threshold" type="number" min="0" value="{cfg.streams.compact_threshold}"/>
+      </div>
+    </div>
     <label>Post thumbnails</label>
     <div class="checkbox-block">
       <input name="streams.post_thumbnails" type="checkbox" {'checked' if cfg.streams.post_thumbnails else ''}>
@@ -450,6 +585,20 @@ def build_app(bot: BotManager) -> FastAPI:
   </fieldset>
 
 
+  <fieldset>
+    <legend>Activity Trends (optional)</legend>
+    <div class="row">
+      <div>
+        <label>Channel ID</label>
+        <input name="trends.channel_id" type="number" value="{cfg.trends.channel_id or ''}" placeholder="Leave empty to disable"/>
+      </div>
+      <div>
+        <label>Trends Update (s)</label>
+        <input name="general.trends_update_seconds" type="number" value="{cfg.general.trends_update_seconds}"/>
+      </div>
+    </div>
+  </fieldset>
+
   <fieldset>
     <legend>Sonarr / Radarr (optional)</legend>
     <div class="row">
@@ -504,6 +653,23 @@ def build_app(bot: BotManager) -> FastAPI:
         <label>Downloads Update (s)</label>
         <input name="general.qb_update_seconds" type="number" value="{cfg.general.qb_update_seconds}"/>
       </div>
+      <div>
+        <label>Summary Above (torrents)</label>
+        <input name="qbit.summary_threshold" type="number" min="0" value="{cfg.qbit.summary_threshold}"/>
+      </div>
+    </div>
+    <div class="row">
+      <div>
+        <label>Top N</label>
+        <input name="qbit.top_n" type="number" min="1" max="9" value="{cfg.qbit.top_n}"/>
+      </div>
+      <div>
+        <label>Top N By</label>
+        <select name="qbit.sort_by">
+          <option value="speed" {'selected' if cfg.qbit.sort_by == 'speed' else ''}>Speed</option>
+          <option value="eta" {'selected' if cfg.qbit.sort_by == 'eta' else ''}>ETA</option>
+        </select>
+      </div>
     </div>
   </fieldset>
 
@@ -515,6 +681,151 @@ def build_app(bot: BotManager) -> FastAPI:
 </form>
 """)
 
+    @app.get("/api/startup")
+    def startup_timings(request: Request):
+        if not request.session.get("user"):
+            return JSONResponse({"title": "Error", "message": "Not logged in", "type": "error"}, status_code=401)
+        return JSONResponse(bot.timings.report())
+
+    @app.get("/api/metrics")
+    async def metrics(request: Request):
+        if not request.session.get("user"):
+            return JSONResponse({"title": "Error", "message": "Not logged in", "type": "error"}, status_code=401)
+        return JSONResponse(await _resolve(bot.metrics()))
+
+    @app.get("/api/memory")
+    async def memory(request: Request):
+        if not request.session.get("user"):
+            return JSONResponse({"title": "Error", "message": "Not logged in", "type": "error"}, status_code=401)
+        return JSONResponse(await bot.memory_report())
+
+    @app.get("/api/trends")
+    async def trends(request: Request, resolution: str = "1h", points: int = 24):
+        if not request.session.get("user"):
+            return JSONResponse({"title": "Error", "message": "Not logged in", "type": "error"}, status_code=401)
+        if resolution not in ("1m", "1h", "1d"):
+            return JSONResponse({"title": "Error", "message": "resolution must be 1m, 1h or 1d", "type": "error"}, status_code=400)
+        return JSONResponse(await _resolve(bot.trends_report(resolution, max(1, min(points, 1440)))))
+
+    # ---------- Snapshot API (read-only; session or bearer token) ----------
+    def api_authorized(request: Request) -> bool:
+        if request.session.get("user"):
+            return True
+        token = bot.cfg.general.api_token if bot.cfg else None
+        if not token:
+            return False
+        auth = request.headers.get("authorization", "")
+        supplied = auth[7:].strip() if auth.lower().startswith("bearer ") else request.query_params.get("token", "")
+        return bool(supplied) and hmac.compare_digest(supplied.encode(), token.encode())
+
+    def snapshot_response(request: Request, name: str):
+        if not api_authorized(request):
+            return JSONResponse({"title": "Error", "message": "Not logged in", "type": "error"}, status_code=401)
+        snap = bot.snapshots.get(SNAPSHOT_BOARDS[name])
+        if snap is None or snap.body is None:
+            return JSONResponse({"title": "Error", "message": f"No {name} snapshot yet", "type": "error"},
+                                status_code=503, headers={"Retry-After": "30"})
+        headers = {"ETag": snap.etag, "Cache-Control": "no-cache"}
+        inm = request.headers.get("if-none-match", "")
+        if inm.strip() == "*" or snap.etag in (t.strip() for t in inm.split(",")):
+            return Response(status_code=304, headers=headers)
+        return Response(snap.body, media_type="application/json", headers=headers)
+
+    @app.get("/api/streams")
+    def api_streams(request: Request):
+        return snapshot_response(request, "streams")
+
+    @app.get("/api/downloads")
+    def api_downloads(request: Request):
+        return snapshot_response(request, "downloads")
+
+    @app.get("/api/stats")
+    def api_stats(request: Request):
+        return snapshot_response(request, "stats")
+
+    @app.get("/api/plex-counts")
+    def api_plex_counts(request: Request):
+        return snapshot_response(request, "plex-counts")
+
+    @app.get("/api/events")
+    async def api_events(request: Request):
+        """Server-Sent Events: every snapshot on connect, then each one whose content changes."""
+        if not api_authorized(request):
+            return JSONResponse({"title": "Error", "message": "Not logged in", "type": "error"}, status_code=401)
+        queue = bot.snapshots.subscribe()
+
+        def event(snap) -> bytes:
+            return b"event: %s\nid: %s\ndata: %s\n\n" % (
+                _EVENT_NAMES.get(snap.board, snap.board).encode(), snap.etag.encode(), snap.body)
+
+        async def stream():
+            try:
+                for snap in bot.snapshots.all():
+                    yield event(snap)
+                while True:
+                    try:
+                        snap = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        if await request.is_disconnected():
+                            return
+                        yield b": keep-alive\n\n"
+                        continue
+                    yield event(snap)
+            finally:
+                bot.snapshots.unsubscribe(queue)
+
+        return StreamingResponse(stream(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    # ---------- Radarr/Sonarr/Tautulli webhooks (token in ?token= or the Basic auth password) ----------
+    @app.post("/webhooks/{service}")
+    async def webhook(service: str, request: Request):
+        if service not in ("radarr", "sonarr", "tautulli"):
+            return Response(status_code=404)
+        token = bot.cfg.general.webhook_token if bot.cfg else None
+        supplied = request.query_params.get("token", "")
+        auth = request.headers.get("authorization", "")
+        if not supplied and auth.lower().startswith("basic "):
+            try:
+                supplied = base64.b64decode(auth[6:].strip()).decode().partition(":")[2]
+            except (ValueError, UnicodeDecodeError):
+                supplied = ""
+        if not token or not supplied or not hmac.compare_digest(supplied.encode(), token.encode()):
+            return JSONResponse({"title": "Error", "message": "Not authorized", "type": "error"}, status_code=401)
+        if service == "tautulli":
+            # any playback start/stop/pause/resume; the body is not needed
+            try:
+                result = await bot.activity_changed()
+            except Exception as e:
+                log.warning("tautulli webhook failed: %s", e)
+                return JSONResponse({"title": "Error", "message": str(e), "type": "error"}, status_code=503)
+            return JSONResponse({"title": "Success", "message": result, "type": "success"})
+        try:
+            payload = await request.json()
+        except ValueError:
+            return JSONResponse({"title": "Error", "message": "Body is not JSON", "type": "error"}, status_code=400)
+        if not isinstance(payload, dict):
+            return JSONResponse({"title": "Error", "message": "Body is not a JSON object", "type": "error"}, status_code=400)
+        try:
+            result = await bot.arr_event(service, payload)
+        except Exception as e:
+            log.warning("%s webhook failed: %s", service, e)
+            return JSONResponse({"title": "Error", "message": str(e), "type": "error"}, status_code=503)
+        return JSONResponse({"title": "Success", "message": result, "type": "success"})
+
+    # ---------- Thumbnails (public: Discord fetches these) ----------
+    @app.get("/thumbs/{key}.jpg")
+    async def thumbnail(key: str, request: Request):
+        found = await bot.thumbnail(key)
+        if not found:
+            return Response(status_code=404)
+        path, etag = found
+        headers = {"ETag": f'"{etag}"', "Cache-Control": "public, max-age=31536000, immutable"}
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        # FileResponse streams from disk (sendfile/pathsend where the server supports it)
+        return FileResponse(path, media_type="image/jpeg", headers=headers)
+
     # ---------- Helpers ----------
     def _get_bool(form, key: str) -> bool:
         # checkbox is present only when checked
@@ -533,12 +844,22 @@ def build_app(bot: BotManager) -> FastAPI:
         cfg.general.bot_token = form.get("general.bot_token", "").strip()
         cfg.general.timezone = (form.get("general.timezone", cfg.general.timezone) or "Europe/Stockholm").strip()
         cfg.general.message_id_file = form.get("general.message_id_file", cfg.general.message_id_file).strip()
+        cfg.general.state_db = (form.get("general.state_db", cfg.general.state_db) or "/data/state.db").strip()
 
         cfg.general.update_seconds = int(form.get("general.update_seconds", cfg.general.update_seconds) or 60)
-        cfg.general.stats_update_seconds = int(form.get("general.stats_update_seconds", cfg.general.stats_update_seconds) or 86400)
+        cfg.general.stats_update_seconds = int(form.get("general.stats_update_seconds", cfg.general.stats_update_seconds) or 900)
         cfg.general.qb_update_seconds = int(form.get("general.qb_update_seconds", cfg.general.qb_update_seconds) or 120)
         cfg.general.plex_update_seconds = int(form.get("general.plex_update_seconds", cfg.general.plex_update_seconds) or 3600)
+        cfg.general.trends_update_seconds = int(form.get("general.trends_update_seconds", cfg.general.trends_update_seconds) or 300)
         cfg.general.ca_cert_path = form.get("general.ca_cert_path", "").strip() or None
+        cfg.general.public_url = form.get("general.public_url", "").strip().rstrip("/") or None
+        cfg.general.api_token = form.get("general.api_token", "").strip() or None
+        cfg.general.webhook_token = form.get("general.webhook_token", "").strip() or None
+        cfg.general.transport = "webhook" if form.get("general.transport") == "webhook" else "gateway"
+        cfg.general.discord_profile = "default" if form.get("general.discord_profile") == "default" else "lean"
+        cfg.general.snapshot_max_age = int(form.get("general.snapshot_max_age", cfg.general.snapshot_max_age) or 120)
+        cfg.general.memory_budget_mb = int(form.get("general.memory_budget_mb", "") or 0) or None
+        cfg.general.trace_memory = form.get("general.trace_memory") in ("on", "true", "1")
         cfg.general.insecure_ssl = form.get("general.insecure_ssl") in ("on", "true", "1")
 
     
@@ -548,6 +869,9 @@ def build_app(bot: BotManager) -> FastAPI:
         def _get_bool_local(k: str) -> bool:
             return form.get(k) in ("on", "true", "1")
         cfg.streams.post_thumbnails = _get_bool_local("streams.post_thumbnails")
+        cfg.streams.max_pages = max(1, min(20, int(form.get("streams.max_pages", cfg.streams.max_pages) or 5)))
+        cfg.streams.compact_threshold = int(form.get("streams.compact_threshold", cfg.streams.compact_threshold) or 0)
+        cfg.streams.activity_refresh_seconds = int(form.get("streams.activity_refresh_seconds", cfg.streams.activity_refresh_seconds) or 0)
 
         cfg.plex_channels.movies_channel = int(form.get("plex_channels.movies_channel", "") or 0) or None
         cfg.plex_channels.tv_shows_channel = int(form.get("plex_channels.tv_shows_channel", "") or 0) or None
@@ -555,9 +879,31 @@ def build_app(bot: BotManager) -> FastAPI:
     
         sch = form.get("stats.channel_id", "").strip()
         cfg.stats.channel_id = int(sch) if sch else None
+
+        tch = form.get("trends.channel_id", "").strip()
+        cfg.trends.channel_id = int(tch) if tch else None
     
         cfg.tautulli_url = form.get("tautulli_url", "").strip()
         cfg.tautulli_api_key = form.get("tautulli_api_key", "").strip()
+        cfg.tautulli_name = form.get("tautulli_name", "").strip()
+        servers, i = [], 0
+        while f"tautulli_servers.{i}.url" in form:
+            fields = [form.get(f"tautulli_servers.{i}.{k}", "").strip() for k in ("name", "url", "api_key")]
+            i += 1
+            if not any(fields):
+                continue
+            if not all(fields):
+                return JSONResponse(
+                    {"title": "Error", "message": "Each additional Tautulli server needs a name, URL and API key.", "type": "error"},
+                    status_code=400
+                )
+            if fields[0] in {s.name for s in servers}:
+                return JSONResponse(
+                    {"title": "Error", "message": f"Tautulli server name {fields[0]!r} is used twice.", "type": "error"},
+                    status_code=400
+                )
+            servers.append(TautulliServer(name=fields[0], url=fields[1], api_key=fields[2]))
+        cfg.tautulli_servers = servers
     
         cfg.arr.radarr_host = form.get("arr.radarr_host", "").strip() or None
         cfg.arr.radarr_api_key = form.get("arr.radarr_api_key", "").strip() or None
@@ -569,11 +915,14 @@ def build_app(bot: BotManager) -> FastAPI:
         cfg.qbit.password = form.get("qbit.password", "").strip() or None
         qch = form.get("qbit.channel_id", "").strip()
         cfg.qbit.channel_id = int(qch) if qch else None
+        cfg.qbit.summary_threshold = max(0, int(form.get("qbit.summary_threshold", cfg.qbit.summary_threshold) or 0))
+        cfg.qbit.top_n = max(1, min(9, int(form.get("qbit.top_n", cfg.qbit.top_n) or 5)))
+        cfg.qbit.sort_by = "eta" if form.get("qbit.sort_by") == "eta" else "speed"
     
         # --- validate after update ---
-        if cfg.streams.channel_id and (not cfg.tautulli_url or not cfg.tautulli_api_key):
+        if cfg.streams.channel_id and not cfg.tautulli_sources():
             return JSONResponse(
-                {"title": "Error", "message": "Tautulli URL and API Key are required when Plex Streams is enabled.", "type": "error"},
+                {"title": "Error", "message": "A Tautulli URL and API Key are required when Plex Streams is enabled.", "type": "error"},
                 status_code=400
             )
         if cfg.qbit.channel_id and (not cfg.qbit.host or not cfg.qbit.username or not cfg.qbit.password):
@@ -587,6 +936,9 @@ def build_app(bot: BotManager) -> FastAPI:
             await bot.reload(cfg)
         except asyncio.CancelledError:
             pass
+        except RuntimeError as e:
+            # two-process mode: the bot process is down or did not answer
+            return JSONResponse({"title": "Error", "message": f"Settings saved, but the bot was not reloaded: {e}", "type": "error"}, status_code=503)
     
         return JSONResponse({"title": "Success", "message": "Settings saved and bot reloaded.", "type": "success"})
 
@@ -599,7 +951,7 @@ def build_app(bot: BotManager) -> FastAPI:
             cfg = load_config()
             if not cfg.general.bot_token:
                 return JSONResponse({"title": "Error", "message": "Bot token missing. Set it in settings first.", "type": "error"}, status_code=400)
-            await bot.reload(cfg)
+            await bot.restart(cfg)
             return JSONResponse({"title": "Success", "message": "Bot restarted successfully.", "type": "success"})
         except RuntimeError as e:
             return JSONResponse({"title": "Error", "message": str(e), "type": "error"}, status_code=400)
@@ -1,45 +1,250 @@
-import asyncio, logging, datetime, pytz, re
+import asyncio, logging, re, time, hashlib, json, os
 from typing import Optional, List, Dict
 
 import discord
 from discord.errors import LoginFailure
 
 from app.config import Settings
-from app.tautulli import TautulliClient
-from app.store import load_message_ids, save_message_ids
+from app.timing import StartupTimer
+from app.state import StateStore
+from app.timeseries import TimeSeriesStore, sparkline
+from app.history import PlayHistory
+from app.release import parse_release
+from app.downloads import summarize, ETA_INFINITE
+from app.models import RenderContext, StreamSession
+from app.activity import ActivityModel
+from app.singleflight import SingleFlight
+from app.snapshots import SnapshotCache
+from app.gateway import build_client
+from app.memory import MemoryBudget, set_tracing, top_allocators
+from app.supervisor import WorkerSupervisor
+from app import cassette
 
 log = logging.getLogger("bot")
 
+RELOAD_COALESCE_SECONDS = 0.5
+POSTER_CONCURRENCY = 4
+MEMORY_CHECK_SECONDS = 60
+FOOTER_SEP = " · "
+# Discord limits per message
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARS_PER_MESSAGE = 6000
+COMPACT_ROWS_PER_EMBED = 15
+# an unchanged board still checks its message exists (was not deleted) this often
+MESSAGE_CHECK_SECONDS = 3600
+
+# Settings fields (dotted paths) each upstream client is built from.
+_SSL_FIELDS = {"general.ca_cert_path", "general.insecure_ssl"}
+_CLIENT_FIELDS = {
+    "tautulli": {"tautulli_url", "tautulli_api_key", "tautulli_name", "tautulli_servers"} | _SSL_FIELDS,
+    "posters": {"arr.radarr_host", "arr.radarr_api_key", "arr.sonarr_host", "arr.sonarr_api_key",
+                "general.public_url"} | _SSL_FIELDS,
+    "qbit": {"qbit.host", "qbit.username", "qbit.password", "qbit.channel_id"} | _SSL_FIELDS,
+    "thumbs": {"general.public_url", "general.state_db"} | _SSL_FIELDS,
+}
+# Worker -> (settings fields, clients) whose change requires restarting it.
+# Anything not listed here (intervals, timezone) is picked up live.
+_WORKER_DEPS = {
+    "streams": ({"streams.channel_id", "streams.post_thumbnails"}, {"tautulli", "posters", "thumbs"}),
+    "stats": ({"stats.channel_id"}, {"tautulli"}),
+    "downloads": ({"qbit.channel_id", "streams.post_thumbnails"}, {"qbit", "posters", "thumbs"}),
+    "plex_channels": ({"plex_channels.movies_channel", "plex_channels.tv_shows_channel",
+                       "plex_channels.user_count_channel"}, {"tautulli"}),
+    "trends": ({"trends.channel_id"}, set()),
+    "memory": (set(), set()),
+}
+
+
+def _flatten(data: dict, prefix: str = "") -> dict:
+    out = {}
+    for k, v in data.items():
+        if isinstance(v, dict):
+            out.update(_flatten(v, f"{prefix}{k}."))
+        else:
+            out[f"{prefix}{k}"] = v
+    return out
+
+
+def _fingerprint(embeds: List[discord.Embed]) -> str:
+    """Hash of a board's content, ignoring the footer clock so it alone never forces an edit."""
+    payload = []
+    for e in embeds:
+        d = e.to_dict()
+        footer = d.pop("footer", None)
+        if footer:
+            # notices after the clock (stale data warnings) are content
+            d["_notice"] = footer.get("text", "").partition(FOOTER_SEP)[2]
+        d.pop("timestamp", None)
+        payload.append(d)
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _eta_text(seconds: Optional[int]) -> str:
+    if not seconds or seconds <= 0:
+        return "<1 min"
+    if seconds >= ETA_INFINITE:
+        return "∞"
+    eta_min = seconds / 60
+    if eta_min < 1:
+        return "<1 min"
+    if eta_min < 60:
+        return f"{int(eta_min)} min"
+    h, m = int(eta_min // 60), int(eta_min % 60)
+    return f"{h}h {m}m" if m else f"{h}h"
+
+
+def _page_key(key: str, page: int) -> str:
+    return key if page == 0 else f"{key}:{page}"
+
+
+def _paginate(embeds: List[discord.Embed]) -> List[List[discord.Embed]]:
+    """Pack embeds into messages within Discord's per-message embed count and size limits."""
+    pages: List[List[discord.Embed]] = []
+    page: List[discord.Embed] = []
+    size = 0
+    for e in embeds:
+        n = len(e)
+        if page and (len(page) >= EMBEDS_PER_MESSAGE or size + n > EMBED_CHARS_PER_MESSAGE):
+            pages.append(page)
+            page, size = [], 0
+        page.append(e)
+        size += n
+    if page:
+        pages.append(page)
+    return pages
+
+
+def _changed_fields(old: Settings, new: Settings) -> set[str]:
+    a, b = _flatten(old.model_dump()), _flatten(new.model_dump())
+    return {k for k in a.keys() | b.keys() if a.get(k) != b.get(k)}
+
+
 class BotManager:
-    def __init__(self):
+    def __init__(self, timings: Optional[StartupTimer] = None, record: Optional[str] = None):
         self.client: Optional[discord.Client] = None
         self.cfg: Optional[Settings] = None
-        self._streams_task = None
-        self._stats_task = None
-        self._downloads_task = None
-        self._plex_channels_task = None
-        self._msg_ids: dict = {}
+        self.timings = timings or StartupTimer()
+        self._state: Optional[StateStore] = None
+        self._series: Optional[TimeSeriesStore] = None
+        self._history: Optional[PlayHistory] = None
         self._posters = None
-        self._tautulli: Optional[TautulliClient] = None
+        self._tautulli = None
         self._qbit = None
+        self._thumbs = None
+        self._poster_flight = SingleFlight()
+        self._snapshots = SnapshotCache()
+        self._activity = ActivityModel()
+        self._board_flight = SingleFlight()
+        self._tree = None
+        self._poster_sem = asyncio.Semaphore(POSTER_CONCURRENCY)
+        self._init_task: Optional[asyncio.Task] = None
+        # bumped by every full restart; client builds from an older one are discarded
+        self._client_gen = 0
+        self._pending_cfg: Optional[Settings] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._cfg_changed = asyncio.Event()
+        self._workers = WorkerSupervisor(self._sleep)
         self.status: str = "stopped"   # "stopped" | "running" | "error"
         self.last_error: Optional[str] = None
+        self._memory = MemoryBudget()
+        self._register_caches()
+        # cassette file to record upstream and Discord traffic to (bench/replay.py)
+        self._record = record
 
     async def start(self, cfg: Settings):
-        await self._start_or_reload(cfg)
+        await self._full_restart(cfg)
+
+    async def restart(self, cfg: Settings):
+        """Tear everything down and reconnect, regardless of what changed."""
+        await self._full_restart(cfg)
 
     async def reload(self, cfg: Settings):
-        await self._start_or_reload(cfg)
+        """
+        Apply a new config, restarting only the clients and workers it affects.
+        Saves arriving while a reload is pending or running are coalesced: only
+        the newest config is applied and every caller waits for it.
+        """
+        self._pending_cfg = cfg
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self._drain_reloads())
+        await asyncio.shield(self._reload_task)
+
+    async def _drain_reloads(self):
+        await asyncio.sleep(RELOAD_COALESCE_SECONDS)
+        while self._pending_cfg is not None:
+            cfg, self._pending_cfg = self._pending_cfg, None
+            await self._apply_config(cfg)
+
+    async def _apply_config(self, cfg: Settings):
+        await self._clients_ready()
+        new = cfg.model_copy(deep=True)
+        self._normalize(new)
+        old = self.cfg
+        if (
+            old is None
+            or self.client is None
+            or self.status != "running"
+            or new.general.bot_token != old.general.bot_token
+            or new.general.discord_profile != old.general.discord_profile
+            or new.general.transport != old.general.transport
+        ):
+            await self._full_restart(new)
+            return
+
+        changed = _changed_fields(old, new)
+        if not changed:
+            return
+        log.info("Applying config changes: %s", ", ".join(sorted(changed)))
+        self.cfg = new
+        set_tracing(new.general.trace_memory)
+        if self._record:
+            cassette.start_recording(self._record, new)
+        if changed & {"general.state_db", "general.message_id_file"}:
+            await self._open_state()
+
+        rebuilt = set()
+        for name, fields in _CLIENT_FIELDS.items():
+            if changed & fields:
+                await self._rebuild_client(name)
+                rebuilt.add(name)
+
+        restart = {
+            name for name, (fields, clients) in _WORKER_DEPS.items()
+            if changed & fields or rebuilt & clients
+        }
+        if changed & {"general.state_db", "general.message_id_file"}:
+            restart = set(_WORKER_DEPS)
 
-    async def _start_or_reload(self, cfg: Settings):
+        wanted = self._wanted_workers()
+        for name in self._workers.names():
+            if name not in wanted or name in restart:
+                await self._workers.stop(name)
+        if self.client.is_ready():
+            for name, (cycle, interval) in wanted.items():
+                self._workers.ensure(name, cycle, interval)
+
+        # Wake sleeping workers so new intervals apply immediately
+        self._cfg_changed.set()
+        self._cfg_changed = asyncio.Event()
+
+    async def _full_restart(self, cfg: Settings):
         # Stop any running bot
         if self.client:
-            await self._stop_tasks()
+            await self._workers.stop_all()
             await self._close_client()
+        self._client_gen += 1
+        await self._close_upstream(self._tautulli, self._thumbs)
+        self._tautulli = self._posters = self._qbit = self._thumbs = None
 
         self.cfg = cfg
-        self._msg_ids = load_message_ids(self.cfg.general.message_id_file) or {}
-        self._setup_optionals()
+        self._snapshots.clear()
+        set_tracing(self.cfg.general.trace_memory)
+        if self._record:
+            cassette.start_recording(self._record, cfg)
+        await self._open_state()
+        self._normalize(self.cfg)
+        # Upstream clients come up alongside the gateway login; on_ready waits for them
+        self._init_task = asyncio.create_task(self._init_clients(self._client_gen))
         self._setup_client()
 
         # Start only if token exists
@@ -51,101 +256,254 @@ class BotManager:
 
         asyncio.create_task(self._run_client_and_tasks())
 
-    def _setup_optionals(self):
+    async def _open_state(self):
+        if self._state is None or self._state.path != self.cfg.general.state_db:
+            if self._state is not None:
+                await self._state.close()
+            self._state = await asyncio.to_thread(StateStore, self.cfg.general.state_db)
+            if self._series is not None:
+                await self._series.persist(force=True)
+            series_path = os.path.join(os.path.dirname(self.cfg.general.state_db) or ".", "timeseries.bin")
+            self._series = await asyncio.to_thread(TimeSeriesStore, series_path)
+            if self._history is not None:
+                await asyncio.to_thread(self._history.close)
+            self._history = await asyncio.to_thread(PlayHistory, self.cfg.general.state_db)
+        # Pick up message IDs from the legacy JSON file once
+        await asyncio.to_thread(self._state.import_json, "message_ids", self.cfg.general.message_id_file)
+
+    def _normalize(self, cfg: Settings):
         # Require Tautulli if streams or plex_channels enabled
         if (
-            (self.cfg.streams.channel_id
-             or (self.cfg.plex_channels and (
-                 self.cfg.plex_channels.movies_channel
-                 or self.cfg.plex_channels.tv_shows_channel
-                 or self.cfg.plex_channels.user_count_channel)))
-            and not (self.cfg.tautulli_url and self.cfg.tautulli_api_key)
+            (cfg.streams.channel_id
+             or (cfg.plex_channels and (
+                 cfg.plex_channels.movies_channel
+                 or cfg.plex_channels.tv_shows_channel
+                 or cfg.plex_channels.user_count_channel)))
+            and not cfg.tautulli_sources()
         ):
             log.warning("Streams/Plex channels set but Tautulli is not configured – disabling them")
-            self.cfg.streams.channel_id = None
-            if self.cfg.plex_channels:
-                self.cfg.plex_channels.movies_channel = None
-                self.cfg.plex_channels.tv_shows_channel = None
-                self.cfg.plex_channels.user_count_channel = None
+            cfg.streams.channel_id = None
+            if cfg.plex_channels:
+                cfg.plex_channels.movies_channel = None
+                cfg.plex_channels.tv_shows_channel = None
+                cfg.plex_channels.user_count_channel = None
 
         # Require qBittorrent if downloads enabled
-        if self.cfg.qbit.channel_id and not (self.cfg.qbit.host and self.cfg.qbit.username and self.cfg.qbit.password):
+        if cfg.qbit.channel_id and not (cfg.qbit.host and cfg.qbit.username and cfg.qbit.password):
             log.warning("qBittorrent channel is set but credentials missing – skipping downloads worker")
-            self.cfg.qbit.channel_id = None
-    
-        # Init clients
-        self._tautulli = (
+            cfg.qbit.channel_id = None
+
+    async def _init_clients(self, gen: int):
+        """Build all upstream clients concurrently, off the event loop."""
+        self.timings.begin("client_init")
+        results = await asyncio.gather(
+            asyncio.to_thread(self._build_tautulli),
+            asyncio.to_thread(self._build_posters, True),
+            asyncio.to_thread(self._build_qbit),
+            asyncio.to_thread(self._build_thumbs),
+            return_exceptions=True,
+        )
+        for name, res in zip(("tautulli", "posters", "qbit", "thumbs"), results):
+            if isinstance(res, BaseException):
+                log.error("Failed to initialise %s client: %s", name, res)
+        tautulli, posters, qbit, thumbs = (None if isinstance(r, BaseException) else r for r in results)
+        if gen != self._client_gen:
+            # a later restart superseded this config while it was building
+            await self._close_upstream(tautulli, thumbs)
+            return
+        self._tautulli, self._posters, self._qbit, self._thumbs = tautulli, posters, qbit, thumbs
+        self.timings.end("client_init")
+
+    async def _clients_ready(self):
+        if self._init_task is not None:
+            await asyncio.shield(self._init_task)
+
+    async def _rebuild_client(self, name: str):
+        # QbitClient probes and logs in synchronously and posters warm their
+        # library caches; keep both off the loop
+        gen = self._client_gen
+        if name == "tautulli":
+            built = self._build_tautulli()
+        elif name == "posters":
+            built = await asyncio.to_thread(self._build_posters, True)
+        elif name == "qbit":
+            built = await asyncio.to_thread(self._build_qbit)
+        elif name == "thumbs":
+            built = await asyncio.to_thread(self._build_thumbs)
+        else:
+            return
+        if gen != self._client_gen:
+            await self._close_upstream(built)
+            return
+        old = getattr(self, f"_{name}")
+        setattr(self, f"_{name}", built)
+        await self._close_upstream(old)
+
+    @staticmethod
+    async def _close_upstream(*clients):
+        """Close the HTTP sessions of replaced clients (Tautulli and thumbnails hold one)."""
+        for c in clients:
+            close = getattr(c, "close", None)
+            if close is not None:
+                await close()
+
+    def _build_tautulli(self):
+        # sessions from another server (or none) must not be extrapolated
+        self._activity.reset()
+        sources = self.cfg.tautulli_sources()
+        if not sources:
+            return None
+        from app.tautulli import TautulliClient, TautulliGroup
+        clients = [
             TautulliClient(
-                self.cfg.tautulli_url,
-                self.cfg.tautulli_api_key,
+                s.url,
+                s.api_key,
                 ca_cert_path=self.cfg.general.ca_cert_path,
                 insecure=self.cfg.general.insecure_ssl,
+                name=s.name,
             )
-            if (self.cfg.tautulli_url and self.cfg.tautulli_api_key) else None
-        )
-    
-        # Posters
-        self._posters = None
+            for s in sources
+        ]
+        labels = {s.name: s.name or self.cfg.tautulli_name or "Primary" for s in sources}
+        return TautulliGroup(clients, labels)
+
+    def _build_posters(self, warm: bool = False):
         try:
             if ((self.cfg.arr.radarr_host and self.cfg.arr.radarr_api_key) or
                 (self.cfg.arr.sonarr_host and self.cfg.arr.sonarr_api_key)):
                 from app.posters import PosterResolver
-                self._posters = PosterResolver(
+                posters = PosterResolver(
                     self.cfg.arr.radarr_host or "",
                     self.cfg.arr.radarr_api_key or "",
                     self.cfg.arr.sonarr_host or "",
                     self.cfg.arr.sonarr_api_key or "",
                     ca_cert_path=self.cfg.general.ca_cert_path,
                     insecure=self.cfg.general.insecure_ssl,
+                    # MediaCover URLs carry the API key; only hand them out
+                    # when they'll be fetched by our own thumbnail cache
+                    local_covers=bool(self.cfg.general.public_url),
                 )
+                if warm:
+                    posters.warm()
+                return posters
         except Exception as e:
             log.warning("Posters disabled: %s", e)
-    
-        # qBittorrent
-        self._qbit = None
-        if self.cfg.qbit.host and self.cfg.qbit.channel_id:
-            from app.qbit import QbitClient
-            self._qbit = QbitClient(
-                self.cfg.qbit.host,
-                self.cfg.qbit.username,
-                self.cfg.qbit.password,
-                ca_cert_path=self.cfg.general.ca_cert_path,
-                insecure=self.cfg.general.insecure_ssl,
+        return None
+
+    def _build_qbit(self):
+        if not (self.cfg.qbit.host and self.cfg.qbit.channel_id):
+            return None
+        from app.qbit import QbitClient
+        return QbitClient(
+            self.cfg.qbit.host,
+            self.cfg.qbit.username,
+            self.cfg.qbit.password,
+            ca_cert_path=self.cfg.general.ca_cert_path,
+            insecure=self.cfg.general.insecure_ssl,
+        )
+
+    def _build_thumbs(self):
+        if not self.cfg.general.public_url:
+            return None
+        from app.thumbs import ThumbnailCache
+        return ThumbnailCache(
+            os.path.join(os.path.dirname(self.cfg.general.state_db) or ".", "thumbs"),
+            self.cfg.general.public_url,
+            self._state,
+            self._thumb_source,
+            ca_cert_path=self.cfg.general.ca_cert_path,
+            insecure=self.cfg.general.insecure_ssl,
+        )
+
+    async def arr_event(self, service: str, payload: dict) -> str:
+        """Apply a Radarr/Sonarr Connect webhook to the poster library cache."""
+        posters = self._posters
+        if posters is None:
+            return f"{service} event ignored: posters are not configured"
+        result = await asyncio.to_thread(posters.apply_event, service, payload)
+        log.info("Webhook: %s", result)
+        return result
+
+    async def activity_changed(self) -> str:
+        """A Tautulli webhook reported a playback event; fetch activity in full on the next streams render."""
+        self._activity.invalidate()
+        cassette.event("activity_changed")
+        return "activity refresh scheduled"
+
+    async def thumbnail(self, key: str) -> Optional[tuple[str, str]]:
+        """(path, etag) of a cached poster thumbnail, fetching it on first request."""
+        if self._thumbs is None:
+            return None
+        return await self._thumbs.get(key)
+
+    def _wanted_workers(self) -> dict:
+        """Worker name -> (one cycle, seconds between cycles) for everything the config enables."""
+        wanted = {}
+        if self.cfg.streams.channel_id and self._tautulli:
+            wanted["streams"] = (self._streams_cycle, lambda: self.cfg.general.update_seconds)
+        if self.cfg.stats.channel_id and self._tautulli:
+            wanted["stats"] = (self._stats_cycle, lambda: self.cfg.general.stats_update_seconds)
+        if self.cfg.qbit.channel_id and self._qbit:
+            wanted["downloads"] = (self._downloads_cycle, lambda: self.cfg.general.qb_update_seconds)
+        if (
+            self.cfg.plex_channels
+            and (
+                self.cfg.plex_channels.movies_channel
+                or self.cfg.plex_channels.tv_shows_channel
+                or self.cfg.plex_channels.user_count_channel
             )
+        ):
+            wanted["plex_channels"] = (self._plex_channels_cycle, lambda: self.cfg.general.plex_update_seconds or 3600)
+        if self.cfg.trends.channel_id:
+            wanted["trends"] = (self._trends_cycle, lambda: self.cfg.general.trends_update_seconds)
+        if self.cfg.general.memory_budget_mb:
+            wanted["memory"] = (self._memory_cycle, lambda: MEMORY_CHECK_SECONDS)
+        return wanted
 
     def _setup_client(self):
-        intents = discord.Intents.default()
-        self.client = discord.Client(intents=intents)
+        if self.cfg.general.transport == "webhook":
+            # REST + channel webhooks only; slash commands need the gateway
+            from app.webhooks import WebhookClient
+            self.client = WebhookClient(self._state)
+            self._tree = None
+        else:
+            self.client = build_client(self.cfg.general.discord_profile)
+            from discord import app_commands
+            from app.commands import register_commands
+            self._tree = app_commands.CommandTree(self.client)
+            register_commands(self._tree, self)
+        commands_synced = self._tree is None
 
         @self.client.event
         async def on_ready():
             log.info("Logged in as %s", self.client.user)
+            self.timings.end("gateway_ready")
             self.status = "running"
             self.last_error = None
-            if self.cfg.streams.channel_id and self._tautulli:
-                self._streams_task = asyncio.create_task(self._streams_worker())
-            if self.cfg.stats.channel_id and self._tautulli:
-                self._stats_task = asyncio.create_task(self._stats_worker())
-            if self.cfg.qbit.channel_id and self._qbit:
-                self._downloads_task = asyncio.create_task(self._downloads_worker())
-            if (
-                self.cfg.plex_channels
-                and (
-                    self.cfg.plex_channels.movies_channel
-                    or self.cfg.plex_channels.tv_shows_channel
-                    or self.cfg.plex_channels.user_count_channel
-                )
-            ):
-                self._plex_channels_task = asyncio.create_task(self._plex_channels_worker())
-
+            nonlocal commands_synced
+            if not commands_synced:
+                commands_synced = True
+                asyncio.create_task(self._sync_commands())
+            await self._clients_ready()
+            self.timings.begin("first_board")
+            # fires again after every gateway reconnect; already-running workers are left alone
+            for name, (cycle, interval) in self._wanted_workers().items():
+                self._workers.ensure(name, cycle, interval)
 
         @self.client.event
         async def on_disconnect():
             log.info("Discord client disconnected")
 
+    async def _sync_commands(self):
+        try:
+            await self._tree.sync()
+        except Exception:
+            log.exception("Slash command sync failed (is the bot invited with the applications.commands scope?)")
+
     async def _run_client_and_tasks(self):
         try:
             self.status = "running"
+            self.timings.begin("gateway_ready")
             await self.client.start(self.cfg.general.bot_token)
         except LoginFailure:
             self.status = "error"
@@ -156,19 +514,9 @@ class BotManager:
             self.last_error = str(e)
             log.exception("Discord client stopped")
 
-    async def _stop_tasks(self):
-        for t in (self._streams_task, self._stats_task, self._downloads_task, self._plex_channels_task):
-            if t and not t.done():
-                t.cancel()
-                try:
-                    await t
-                except asyncio.CancelledError:
-                    pass
-                except BaseException:
-                    pass
-        self._streams_task = self._stats_task = self._downloads_task = self._plex_channels_task = None
-
     async def _close_client(self):
+        if self._series is not None:
+            await self._series.persist(force=True)
         try:
             await self.client.close()
         except Exception:
@@ -177,50 +525,97 @@ class BotManager:
         self.status = "stopped"
 
     # ---------- Helpers ----------
+    async def _sleep(self, seconds) -> None:
+        """Sleep for ``seconds()``, re-evaluated whenever the config changes."""
+        started = time.monotonic()
+        while True:
+            remaining = seconds() - (time.monotonic() - started)
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._cfg_changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return
+
+    def _render_context(self) -> RenderContext:
+        return RenderContext(self.cfg.general.timezone)
+
     def _now_str(self) -> str:
-        tz = pytz.timezone(self.cfg.general.timezone)
-        now = datetime.datetime.now(tz)
-        suffix = "th" if 11 <= now.day <= 13 else {1:'st',2:'nd',3:'rd'}.get(now.day % 10, 'th')
-        return now.strftime(f"%d{suffix} %B %H:%M")
+        return self._render_context().clock
 
-    def _progress_percent(self, sess: Dict) -> int:
-        try:
-            total = int(float(sess.get("duration", 0) or 0))
-            viewed = int(float(sess.get("view_offset", 0) or 0))
-            if total > 0:
-                return max(0, min(100, int(round(viewed / total * 100))))
-        except Exception:
-            pass
-        try:
-            return int(round(float(sess.get("progress_percent", 0) or 0)))
-        except Exception:
-            return 0
+    def _footer(self, ctx: RenderContext, *notices: Optional[str]) -> str:
+        return FOOTER_SEP.join([ctx.clock, *filter(None, notices)])
 
-    def _eta_or_left(self, sess: Dict) -> tuple[str, str]:
-        def to_int(x, default=0):
-            try:
-                if x in (None, "", "None"): return default
-                return int(float(x))
-            except Exception:
-                return default
-        total_ms = to_int(sess.get("duration")) or to_int(sess.get("media_duration"))
-        viewed_ms = to_int(sess.get("view_offset"))
-        if viewed_ms <= 0 and total_ms > 0:
-            try:
-                viewed_ms = int(total_ms * (float(sess.get("progress_percent") or 0.0) / 100.0))
-            except Exception:
-                viewed_ms = 0
-        if total_ms <= 0:
-            return ("ETA" if str(sess.get("state","")).lower() == "playing" else "Left", "—")
-        rem = max(0, (total_ms - viewed_ms)//1000)
-        if str(sess.get("state","")).lower() in ("playing","buffering"):
-            tz = pytz.timezone(self.cfg.general.timezone)
-            eta = datetime.datetime.now(tz) + datetime.timedelta(seconds=rem)
-            return ("ETA", eta.strftime("%H:%M %Z"))
-        if rem <= 0:
-            return ("Left", "0m left")
-        h, m = rem//3600, (rem%3600)//60
-        return ("Left", f"{h}h {m}m left" if h else f"{m}m left")
+    def _stale_notice(self, cmd: str, ctx: RenderContext) -> Optional[str]:
+        since = self._tautulli.stale_since(cmd) if self._tautulli else None
+        if since is None:
+            return None
+        return f"⚠ Tautulli unreachable — showing data from {ctx.hhmm(since)}"
+
+    def _tautulli_down_text(self) -> str:
+        return self._tautulli.down_text()
+
+    def metrics(self) -> dict:
+        """Health of the upstream services the boards depend on, and of the workers that render them."""
+        upstreams = {}
+        if self._tautulli is not None:
+            upstreams["tautulli"] = self._tautulli.status()
+        if self._qbit is not None:
+            upstreams["qbit"] = {"connected": self._qbit.connected, "status": self._qbit.status_text()}
+        return {"upstreams": upstreams, "workers": self._workers.report(), "activity": self._activity.report()}
+
+    # ---------- Memory ----------
+    def _register_caches(self):
+        """
+        Account every in-process cache against the memory budget. Lower
+        priorities are evicted first: per-title poster lookups and the state
+        mirror are cheap to refetch, snapshots come back on the next worker
+        cycle, and the Radarr/Sonarr libraries (with their title indexes)
+        cost a full library download to rebuild. History is reported only.
+        """
+        posters = lambda: self._posters
+        m = self._memory
+        m.register("poster_lookups", lambda: posters() and posters().cache_bytes("lookups"),
+                   lambda n: posters() and posters().evict("lookups", n), priority=0)
+        m.register("state_mirror", lambda: self._state and self._state.nbytes(),
+                   lambda n: self._state and self._state.evict(n), priority=1)
+        m.register("snapshots", self._snapshots.nbytes, self._snapshots.evict, priority=2)
+        m.register("poster_libraries", lambda: posters() and posters().cache_bytes("libraries"),
+                   lambda n: posters() and posters().evict("libraries", n), priority=3)
+        m.register("library_indexes", lambda: posters() and posters().cache_bytes("indexes"), priority=3)
+        m.register("history", lambda: self._history and self._history.nbytes(), priority=4)
+
+    def _memory_budget(self) -> Optional[int]:
+        mb = self.cfg.general.memory_budget_mb if self.cfg else None
+        return mb * 2**20 if mb else None
+
+    async def _memory_cycle(self):
+        budget = self._memory_budget()
+        if budget:
+            freed = self._memory.enforce(budget, await asyncio.to_thread(self._memory.sizes))
+            if freed:
+                log.info("Over the memory budget; evicted %s",
+                         ", ".join(f"{name} {n // 1024} KB" for name, n in freed.items()))
+
+    def _discord_cache_counts(self) -> dict:
+        client = self.client
+        guilds = getattr(client, "guilds", None)
+        if guilds is None:
+            # webhook transport: no gateway caches at all
+            return {}
+        return {
+            "guilds": len(guilds),
+            "channels": sum(len(g.channels) for g in guilds),
+            "members": sum(len(g.members) for g in guilds),
+            "messages": len(client.cached_messages),
+        }
+
+    async def memory_report(self) -> dict:
+        """Per-cache sizes against the budget, discord.py cache counts and (if tracing) top allocators."""
+        report = self._memory.report(self._memory_budget(), await asyncio.to_thread(self._memory.sizes))
+        report["discord"] = self._discord_cache_counts()
+        report["top_allocators"] = await asyncio.to_thread(top_allocators)
+        return report
 
     def _clean_title(self, raw: str) -> str:
         """Remove common release/quality tags and group tags from titles."""
@@ -248,71 +643,183 @@ class BotManager:
     
         return cleaned.strip()
 
-    def _resolve_poster(self, sess: Dict) -> Optional[str]:
-        if not (self._posters and self.cfg.streams.post_thumbnails):
+    def _thumb_url(self, source: Optional[str]) -> Optional[str]:
+        """Route a poster through the local thumbnail cache when one is configured."""
+        if source and self._thumbs is not None:
+            return self._thumbs.register(self._thumb_ref(source))
+        return source
+
+    def _thumb_ref(self, url: str) -> dict:
+        """A poster URL without its credentials: arr MediaCover URLs carry the API key."""
+        arr = self.cfg.arr
+        for service, base in (("radarr", arr.radarr_host), ("sonarr", arr.sonarr_host)):
+            base = (base or "").rstrip("/")
+            if base and url.startswith(f"{base}/api/"):
+                return {"arr": service, "path": url[len(base):].split("?", 1)[0]}
+        return {"url": url}
+
+    def _thumb_source(self, ref: dict) -> Optional[str]:
+        """The URL to fetch a thumbnail reference from, with the current API keys."""
+        if "tautulli" in ref:
+            group = self._tautulli
+            if not group or ref["tautulli"] not in group.clients:
+                return None
+            return group.image_proxy_url(ref["img"], ref["w"], ref["h"], server=ref["tautulli"])
+        if "arr" in ref:
+            arr = self.cfg.arr
+            base, key = ((arr.radarr_host, arr.radarr_api_key) if ref["arr"] == "radarr"
+                         else (arr.sonarr_host, arr.sonarr_api_key))
+            if not (base and key):
+                return None
+            return f"{base.rstrip('/')}{ref['path']}?apikey={key}"
+        return ref.get("url")
+
+    # Poster requests are hashable keys so a render cycle can resolve each
+    # distinct title once, concurrently, and share in-flight lookups with
+    # the other workers.
+    def _session_poster_key(self, sess: StreamSession) -> Optional[tuple]:
+        if not self.cfg.streams.post_thumbnails:
             return None
-    
-        media_type = sess.get("media_type") or ""
-        if media_type == "episode":
-            raw_title = sess.get("grandparent_title") or sess.get("title") or None
+
+        # Plex's own artwork via Tautulli needs no title matching at all
+        if self._thumbs is not None and self._tautulli:
+            img = sess.grandparent_thumb if sess.media_type == "episode" else sess.thumb
+            if img:
+                return ("plex", sess.server_key, img)
+
+        if not self._posters:
+            return None
+
+        if sess.media_type == "episode":
+            raw_title = sess.grandparent_title or sess.title
         else:
-            raw_title = sess.get("title") or sess.get("full_title") or None
-    
+            raw_title = sess.title or sess.full_title
+
         if not raw_title:
             return None
-    
-        # Detect TV from Plex metadata if available
-        if media_type == "episode":
-            title = self._clean_title(raw_title)
-            tvdb_id = sess.get("tvdb_id") or None
-            try:
-                return self._posters.tv_poster(title, tvdb_id)
-            except Exception:
-                return None
-    
-        # Movie logic (same as before)
+
         title = self._clean_title(raw_title)
-        year = sess.get("year") or None
-        imdb_id = sess.get("imdb_id") or None
-        tmdb_id = sess.get("tmdb_id") or None
+        if sess.media_type == "episode":
+            return ("tv", title, sess.tvdb_id)
+        return ("movie", title, sess.year, sess.imdb_id, sess.tmdb_id)
+
+    def _torrent_poster_key(self, name: str) -> Optional[tuple]:
+        if not (self._posters and self.cfg.streams.post_thumbnails):
+            return None
+        info = parse_release(name)
+        if info.is_tv:
+            return ("tv", info.title, None)
+        return ("movie", info.title, info.year, None, None)
+
+    async def _resolve_posters(self, keys) -> Dict[tuple, Optional[str]]:
+        """Resolve distinct poster keys concurrently; identical in-flight lookups are shared."""
+        unique = list(dict.fromkeys(k for k in keys if k))
+        results = await asyncio.gather(
+            *(self._poster_flight.do(k, lambda k=k: self._lookup_poster(k)) for k in unique)
+        )
+        return dict(zip(unique, results))
+
+    async def _lookup_poster(self, key: tuple) -> Optional[str]:
+        kind = key[0]
+        if kind == "plex":
+            thumbs = self._thumbs
+            if thumbs is None:
+                return None
+            return thumbs.register({"tautulli": key[1], "img": key[2], "w": 300, "h": 450})
+        posters = self._posters
+        if posters is None:
+            return None
         try:
-            poster = self._posters.movie_poster(title, year, imdb_id, tmdb_id)
-            if not poster and title:
-                poster = self._posters.movie_poster(title, None, imdb_id, tmdb_id)
-            return poster
+            async with self._poster_sem:
+                if kind == "tv":
+                    _, title, tvdb_id = key
+                    poster = await asyncio.to_thread(posters.tv_poster, title, tvdb_id)
+                else:
+                    _, title, year, imdb_id, tmdb_id = key
+                    poster = await asyncio.to_thread(posters.movie_poster, title, year, imdb_id, tmdb_id)
+                    if not poster and title and year:
+                        poster = await asyncio.to_thread(posters.movie_poster, title, None, imdb_id, tmdb_id)
         except Exception:
             return None
+        return self._thumb_url(poster)
 
     # ---------- Workers ----------
-    async def _streams_worker(self):
-        while not self.client.is_closed():
-            try:
-                sessions = await self._tautulli.get_activity() if self._tautulli else []
-                embeds = self._build_stream_embeds(sessions)
-                await self._post_or_edit("streams", self.cfg.streams.channel_id, embeds=embeds)
-            except Exception:
-                log.exception("streams worker error")
-            await asyncio.sleep(self.cfg.general.update_seconds)
+    async def _streams_cycle(self):
+        pages = await self._render_streams(record=True)
+        await self._post_pages("streams", self.cfg.streams.channel_id, pages)
 
-    async def _plex_channels_worker(self):
-        # Wait until Discord client is connected and ready
-        await self.client.wait_until_ready()
-        while not self.client.is_closed():
-            try:
-                # Fetch stats from Tautulli
-                stats = await self._fetch_plex_stats()
-                if stats:
-                    await self._update_plex_channels(stats)
-            except Exception:
-                log.exception("Plex channels update failed")
-            await asyncio.sleep(self.cfg.general.plex_update_seconds or 3600)
+    async def _current_sessions(self) -> Optional[List[StreamSession]]:
+        """
+        Sessions as of now: servers due a full get_activity are fetched, the
+        others' last sessions are extrapolated. None if every server is down
+        with nothing cached.
+        """
+        group = self._tautulli
+        if not group:
+            return []
+        # without webhooks nothing reports a stream starting or stopping
+        # early, so fetch every update as before
+        refresh = self.cfg.streams.activity_refresh_seconds if self.cfg.general.webhook_token else 0
+        due = self._activity.due(group.clients, refresh)
+        if due:
+            fetched = await group.activity_by_server(due)
+            for name in due:
+                raw = fetched.get(name)
+                if raw is None:
+                    self._activity.forget(name)
+                    continue
+                sessions = [StreamSession.from_tautulli(d) for d in raw]
+                if group.clients[name].stale_since("get_activity") is not None:
+                    # frozen data from a down server; shown as is, retried next cycle
+                    self._activity.freeze(name, sessions)
+                else:
+                    self._activity.update(name, sessions)
+        if not self._activity.known():
+            return None
+        return self._activity.sessions()
+
+    async def _render_streams(self, record: bool = False) -> List[List[discord.Embed]]:
+        sessions = await self._current_sessions()
+        ctx = self._render_context()
+        if sessions is None:
+            # Tautulli is down and there is nothing cached to fall back on
+            e = discord.Embed(title="Plex Streams", description=self._tautulli_down_text(), color=0xE67E22)
+            e.set_footer(text=ctx.clock)
+            self._snapshots.put("streams", [[e]], {"error": self._tautulli_down_text(), "sessions": []})
+            return [[e]]
+        if record and (not self._tautulli or self._tautulli.stale_since("get_activity") is None):
+            # don't record a frozen snapshot as live activity
+            self._record_streams(sessions)
+            await self._series.persist()
+        shown = self._shown_sessions(sessions)
+        posters = {}
+        if not self._stream_compact(sessions):
+            posters = await self._resolve_posters(self._session_poster_key(s) for s in shown)
+        pages = self._build_stream_pages(sessions, ctx, posters)
+        self._snapshots.put("streams", pages, {
+            "error": None,
+            "stale_since": self._tautulli.stale_since("get_activity") if self._tautulli else None,
+            "sessions": [s.as_dict() for s in sessions],
+        })
+        return pages
+
+    async def _plex_channels_cycle(self):
+        # Fetch stats from Tautulli
+        stats = await self._fetch_plex_stats()
+        if stats:
+            self._snapshots.put("plex_counts", None, stats)
+            await self._update_plex_channels(stats)
 
     async def _fetch_plex_stats(self):
         if not self._tautulli:
             return None
-        movies = await self._tautulli.count_library("movie")
-        shows = await self._tautulli.count_library("show")
-        users = await self._tautulli.count_users()
+        movies, shows, users = await asyncio.gather(
+            self._tautulli.count_library("movie"),
+            self._tautulli.count_library("show"),
+            self._tautulli.count_users(),
+        )
+        if None in (movies, shows, users):
+            return None
         return {"movies": movies, "shows": shows, "users": users}
 
 
@@ -344,73 +851,199 @@ class BotManager:
                 except Exception:
                     log.exception("Failed to update user count channel")
 
-    async def _stats_worker(self):
-        while not self.client.is_closed():
-            try:
-                tu30  = await self._tautulli.get_home_stats("top_users", 30, length=5)
-                tu365 = await self._tautulli.get_home_stats("top_users", 365, length=5)
-                tm30  = await self._tautulli.get_home_stats("top_movies", 30, length=5)
-                tv30  = await self._tautulli.get_home_stats("top_tv", 30, length=5)
-                embed = self._build_stats_embed(tu30, tu365, tm30, tv30)
-                await self._post_or_edit("stats", self.cfg.stats.channel_id, embed=embed)
-            except Exception:
-                log.exception("stats worker error")
-            await asyncio.sleep(self.cfg.general.stats_update_seconds)
+    async def _stats_cycle(self):
+        # shares a /stats refresh's render, and with it the history ingest
+        embed = await self._board_flight.do("stats", self._render_stats)
+        await self._post_or_edit("stats", self.cfg.stats.channel_id, embed=embed)
 
-    async def _downloads_worker(self):
-        while not self.client.is_closed():
-            try:
-                torrents = self._qbit.get_downloading() if self._qbit else None
-                status = self._qbit.status_text() if self._qbit else "qBittorrent not configured"
-                embeds = self._build_downloads_embed(torrents, status)
-                await self._post_or_edit("downloads", self.cfg.qbit.channel_id, embeds=embeds)
-            except Exception:
-                log.exception("downloads worker error")
-            await asyncio.sleep(self.cfg.general.qb_update_seconds)
+    async def _render_stats(self) -> discord.Embed:
+        # Pull only history rows newer than the cursor; leaderboards are
+        # maintained locally instead of asking Tautulli for 365 days
+        # every server at once, each behind its own cursor
+        group = self._tautulli
+        results = await asyncio.gather(*(self._history.ingest(c, c.name) for c in group.clients.values()),
+                                       return_exceptions=True)
+        for name, res in zip(group.clients, results):
+            # a failing server only drops out; the others' plays still count
+            if isinstance(res, Exception):
+                log.warning("History ingest from Tautulli %s failed: %s", group.labels.get(name) or "primary", res)
+        tu30  = self._history.top("users", 30)
+        tu365 = self._history.top("users", 365)
+        tm30  = self._history.top("movies", 30)
+        tv30  = self._history.top("tv", 30)
+        embed = self._build_stats_embed(tu30, tu365, tm30, tv30)
+        self._snapshots.put("stats", [[embed]], {
+            "users_30": tu30, "users_365": tu365, "movies_30": tm30, "tv_30": tv30,
+        })
+        return embed
+
+    async def _downloads_cycle(self):
+        embeds = await self._render_downloads(record=True)
+        await self._post_or_edit("downloads", self.cfg.qbit.channel_id, embeds=embeds)
+
+    async def _render_downloads(self, record: bool = False) -> List[discord.Embed]:
+        qbit = self._qbit
+        # qbittorrent-api is blocking and a large queue takes a while to list
+        torrents = await asyncio.to_thread(qbit.get_downloading) if qbit else None
+        status = qbit.status_text() if qbit else "qBittorrent not configured"
+        summary = None
+        if torrents is not None:
+            summary = summarize(torrents, self.cfg.qbit.top_n, self.cfg.qbit.sort_by)
+            if record:
+                self._series.record(downloads=summary.count, download_speed=summary.speed)
+                await self._series.persist()
+        if not self._downloads_summary_mode(torrents):
+            shown = (torrents or [])[:10]
+        else:
+            shown = summary.top
+        posters = await self._resolve_posters(self._torrent_poster_key(t.name) for t in shown)
+        embeds = self._build_downloads_embed(torrents, status, self._render_context(), posters, summary)
+        self._snapshots.put("downloads", [embeds], self._downloads_data(torrents, status, summary))
+        return embeds
+
+    def _downloads_data(self, torrents, status: Optional[str], summary) -> dict:
+        if summary is None:
+            return {"error": status, "count": 0, "torrents": []}
+        # same constant-size view as the board: totals, categories, top N
+        shown = summary.top if self._downloads_summary_mode(torrents) else torrents[:10]
+        return {
+            "error": None,
+            "count": summary.count,
+            "speed": summary.speed,
+            "left": summary.left,
+            "eta": summary.eta,
+            "categories": [c._asdict() for c in summary.categories],
+            "torrents": [t.as_dict() for t in shown],
+        }
+
+    # ---------- Snapshots ----------
+    def snapshot(self, board: str):
+        """The board's latest rendering, or None if it has not been rendered yet."""
+        return self._snapshots.get(board)
+
+    @property
+    def snapshots(self) -> SnapshotCache:
+        return self._snapshots
+
+    async def refresh_snapshot(self, board: str):
+        """
+        Render a board now, without posting it. Concurrent callers share one
+        render, and a board whose upstream is not configured keeps whatever
+        snapshot it has.
+        """
+        renderers = {
+            "streams": (self._tautulli, self._render_streams),
+            "downloads": (self._qbit, self._render_downloads),
+            "stats": (self._tautulli, self._render_stats),
+        }
+        await self._clients_ready()
+        upstream, render = renderers[board]
+        if upstream is not None and self.client is not None:
+            await self._board_flight.do(board, render)
+        return self._snapshots.get(board)
+
+    async def _trends_cycle(self):
+        embed = self._build_trends_embed()
+        await self._post_or_edit("trends", self.cfg.trends.channel_id, embed=embed)
+
+    def _record_streams(self, sessions: List[StreamSession]):
+        transcodes = sum(1 for sess in sessions if sess.transcode)
+        bandwidth = sum(sess.bandwidth for sess in sessions)
+        self._series.record(
+            streams=len(sessions),
+            transcodes=transcodes,
+            direct_plays=len(sessions) - transcodes,
+            stream_bandwidth=bandwidth,
+        )
 
     # ---------- Builders ----------
-    def _build_stream_embeds(self, sessions: List[Dict]) -> List[discord.Embed]:
+    def _stream_compact(self, sessions: List[StreamSession]) -> bool:
+        threshold = self.cfg.streams.compact_threshold
+        return bool(threshold) and len(sessions) > threshold
+
+    def _shown_sessions(self, sessions: List[StreamSession]) -> List[StreamSession]:
+        """Sessions that fit on the board; compact rows are packed several per embed."""
+        per_embed = COMPACT_ROWS_PER_EMBED if self._stream_compact(sessions) else 1
+        return sessions[:self.cfg.streams.max_pages * EMBEDS_PER_MESSAGE * per_embed]
+
+    def _build_stream_pages(self, sessions: List[StreamSession], ctx: RenderContext,
+                            posters: Optional[Dict] = None) -> List[List[discord.Embed]]:
+        shown = self._shown_sessions(sessions)
+        if self._stream_compact(sessions):
+            embeds = self._build_stream_table(shown, ctx)
+        else:
+            embeds = self._build_stream_embeds(shown, ctx, posters)
+        pages = _paginate(embeds)[:self.cfg.streams.max_pages]
+        hidden = len(sessions) - sum(self._sessions_on(page, sessions) for page in pages)
+        if hidden > 0:
+            last = pages[-1][-1]
+            last.set_footer(text=self._footer(ctx, self._stale_notice("get_activity", ctx), f"{hidden} more not shown"))
+        return pages
+
+    def _sessions_on(self, page: List[discord.Embed], sessions: List[StreamSession]) -> int:
+        if not sessions:
+            return 0
+        if self._stream_compact(sessions):
+            return sum(len((e.description or "").splitlines()) for e in page)
+        return len(page)
+
+    def _build_stream_table(self, sessions: List[StreamSession], ctx: RenderContext) -> List[discord.Embed]:
+        """One line per session, for busy servers where an embed each would run to dozens of messages."""
+        footer = self._footer(ctx, self._stale_notice("get_activity", ctx))
+        embeds: List[discord.Embed] = []
+        for start in range(0, len(sessions), COMPACT_ROWS_PER_EMBED):
+            rows = [
+                f"{'⏸' if sess.paused else '▶'} {f'[{sess.server}] ' if sess.server else ''}"
+                f"**{sess.user}** — {(sess.full_title or '—')[:60]}"
+                f" · {sess.progress}% · {sess.decision}"
+                for sess in sessions[start:start + COMPACT_ROWS_PER_EMBED]
+            ]
+            title = f"Plex Streams ({len(sessions)})" if start == 0 else None
+            e = discord.Embed(title=title, description="\n".join(rows), color=0x00FF00)
+            e.set_footer(text=footer)
+            embeds.append(e)
+        return embeds
+
+    def _build_stream_embeds(self, sessions: List[StreamSession], ctx: RenderContext,
+                             posters: Optional[Dict] = None) -> List[discord.Embed]:
+        posters = posters or {}
+        footer = self._footer(ctx, self._stale_notice("get_activity", ctx))
         embeds: List[discord.Embed] = []
         if not sessions:
             e = discord.Embed(title="Plex Streams", description="Currently no streams active", color=0x00ff00)
-            e.set_footer(text=self._now_str())
+            e.set_footer(text=footer)
             return [e]
-        # limit to 6 unless you add config.general.max_sessions
-        for sess in sessions[:6]:
-            color = 0xFFD700 if str(sess.get("state","")).lower() == "paused" else 0x00FF00
-            e = discord.Embed(title=sess.get("full_title") or "—", description=(sess.get("summary") or "")[:1000], color=color)
-            user = sess.get("friendly_name") or "—"
-            status = f"{str(sess.get('state','')).capitalize()} • {self._progress_percent(sess)}%"
-            lbl, val = self._eta_or_left(sess)
-            decision = (sess.get("transcode_decision") or "Direct Play").capitalize()
-            vcodec = (sess.get("video_codec") or "—").upper()
-            vres   = sess.get("video_resolution") or ""
-            vdr    = sess.get("video_dynamic_range") or ""
-            stream = f"{decision} ({vcodec} {vres}{' ' + vdr if vdr else ''})".strip()
-
-            if sess.get("media_type") == "episode":
-                e.add_field(name="User", value=user, inline=True)
-                e.add_field(name="Season", value=sess.get("parent_media_index") or "—", inline=True)
-                e.add_field(name="Episode", value=sess.get("media_index") or "—", inline=True)
+        for sess in sessions:
+            color = 0xFFD700 if sess.paused else 0x00FF00
+            e = discord.Embed(title=sess.full_title or "—", description=sess.summary, color=color)
+            if sess.server:
+                e.set_author(name=sess.server)
+            status = f"{sess.state.capitalize()} • {sess.progress}%"
+            lbl, val = sess.eta_or_left(ctx)
+
+            if sess.media_type == "episode":
+                e.add_field(name="User", value=sess.user, inline=True)
+                e.add_field(name="Season", value=sess.season or "—", inline=True)
+                e.add_field(name="Episode", value=sess.episode or "—", inline=True)
                 e.add_field(name="Status", value=status, inline=True)
-                e.add_field(name="Stream", value=stream, inline=True)
+                e.add_field(name="Stream", value=sess.stream, inline=True)
                 e.add_field(name=lbl, value=val, inline=True)
             else:
-                e.add_field(name="User", value=user, inline=True)
-                e.add_field(name="Year", value=sess.get("year") or "—", inline=True)
+                e.add_field(name="User", value=sess.user, inline=True)
+                e.add_field(name="Year", value=sess.year or "—", inline=True)
                 e.add_field(name="Status", value=status, inline=True)
-                e.add_field(name="Stream", value=stream, inline=True)
+                e.add_field(name="Stream", value=sess.stream, inline=True)
                 e.add_field(name=lbl, value=val, inline=True)
 
-            poster = self._resolve_poster(sess)
+            poster = posters.get(self._session_poster_key(sess))
             if poster:
                 e.set_thumbnail(url=poster)
-            e.set_footer(text=self._now_str())
+            e.set_footer(text=footer)
             embeds.append(e)
-        return embeds[:10]
+        return embeds
 
     def _build_stats_embed(self, top_users_30, top_users_365, top_movies_30, top_tv_30) -> discord.Embed:
-        e = discord.Embed(title="Top Activity (Daily)", color=0x6a0dad)
+        e = discord.Embed(title="Top Activity", color=0x6a0dad)
         def fmt(rows, key="title"):
             if not rows: return "—"
             return "\n".join(f"{i}. {(r.get(key) or r.get('user') or '—')} — {r.get('total_plays',0)} plays"
@@ -419,48 +1052,119 @@ class BotManager:
         e.add_field(name="Top Users — 365d", value=fmt(top_users_365, key="user"), inline=False)
         e.add_field(name="Top Movies — 30d", value=fmt(top_movies_30, key="title"), inline=False)
         e.add_field(name="Top TV — 30d", value=fmt(top_tv_30, key="title"), inline=False)
+        servers = None
+        if self._tautulli and self._tautulli.labelled:
+            servers = " + ".join(self._tautulli.labels.values())
+        e.set_footer(text=FOOTER_SEP.join(filter(None, [self._now_str(), servers])))
+        return e
+
+    def _build_trends_embed(self) -> discord.Embed:
+        e = discord.Embed(title="Activity Trends", color=0x3498db)
+        series = self._series
+
+        def line(metric, resolution, points, fmt):
+            pts = series.series(metric, resolution, points)
+            seen = [p for p in pts if p is not None]
+            if not seen:
+                return "—"
+            peak = max(p[2] for p in seen)
+            return f"`{sparkline(pts)}`\nNow {fmt(series.latest(metric) or 0)} · Peak {fmt(peak)}"
+
+        count = lambda v: f"{v:.0f}"
+        e.add_field(name="Streams — 24h", value=line("streams", "1h", 24, count), inline=False)
+        e.add_field(name="Transcodes — 24h", value=line("transcodes", "1h", 24, count), inline=True)
+        e.add_field(name="Direct Plays — 24h", value=line("direct_plays", "1h", 24, count), inline=True)
+        e.add_field(name="Stream Bandwidth — 24h",
+                    value=line("stream_bandwidth", "1h", 24, lambda v: f"{v / 1000:.1f} Mbps"), inline=False)
+        e.add_field(name="Downloads — 24h", value=line("downloads", "1h", 24, count), inline=True)
+        e.add_field(name="Download Speed — 24h",
+                    value=line("download_speed", "1h", 24, lambda v: f"{v / (1024 * 1024):.2f} MB/s"), inline=True)
+        e.add_field(name="Streams — 30d", value=line("streams", "1d", 30, count), inline=False)
         e.set_footer(text=self._now_str())
         return e
 
-    def _build_downloads_embed(self, torrents, status_text: Optional[str]) -> List[discord.Embed]:
+    def trends_report(self, resolution: str = "1h", points: int = 24) -> dict:
+        if self._series is None:
+            return {"resolution": resolution, "metrics": {}}
+        return self._series.report(resolution, points)
+
+    def _downloads_summary_mode(self, torrents) -> bool:
+        return torrents is not None and len(torrents) > self.cfg.qbit.summary_threshold
+
+    def _build_downloads_embed(self, torrents, status_text: Optional[str], ctx: RenderContext,
+                               posters: Optional[Dict] = None, summary=None) -> List[discord.Embed]:
+        posters = posters or {}
         if status_text and torrents is None:
             e = discord.Embed(title="qBittorrent Status", description=status_text, color=0xE67E22)
-            e.set_footer(text=self._now_str())
+            e.set_footer(text=ctx.clock)
             return [e]
         if not torrents:
             e = discord.Embed(title="qBittorrent Status", description="No downloads in progress.", color=0x00ff00)
-            e.set_footer(text=self._now_str())
+            e.set_footer(text=ctx.clock)
             return [e]
-        embeds: List[discord.Embed] = []
-        for t in torrents[:10]:
-            progress = t.progress * 100
-            speed = t.dlspeed / (1024 * 1024)
-            eta_min = t.eta / 60 if t.eta > 0 else 0
-            if eta_min < 1:
-                eta_text = "<1 min"
-            elif eta_min < 60:
-                eta_text = f"{int(eta_min)} min"
-            else:
-                h, m = int(eta_min // 60), int(eta_min % 60)
-                eta_text = f"{h}h {m}m" if m else f"{h}h"
-            desc = f"**Progress:** {progress:.2f}%\n**Speed:** {speed:.2f} MB/s\n**ETA:** {eta_text}"
-            e = discord.Embed(title=t.name, description=desc, color=0x6a0dad)
-            e.set_footer(text=self._now_str())
-            poster = None
-            if self._posters and self.cfg.streams.post_thumbnails:
-                cleaned = self._clean_title(t.name)
-                if re.search(r"S\d{1,2}E\d{1,2}", t.name, re.I):
-                    poster = self._posters.tv_poster(cleaned, None)
-                else:
-                    poster = self._posters.movie_poster(cleaned, None, None, None)
-            if poster:
-                e.set_thumbnail(url=poster)
-    
-            e.set_footer(text=self._now_str())
-            embeds.append(e)
-        return embeds
+        if self._downloads_summary_mode(torrents):
+            summary = summary or summarize(torrents, self.cfg.qbit.top_n, self.cfg.qbit.sort_by)
+            return [self._build_downloads_summary(summary, ctx)] + [self._torrent_embed(t, ctx, posters) for t in summary.top]
+        return [self._torrent_embed(t, ctx, posters) for t in torrents[:10]]
+
+    def _torrent_embed(self, t, ctx: RenderContext, posters: Dict) -> discord.Embed:
+        progress = t.progress * 100
+        speed = t.dlspeed / (1024 * 1024)
+        desc = f"**Progress:** {progress:.2f}%\n**Speed:** {speed:.2f} MB/s\n**ETA:** {_eta_text(t.eta)}"
+        e = discord.Embed(title=t.name[:256], description=desc, color=0x6a0dad)
+        poster = posters.get(self._torrent_poster_key(t.name))
+        if poster:
+            e.set_thumbnail(url=poster)
+        e.set_footer(text=ctx.clock)
+        return e
+
+    def _build_downloads_summary(self, summary, ctx: RenderContext) -> discord.Embed:
+        """Queue totals and per-category counts; the top-N torrents follow as their own embeds."""
+        e = discord.Embed(title="Downloads", color=0x6a0dad)
+        e.add_field(name="Torrents", value=str(summary.count), inline=True)
+        e.add_field(name="Speed", value=f"{summary.speed / (1024 * 1024):.2f} MB/s", inline=True)
+        e.add_field(name="Queue ETA", value=_eta_text(summary.eta) if summary.eta else "∞", inline=True)
+        if summary.categories:
+            lines = [f"**{c.name}** — {c.count} · {c.speed / (1024 * 1024):.2f} MB/s" for c in summary.categories]
+            e.add_field(name="By Category", value="\n".join(lines)[:1024], inline=False)
+        label = "Finishing Soonest" if self.cfg.qbit.sort_by == "eta" else "Fastest"
+        e.description = f"{label} {len(summary.top)} below."
+        e.set_footer(text=ctx.clock)
+        return e
 
     # ---------- Post/edit ----------
+    async def _post_pages(self, key: str, channel_id: Optional[int], pages: List[List[discord.Embed]]):
+        """
+        Post a board that spans several messages. Page 0 keeps the board's own
+        key, later pages are stored as ``key:N``; each page is fingerprinted on
+        its own so only changed pages are edited, and messages for pages the
+        board no longer needs are deleted.
+        """
+        if not channel_id:
+            return
+        for i, page in enumerate(pages):
+            await self._post_or_edit(_page_key(key, i), channel_id, embeds=page)
+        previous = self._state.get("pages", key, 1)
+        for i in range(len(pages), previous):
+            await self._delete_message(_page_key(key, i), channel_id)
+        if previous != len(pages):
+            self._state.set("pages", key, len(pages))
+
+    async def _delete_message(self, key: str, channel_id: int):
+        mid = self._state.get("message_ids", key)
+        channel = self.client.get_channel(channel_id)
+        if mid and channel is not None:
+            try:
+                msg = await channel.fetch_message(mid)
+                await msg.delete()
+            except discord.NotFound:
+                pass
+            except Exception:
+                log.exception("delete failed: %s", key)
+                return
+        self._state.delete("message_ids", key)
+        self._state.delete("fingerprints", key)
+
     async def _post_or_edit(self, key: str, channel_id: Optional[int], *, embed: Optional[discord.Embed] = None, embeds: Optional[List[discord.Embed]] = None):
         if not channel_id:
             return
@@ -468,21 +1172,35 @@ class BotManager:
         if channel is None:
             log.error("%s channel not found (%s)", key, channel_id)
             return
-        mid = self._msg_ids.get(key)
+        mid = self._state.get("message_ids", key)
+        fp = _fingerprint([embed] if embed else (embeds or []))
+        # {"fp", "channel", "checked"}: what the message shows, where, and
+        # when it was last seen to exist
+        stored = self._state.get("fingerprints", key)
+        unchanged = (mid and isinstance(stored, dict)
+                     and stored.get("fp") == fp and stored.get("channel") == channel_id)
+        now = time.time()
+        if unchanged and now - stored.get("checked", 0) < MESSAGE_CHECK_SECONDS:
+            return
         try:
             if mid:
                 msg = await channel.fetch_message(mid)
-                if embed:
-                    await msg.edit(embed=embed)
-                elif embeds:
-                    await msg.edit(embeds=embeds)
+                if not unchanged:
+                    if embed:
+                        await msg.edit(embed=embed)
+                    elif embeds:
+                        await msg.edit(embeds=embeds)
             else:
                 msg = await (channel.send(embed=embed) if embed else channel.send(embeds=embeds))
-                self._msg_ids[key] = msg.id
-                save_message_ids(self.cfg.general.message_id_file, self._msg_ids)  # <-- save
+                self._state.set("message_ids", key, msg.id)
+            self._state.set("fingerprints", key, {"fp": fp, "channel": channel_id, "checked": now})
+            self.timings.end("first_board")
         except discord.NotFound:
+            # deleted, or stored for another channel: post it anew
+            self._state.delete("fingerprints", key)
             msg = await (channel.send(embed=embed) if embed else channel.send(embeds=embeds))
-            self._msg_ids[key] = msg.id
-            save_message_ids(self.cfg.general.message_id_file, self._msg_ids)      # <-- save
+            self._state.set("message_ids", key, msg.id)
+            self._state.set("fingerprints", key, {"fp": fp, "channel": channel_id, "checked": now})
+            self.timings.end("first_board")
         except Exception:
             log.exception("edit/post failed: %s", key)
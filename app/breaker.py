@@ -0,0 +1,66 @@
+import time
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with exponential backoff.
+
+    closed     -> calls go through; ``threshold`` failures in a row open it
+    open       -> calls are refused until the backoff expires
+    half_open  -> one probe is let through; success closes, failure re-opens
+                  with a doubled backoff (capped at ``backoff_max``)
+    """
+
+    def __init__(self, threshold: int = 3, backoff: float = 5, backoff_max: float = 300):
+        self.threshold = threshold
+        self._backoff_base = backoff
+        self._backoff_max = backoff_max
+        self._backoff = backoff
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.retry_at = 0.0
+        self.last_error: str | None = None
+        self.last_success: float | None = None
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.time() >= self.retry_at:
+            self.state = "half_open"
+            return True
+        return False
+
+    def success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.last_success = time.time()
+        self._backoff = self._backoff_base
+
+    def failure(self, err: Exception | str) -> None:
+        self.failures += 1
+        self.last_error = str(err) or err.__class__.__name__
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "half_open":
+                self.opened_at = time.time()
+            else:
+                self._backoff = min(self._backoff * 2, self._backoff_max)
+            self.state = "open"
+            self.retry_at = time.time() + self._backoff
+
+    def retry_in(self) -> int:
+        if self.state != "open":
+            return 0
+        return max(0, int(round(self.retry_at - time.time())))
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": self.retry_in(),
+            "last_error": self.last_error,
+            "last_success": self.last_success,
+            "opened_at": self.opened_at,
+        }
@@ -0,0 +1,251 @@
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+log = logging.getLogger("cassette")
+
+FORMAT_VERSION = 1
+# config keys whose values never go into a cassette
+_SECRET_HINTS = ("token", "key", "password", "username")
+
+# (worker, seq) of the board cycle running in this task, if any; asyncio
+# tasks and to_thread calls inherit it, so calls are attributed to cycles
+_cycle: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar("cassette_cycle", default=None)
+# errors of the board cycle running in this task
+_errors: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("cassette_errors", default=None)
+_recorder: Optional["Recorder"] = None
+_player = None
+
+
+def _redact(data):
+    if isinstance(data, dict):
+        return {k: ("" if v and any(h in k for h in _SECRET_HINTS) else _redact(v)) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_redact(v) for v in data]
+    return data
+
+
+def _encode(o):
+    # slotted records (Torrent, LibraryItem) travel as their dicts
+    as_dict = getattr(o, "as_dict", None)
+    if as_dict is not None:
+        return {"__type__": type(o).__name__, **as_dict()}
+    return str(o)
+
+
+class Recorder:
+    """
+    Appends upstream interactions to a cassette: one JSON object per line.
+
+    ``header``     config in effect (secrets blanked), at every bot (re)start
+    ``cycle``      a board worker cycle starting, ``t`` seconds into the recording
+    ``cycle_end``  and finishing, with its wall time in ms and, if any,
+                   its errors: the exception it raised and the ERROR records
+                   logged inside it (the boards log and swallow most failures)
+    ``call``       one upstream request: kind (tautulli, arr, qbit, discord),
+                   op, args, latency, and the result or error; ``cycle`` is
+                   the seq of the cycle that made it, None outside cycles
+    ``event``      something that changes what the next cycle fetches
+                   (a Tautulli webhook invalidating the activity model)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "a", buffering=1, encoding="utf-8")
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        self._seq = 0
+
+    def _t(self) -> float:
+        return round(time.monotonic() - self._t0, 3)
+
+    def write(self, entry: dict) -> None:
+        line = json.dumps(entry, default=_encode, separators=(",", ":"))
+        with self._lock:
+            self._f.write(line + "\n")
+
+    def header(self, cfg) -> None:
+        self.write({"type": "header", "version": FORMAT_VERSION, "t": self._t(), "started_at": time.time(),
+                    "config": _redact(cfg.model_dump())})
+
+    def next_seq(self) -> int:
+        with self._lock:
+            self._seq += 1
+            return self._seq
+
+    def close(self) -> None:
+        with self._lock:
+            self._f.close()
+
+
+def start_recording(path: str, cfg) -> None:
+    """Record to ``path`` (appending) from now on; writes a header with ``cfg``."""
+    global _recorder
+    if _recorder is None or _recorder.path != path:
+        if _recorder is not None:
+            _recorder.close()
+        _recorder = Recorder(path)
+        _patch_discord()
+        log.warning("Recording upstream and Discord traffic to %s", path)
+    _recorder.header(cfg)
+
+
+def stop_recording() -> None:
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+
+
+def set_player(player) -> None:
+    """Serve upstream calls from ``player.serve(kind, op, args, cycle)`` instead of the network (replay)."""
+    global _player
+    _player = player
+
+
+def current_cycle() -> Optional[tuple]:
+    return _cycle.get()
+
+
+class _ErrorLog(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        errors = _errors.get()
+        if errors is not None:
+            errors.append(f"{record.name}: {record.getMessage()}")
+
+
+_error_log: Optional[_ErrorLog] = None
+
+
+def _collect_errors() -> None:
+    global _error_log
+    if _error_log is None:
+        _error_log = _ErrorLog()
+        logging.getLogger().addHandler(_error_log)
+
+
+@contextlib.contextmanager
+def cycle(worker: str, seq: Optional[int] = None):
+    """
+    Attribute the calls made inside to one cycle of ``worker``. Yields the
+    list the cycle's errors are collected in (None when neither recording
+    nor replaying).
+    """
+    rec = _recorder
+    if rec is None and _player is None:
+        yield None
+        return
+    if seq is None:
+        seq = rec.next_seq() if rec is not None else 0
+    _collect_errors()
+    errors: list = []
+    token = _cycle.set((worker, seq))
+    errors_token = _errors.set(errors)
+    started = time.perf_counter()
+    if rec is not None:
+        rec.write({"type": "cycle", "worker": worker, "seq": seq, "t": rec._t()})
+    try:
+        yield errors
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _errors.reset(errors_token)
+        _cycle.reset(token)
+        if rec is not None:
+            end = {"type": "cycle_end", "worker": worker, "seq": seq,
+                   "ms": round((time.perf_counter() - started) * 1e3, 2)}
+            if errors:
+                end["errors"] = errors
+            rec.write(end)
+
+
+def event(op: str) -> None:
+    rec = _recorder
+    if rec is not None:
+        rec.write({"type": "event", "op": op, "t": rec._t()})
+
+
+def _record(kind: str, op: str, args: dict, started: float, result=None, error: Optional[BaseException] = None,
+            keep_result: bool = True) -> None:
+    cur = _cycle.get()
+    entry = {"type": "call", "kind": kind, "op": op, "args": args, "cycle": cur[1] if cur else None,
+             "ms": round((time.perf_counter() - started) * 1e3, 2)}
+    if error is not None:
+        entry["error"] = f"{type(error).__name__}: {error}"
+    elif keep_result:
+        entry["result"] = result
+    try:
+        _recorder.write(entry)
+    except (OSError, ValueError) as e:
+        log.warning("Cassette write failed: %s", e)
+
+
+async def call(kind: str, op: str, args: dict, fn: Callable[[], Awaitable]) -> Any:
+    """Await ``fn()``, recording it, or answer from the cassette when replaying."""
+    if _player is not None:
+        return _player.serve(kind, op, args, _cycle.get())
+    if _recorder is None:
+        return await fn()
+    started = time.perf_counter()
+    try:
+        result = await fn()
+    except Exception as e:
+        _record(kind, op, args, started, error=e)
+        raise
+    _record(kind, op, args, started, result)
+    return result
+
+
+def call_sync(kind: str, op: str, args: dict, fn: Callable[[], Any]) -> Any:
+    """Blocking counterpart of ``call``."""
+    if _player is not None:
+        return _player.serve(kind, op, args, _cycle.get())
+    if _recorder is None:
+        return fn()
+    started = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as e:
+        _record(kind, op, args, started, error=e)
+        raise
+    _record(kind, op, args, started, result)
+    return result
+
+
+_discord_patched = False
+
+
+def _patch_discord() -> None:
+    """Count every Discord REST request (bot and webhook) by route; bodies are not kept."""
+    global _discord_patched
+    if _discord_patched:
+        return
+    _discord_patched = True
+    from discord.http import HTTPClient
+    from discord.webhook.async_ import AsyncWebhookAdapter
+
+    def wrap(request):
+        async def traced(self, route, *args, **kwargs):
+            if _recorder is None:
+                return await request(self, route, *args, **kwargs)
+            started = time.perf_counter()
+            op = f"{route.method} {route.path}"
+            try:
+                result = await request(self, route, *args, **kwargs)
+            except Exception as e:
+                _record("discord", op, {}, started, error=e)
+                raise
+            _record("discord", op, {}, started, keep_result=False)
+            return result
+        return traced
+
+    HTTPClient.request = wrap(HTTPClient.request)
+    AsyncWebhookAdapter.request = wrap(AsyncWebhookAdapter.request)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+import discord
+from discord import app_commands
+
+log = logging.getLogger("commands")
+
+# Discord drops an interaction that is not acknowledged within 3 seconds;
+# a deferred one may be followed up for 15 minutes, but nobody waits that long.
+REFRESH_TIMEOUT_SECONDS = 10
+
+BOARDS = {
+    "streams": "Current Plex streams",
+    "downloads": "Active qBittorrent downloads",
+    "stats": "Top users, movies and shows",
+}
+
+
+def register_commands(tree: app_commands.CommandTree, bot) -> None:
+    """Add one slash command per board, answered ephemerally from the bot's snapshot cache."""
+    for board, description in BOARDS.items():
+        tree.add_command(app_commands.Command(
+            name=board,
+            description=description,
+            callback=_callback(bot, board),
+        ))
+
+
+def _callback(bot, board: str):
+    async def callback(interaction: discord.Interaction):
+        await answer(bot, interaction, board)
+    return callback
+
+
+async def answer(bot, interaction: discord.Interaction, board: str) -> None:
+    snap = bot.snapshot(board)
+    if snap is not None and snap.age() <= bot.cfg.general.snapshot_max_age:
+        await interaction.response.send_message(embeds=snap.pages[0], ephemeral=True)
+        return
+
+    # Too old or never rendered: acknowledge now, refresh (shared with any
+    # other command asking for the same board), then follow up.
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        snap = await asyncio.wait_for(bot.refresh_snapshot(board), timeout=REFRESH_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        log.warning("/%s refresh timed out; answering from the last snapshot", board)
+        snap = bot.snapshot(board)
+    except Exception:
+        log.exception("/%s refresh failed", board)
+        snap = bot.snapshot(board)
+
+    if snap is None:
+        await interaction.followup.send(f"The {board} board is not available right now.", ephemeral=True)
+        return
+    await interaction.followup.send(embeds=snap.pages[0], ephemeral=True)
@@ -1,20 +1,33 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 
 class GeneralSettings(BaseModel):
     bot_token: str = Field("", description="Discord bot token")
     timezone: str = Field("Europe/Stockholm")
     update_seconds: int = Field(60, ge=10, le=3600)
-    stats_update_seconds: int = Field(86400, ge=300, le=604800)
+    stats_update_seconds: int = Field(900, ge=60, le=604800)
     qb_update_seconds: int = Field(120, ge=10, le=3600)
     plex_update_seconds: int = 3600
-    message_id_file: str = Field("/data/message_ids.json")
+    trends_update_seconds: int = Field(300, ge=60, le=86400)
+    message_id_file: str = Field("/data/message_ids.json", description="Legacy message ID file, imported once into the state database")
+    state_db: str = Field("/data/state.db", description="SQLite database for message IDs, render fingerprints and cache metadata")
     ca_cert_path: Optional[str] = None
+    public_url: Optional[str] = Field(None, description="Base URL Discord can reach this app on; enables the poster thumbnail cache")
+    api_token: Optional[str] = Field(None, description="Bearer token for the read-only snapshot API (/api/streams etc.) without an admin session")
+    webhook_token: Optional[str] = Field(None, description="Secret for the incoming Radarr/Sonarr/Tautulli webhooks (/webhooks/...); empty disables them")
+    transport: Literal["gateway", "webhook"] = Field("gateway", description="webhook: post boards through channel webhooks over REST, with no gateway connection (no slash commands)")
+    discord_profile: Literal["lean", "default"] = Field("lean", description="lean: guilds intent only, no message cache or member chunking; default: discord.py's stock client")
+    snapshot_max_age: int = Field(120, ge=10, le=3600, description="Slash commands re-render a board only when its last snapshot is older than this")
+    memory_budget_mb: Optional[int] = Field(None, ge=1, le=65536, description="Evict cached data, least valuable first, when in-process caches exceed this many MB (empty = no limit)")
+    trace_memory: bool = Field(False, description="Trace allocations with tracemalloc so /api/memory can list the top allocators (slows the bot down)")
     insecure_ssl: bool = False
 
 class PlexStreamsSettings(BaseModel):
     channel_id: Optional[int] = Field(None, description="Discord channel for Plex streams")
     post_thumbnails: bool = True
+    max_pages: int = Field(5, ge=1, le=20, description="Most messages the streams board may span (10 embeds each)")
+    compact_threshold: int = Field(20, ge=0, le=1000, description="Above this many sessions, show a compact table instead of an embed per stream (0 = never)")
+    activity_refresh_seconds: int = Field(300, ge=0, le=3600, description="Fetch Tautulli activity in full at most this often and extrapolate progress in between; the Tautulli webhook or a stream reaching its end forces an earlier fetch. Without it new, stopped and paused streams show up to this late, so it applies only once a webhook token is set (0 = every update)")
 
 class PlexChannels(BaseModel):
     movies_channel: Optional[int] = None
@@ -24,27 +37,54 @@ class PlexChannels(BaseModel):
 class StatisticsSettings(BaseModel):
     channel_id: Optional[int] = Field(None, description="Discord channel for daily stats (omit to disable)")
 
+class TrendsSettings(BaseModel):
+    channel_id: Optional[int] = Field(None, description="Discord channel for activity trends (omit to disable)")
+
 class ArrSettings(BaseModel):
     radarr_host: Optional[str] = None
     radarr_api_key: Optional[str] = None
     sonarr_host: Optional[str] = None
     sonarr_api_key: Optional[str] = None
 
+class TautulliServer(BaseModel):
+    name: str = Field("", description="Label on the boards; also keys this server's play history, so keep it stable")
+    url: str = ""
+    api_key: str = ""
+
 class QbitSettings(BaseModel):
     host: Optional[str] = None
     username: Optional[str] = None
     password: Optional[str] = None
     channel_id: Optional[int] = None
+    summary_threshold: int = Field(10, ge=0, le=100000, description="Above this many torrents, show queue totals, categories and a top-N instead of one embed each")
+    top_n: int = Field(5, ge=1, le=9, description="Torrents listed individually on the summary board")
+    sort_by: Literal["speed", "eta"] = Field("speed", description="Pick the top-N by download speed or by soonest ETA")
 
 class Settings(BaseModel):
     general: GeneralSettings = GeneralSettings()
     streams: PlexStreamsSettings = PlexStreamsSettings()
     plex_channels: PlexChannels = PlexChannels()
     stats: StatisticsSettings = StatisticsSettings()
+    trends: TrendsSettings = TrendsSettings()
     arr: ArrSettings = ArrSettings()
     qbit: QbitSettings = QbitSettings()
 
     # Tautulli (required for streams/stats)
     tautulli_url: str = ""
     tautulli_api_key: str = ""
+    tautulli_name: str = Field("", description="Label for this server when more than one is configured")
+    # Further Tautulli/Plex servers, merged into the same boards
+    tautulli_servers: List[TautulliServer] = []
+
+    def tautulli_sources(self) -> List[TautulliServer]:
+        """Every configured Tautulli server; the primary one (if set) first, with the empty history key."""
+        sources = []
+        if self.tautulli_url and self.tautulli_api_key:
+            sources.append(TautulliServer(name="", url=self.tautulli_url, api_key=self.tautulli_api_key))
+        names = {""}
+        for s in self.tautulli_servers:
+            if s.name and s.url and s.api_key and s.name not in names:
+                names.add(s.name)
+                sources.append(s)
+        return sources
 
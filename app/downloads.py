@@ -0,0 +1,52 @@
+import heapq
+from collections import defaultdict
+from typing import NamedTuple, Optional
+
+# qBittorrent reports this ETA for torrents that will never finish at the current rate
+ETA_INFINITE = 8640000
+
+
+class CategoryTotals(NamedTuple):
+    name: str
+    count: int
+    speed: int
+
+
+class DownloadSummary(NamedTuple):
+    count: int
+    speed: int                  # bytes/s, all torrents
+    left: int                   # bytes still to download
+    eta: Optional[int]          # seconds until the whole queue is done at the current rate
+    top: list                   # top-N torrents by the chosen key
+    categories: list            # CategoryTotals, largest first
+
+
+def _eta(t) -> int:
+    eta = getattr(t, "eta", 0) or 0
+    return eta if 0 < eta < ETA_INFINITE else ETA_INFINITE
+
+
+def summarize(torrents, top_n: int = 5, sort_by: str = "speed", max_categories: int = 10) -> DownloadSummary:
+    """
+    Aggregate a download queue in one pass. The top-N and the category list
+    are selected with bounded heaps, so a queue of thousands costs one linear
+    scan and the rendered board stays the same size.
+    """
+    speed = left = 0
+    cats: dict[str, list] = defaultdict(lambda: [0, 0])
+    for t in torrents:
+        s = getattr(t, "dlspeed", 0) or 0
+        speed += s
+        left += getattr(t, "amount_left", 0) or 0
+        c = cats[getattr(t, "category", "") or "Uncategorized"]
+        c[0] += 1
+        c[1] += s
+
+    if sort_by == "eta":
+        top = heapq.nsmallest(top_n, torrents, key=_eta)
+    else:
+        top = heapq.nlargest(top_n, torrents, key=lambda t: getattr(t, "dlspeed", 0) or 0)
+    categories = [CategoryTotals(name, n, s) for name, (n, s) in
+                  heapq.nlargest(max_categories, cats.items(), key=lambda kv: kv[1][0])]
+    eta = int(left / speed) if speed > 0 and left > 0 else None
+    return DownloadSummary(len(torrents), speed, left, eta, top, categories)
@@ -0,0 +1,30 @@
+import discord
+
+PROFILES = ("lean", "default")
+
+
+def client_options(profile: str = "lean") -> dict:
+    """
+    Keyword arguments for ``discord.Client``.
+
+    The boards only post and edit their own messages by ID, rename a few
+    status channels and answer slash commands, none of which needs gateway
+    events beyond the guild/channel cache that ``get_channel`` reads.
+    ``lean`` subscribes to just that and turns off the message cache and
+    member chunking; ``default`` is discord.py's stock client, kept for
+    comparison and as a fallback.
+    """
+    if profile == "default":
+        return {"intents": discord.Intents.default()}
+    intents = discord.Intents.none()
+    intents.guilds = True
+    return {
+        "intents": intents,
+        "max_messages": None,
+        "chunk_guilds_at_startup": False,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+    }
+
+
+def build_client(profile: str = "lean") -> discord.Client:
+    return discord.Client(**client_options(profile))
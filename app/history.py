@@ -0,0 +1,240 @@
+import asyncio
+import datetime
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+
+from app.memory import deep_sizeof
+
+log = logging.getLogger("history")
+
+PAGE_SIZE = 1000
+# Tautulli writes a row as its play stops; rows stopping this close together
+# may have been written in either order
+STOP_SLACK = 300
+WINDOWS = (30, 365)
+KINDS = ("users", "movies", "tv")
+_SCHEMA = (
+    "CREATE TABLE {}plays ("
+    " source TEXT NOT NULL DEFAULT '', row_id INTEGER NOT NULL, ts INTEGER NOT NULL,"
+    " user TEXT NOT NULL, kind TEXT NOT NULL, item TEXT NOT NULL, counted INTEGER NOT NULL,"
+    " PRIMARY KEY (source, row_id))"
+)
+
+
+def _day(ts: int) -> int:
+    return int(ts) // 86400
+
+
+class PlayHistory:
+    """
+    Local copy of Tautulli's play history with rolling leaderboards.
+
+    History is ingested incrementally: each run pages through ``get_history``
+    by stop time, newest first, keeping rows above the highest row id already
+    stored (the cursor) until it is past the first stored row it meets, so
+    Tautulli never aggregates a year of history for us. Row ids follow stop
+    times, not start times: a long play that started before the cursor row
+    still has a higher id and is picked up. A page that fails aborts the run
+    without storing anything, so the cursor never skips rows. Plays are
+    bucketed per day in memory and the 30/365-day totals are maintained by
+    adding new plays and subtracting days as they fall out of the window,
+    making a leaderboard a ``most_common`` over a small Counter.
+
+    Grouped sessions (resumes) are counted once, on the row whose id equals
+    its ``reference_id``, matching Tautulli's own play counts.
+
+    Rows are keyed by source (the Tautulli server's name, "" for the
+    primary one) and row id, each source with its own cursor; the
+    leaderboards add up plays from every source.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # one ingest per source at a time: two would read the same cursor
+        self._ingesting: dict[str, asyncio.Lock] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+        self._conn.execute(_SCHEMA.format("IF NOT EXISTS "))
+        self._conn.execute("CREATE INDEX IF NOT EXISTS plays_ts ON plays (ts)")
+        self._conn.commit()
+        self._days: dict[int, dict[str, Counter]] = defaultdict(lambda: {k: Counter() for k in KINDS})
+        self._totals = {w: {k: Counter() for k in KINDS} for w in WINDOWS}
+        self._edge = {w: _day(time.time()) - w + 1 for w in WINDOWS}
+        self._load()
+
+    # ---------- Queries ----------
+    def top(self, kind: str, days: int, n: int = 5) -> list[dict]:
+        """Top ``n`` for a window, shaped like Tautulli's get_home_stats rows."""
+        self._advance(_day(time.time()))
+        key = "user" if kind == "users" else "title"
+        return [{key: name, "total_plays": plays} for name, plays in self._totals[days][kind].most_common(n)]
+
+    def cursor(self, source: str = "") -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(row_id) FROM plays WHERE source = ?", (source,)).fetchone()
+        return int(row[0] or 0)
+
+    def _migrate(self) -> None:
+        """Single-server databases keyed plays by row id alone; their rows become the primary source's."""
+        cols = [r[1] for r in self._conn.execute("PRAGMA table_info(plays)")]
+        if not cols or "source" in cols:
+            return
+        with self._conn:
+            self._conn.execute("DROP INDEX IF EXISTS plays_ts")
+            self._conn.execute("ALTER TABLE plays RENAME TO plays_v1")
+            self._conn.execute(_SCHEMA.format(""))
+            self._conn.execute(
+                "INSERT INTO plays (source, row_id, ts, user, kind, item, counted)"
+                " SELECT '', row_id, ts, user, kind, item, counted FROM plays_v1"
+            )
+            self._conn.execute("DROP TABLE plays_v1")
+        log.info("Play history migrated to per-server rows")
+
+    # ---------- Ingestion ----------
+    async def ingest(self, tautulli, source: str = "") -> int:
+        """Pull ``source``'s history rows newer than its cursor; returns how many were added."""
+        async with self._ingesting.setdefault(source, asyncio.Lock()):
+            return await self._ingest(tautulli, source)
+
+    async def _ingest(self, tautulli, source: str) -> int:
+        cursor = await asyncio.to_thread(self.cursor, source)
+        after = None
+        if not cursor:
+            after = (datetime.date.today() - datetime.timedelta(days=max(WINDOWS))).isoformat()
+        fresh: dict[int, tuple] = {}
+        floor = None
+        start = 0
+        while True:
+            rows = await tautulli.get_history(start=start, length=PAGE_SIZE, after=after)
+            if rows is None:
+                log.warning("History page at %d%s failed; will retry from cursor %d", start,
+                            f" from {source}" if source else "", cursor)
+                return 0
+            done = False
+            for r in rows:
+                rid = int(r.get("row_id") or r.get("id") or 0)
+                stopped = self._stopped(r)
+                if rid > cursor:
+                    play = self._parse(rid, r)
+                    if play is not None:
+                        fresh[rid] = play
+                elif floor is None:
+                    floor = stopped
+                elif stopped < floor - STOP_SLACK:
+                    done = True
+                    break
+            if done or len(rows) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+        if not fresh:
+            return 0
+        fresh = await asyncio.to_thread(self._insert, source, list(fresh.values()))
+        if not fresh:
+            return 0
+        for _, ts, user, kind, item, counted in fresh:
+            if counted:
+                self._add(_day(ts), user, kind, item)
+        log.info("Ingested %d history rows%s (cursor %d -> %d)", len(fresh),
+                 f" from {source}" if source else "", cursor, max(p[0] for p in fresh))
+        return len(fresh)
+
+    @staticmethod
+    def _stopped(r: dict) -> int:
+        try:
+            return int(r.get("stopped") or r.get("date") or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def _parse(rid: int, r: dict):
+        try:
+            ts = int(r.get("date") or r.get("started") or 0)
+        except (TypeError, ValueError):
+            return None
+        if not rid or not ts:
+            return None
+        media_type = r.get("media_type") or ""
+        if media_type == "movie":
+            kind, item = "movies", r.get("title") or r.get("full_title") or ""
+        elif media_type == "episode":
+            kind, item = "tv", r.get("grandparent_title") or r.get("full_title") or ""
+        else:
+            kind, item = media_type or "other", r.get("full_title") or r.get("title") or ""
+        user = r.get("friendly_name") or r.get("user") or ""
+        ref = r.get("reference_id")
+        counted = 1 if ref in (None, "", rid) or str(ref) == str(rid) else 0
+        return (rid, ts, user, kind, item, counted)
+
+    def _insert(self, source: str, rows: list) -> list:
+        """Store ``rows``; returns those that were not stored already, the only ones to count."""
+        cutoff = int(time.time()) - (max(WINDOWS) + 1) * 86400
+        inserted = []
+        with self._lock:
+            with self._conn:
+                for r in rows:
+                    cur = self._conn.execute(
+                        "INSERT OR IGNORE INTO plays (source, row_id, ts, user, kind, item, counted)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (source, *r),
+                    )
+                    if cur.rowcount:
+                        inserted.append(r)
+                # keep each source's cursor row even if it is ancient
+                self._conn.execute(
+                    "DELETE FROM plays WHERE source = ? AND ts < ?"
+                    " AND row_id < (SELECT MAX(row_id) FROM plays WHERE source = ?)",
+                    (source, cutoff, source),
+                )
+        return inserted
+
+    # ---------- Rolling aggregates ----------
+    def _load(self) -> None:
+        first = _day(time.time()) - max(WINDOWS) + 1
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts / 86400 AS day, user, kind, item, COUNT(*) FROM plays"
+                " WHERE counted = 1 AND ts >= ? GROUP BY day, user, kind, item",
+                (first * 86400,),
+            ).fetchall()
+        for day, user, kind, item, n in rows:
+            self._add(int(day), user, kind, item, n)
+
+    def _add(self, day: int, user: str, kind: str, item: str, n: int = 1) -> None:
+        if day < min(self._edge.values()):
+            return
+        bucket = self._days[day]
+        bucket["users"][user] += n
+        if kind in ("movies", "tv"):
+            bucket[kind][item] += n
+        for w in WINDOWS:
+            if day >= self._edge[w]:
+                self._totals[w]["users"][user] += n
+                if kind in ("movies", "tv"):
+                    self._totals[w][kind][item] += n
+
+    def _advance(self, today: int) -> None:
+        for w in WINDOWS:
+            edge = today - w + 1
+            for day in range(self._edge[w], edge):
+                bucket = self._days.get(day)
+                if bucket:
+                    for k in KINDS:
+                        self._totals[w][k].subtract(bucket[k])
+                        self._totals[w][k] = +self._totals[w][k]
+            self._edge[w] = max(self._edge[w], edge)
+        oldest = min(self._edge.values())
+        for day in [d for d in self._days if d < oldest]:
+            del self._days[day]
+
+    def nbytes(self) -> int:
+        """Memory held by the per-day buckets and window totals."""
+        return deep_sizeof((self._days, self._totals))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
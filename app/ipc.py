@@ -0,0 +1,338 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+from typing import Optional
+
+from app.config import Settings
+from app.snapshots import Snapshot, SnapshotCache
+
+log = logging.getLogger("ipc")
+
+STATE_POLL_SECONDS = 1
+CALL_TIMEOUT_SECONDS = 10
+# reload/restart wait for upstream clients and the Discord login
+SLOW_CALL_TIMEOUT_SECONDS = 120
+RECONNECT_SECONDS = 1
+RECONNECT_MAX_SECONDS = 30
+# a snapshot body travels as one line
+LINE_LIMIT = 16 * 2**20
+
+
+def _encode(msg: dict) -> bytes:
+    return json.dumps(msg, default=str).encode() + b"\n"
+
+
+def _snapshot_event(snap: Snapshot) -> dict:
+    return {
+        "event": "snapshot", "board": snap.board, "etag": snap.etag, "body": snap.body.decode(),
+        "taken_at": snap.taken_at, "changed_at": snap.changed_at,
+    }
+
+
+class IpcServer:
+    """
+    Bot side of the two-process mode: answers admin processes over a Unix
+    socket in newline-delimited JSON.
+
+    A request is ``{"id", "op", "args"}`` and its reply ``{"id", "ok",
+    "result"}`` or ``{"id", "ok": false, "error"}``; replies may arrive out
+    of order, since a reload can take a while. A connection that sends the
+    ``subscribe`` op is also pushed ``{"event": "state"}`` whenever the
+    bot's status, timings or config change, and ``{"event": "snapshot"}``
+    for every snapshot at once and then for each one that changes.
+    """
+
+    def __init__(self, bot, path: str):
+        self.bot = bot
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._ops = {
+            "metrics": self._metrics,
+            "memory": self._memory,
+            "trends": self._trends,
+            "thumbnail": self._thumbnail,
+            "arr_event": self._arr_event,
+            "activity_changed": self._activity_changed,
+            "reload": self._reload,
+            "restart": self._restart,
+            "state": self._get_state,
+        }
+
+    async def start(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            # left behind by a previous run
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path, limit=LINE_LIMIT)
+        os.chmod(self.path, 0o600)
+        log.info("IPC listening on %s", self.path)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        for w in list(self._writers):
+            w.close()
+        for t in list(self._tasks):
+            t.cancel()
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    def _spawn(self, coro) -> asyncio.Task:
+        t = asyncio.create_task(coro)
+        self._tasks.add(t)
+        t.add_done_callback(self._tasks.discard)
+        return t
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # replies and pushed events share the stream; one line at a time
+        lock = asyncio.Lock()
+
+        async def send(msg: dict) -> None:
+            async with lock:
+                writer.write(_encode(msg))
+                await writer.drain()
+
+        pushers = []
+        self._writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    req = json.loads(line)
+                except ValueError:
+                    log.warning("Ignoring malformed IPC request")
+                    continue
+                if req.get("op") == "subscribe":
+                    pushers.append(self._spawn(self._push(send)))
+                    await send({"id": req.get("id"), "ok": True, "result": None})
+                else:
+                    self._spawn(self._answer(req, send))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            log.info("IPC connection dropped: %s", e)
+        finally:
+            for t in pushers:
+                t.cancel()
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _answer(self, req: dict, send) -> None:
+        op = req.get("op")
+        try:
+            handler = self._ops.get(op)
+            if handler is None:
+                raise ValueError(f"unknown op {op!r}")
+            msg = {"id": req.get("id"), "ok": True, "result": await handler(**(req.get("args") or {}))}
+        except Exception as e:
+            log.warning("IPC %s failed: %s", op, e)
+            msg = {"id": req.get("id"), "ok": False, "error": str(e)}
+        try:
+            await send(msg)
+        except (ConnectionError, RuntimeError):
+            pass
+
+    async def _push(self, send) -> None:
+        queue = self.bot.snapshots.subscribe()
+        try:
+            for snap in self.bot.snapshots.all():
+                await send(_snapshot_event(snap))
+            sent = None
+            while True:
+                state = self._state()
+                if state != sent:
+                    sent = state
+                    await send({"event": "state", "state": state})
+                try:
+                    snap = await asyncio.wait_for(queue.get(), timeout=STATE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    continue
+                await send(_snapshot_event(snap))
+        except (ConnectionError, RuntimeError):
+            pass
+        finally:
+            self.bot.snapshots.unsubscribe(queue)
+
+    # ---------- Ops ----------
+    def _state(self) -> dict:
+        bot = self.bot
+        return {
+            "status": bot.status,
+            "last_error": bot.last_error,
+            "timings": bot.timings.report(),
+            "config": bot.cfg.model_dump() if bot.cfg else None,
+        }
+
+    async def _get_state(self) -> dict:
+        return self._state()
+
+    async def _metrics(self) -> dict:
+        return self.bot.metrics()
+
+    async def _memory(self) -> dict:
+        return await self.bot.memory_report()
+
+    async def _trends(self, resolution: str = "1h", points: int = 24) -> dict:
+        return self.bot.trends_report(resolution, points)
+
+    async def _thumbnail(self, key: str):
+        return await self.bot.thumbnail(key)
+
+    async def _arr_event(self, service: str, payload: dict) -> str:
+        return await self.bot.arr_event(service, payload)
+
+    async def _activity_changed(self) -> str:
+        return await self.bot.activity_changed()
+
+    async def _reload(self, config: dict) -> None:
+        await self.bot.reload(Settings(**config))
+
+    async def _restart(self, config: dict) -> None:
+        await self.bot.restart(Settings(**config))
+
+
+class _MirroredTimings:
+    def __init__(self):
+        self.data = {"phases": {}, "complete": False}
+
+    def report(self) -> dict:
+        return self.data
+
+
+class BotProxy:
+    """
+    Admin side of the two-process mode: stands in for ``BotManager`` in
+    ``build_app``. Status, start-up timings, config and snapshots are
+    mirrored from what the bot process pushes, so page renders and the
+    snapshot API never wait on IPC; metrics, trends, memory, thumbnails,
+    webhooks and reload/restart are calls. Reconnects, and re-subscribes,
+    whenever the bot process restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.status = "stopped"
+        self.last_error: Optional[str] = "Bot process not connected"
+        self.cfg: Optional[Settings] = None
+        self.timings = _MirroredTimings()
+        self.snapshots = SnapshotCache()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        delay = RECONNECT_SECONDS
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=LINE_LIMIT)
+            except OSError as e:
+                self.last_error = f"Bot process unreachable: {e}"
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+                continue
+            delay = RECONNECT_SECONDS
+            log.info("Connected to bot process at %s", self.path)
+            self._writer = writer
+            reading = asyncio.create_task(self._read(reader))
+            try:
+                await self._call("subscribe")
+                await reading
+            except Exception as e:
+                log.warning("Bot process connection failed: %s", e)
+            finally:
+                self._writer = None
+                reading.cancel()
+                writer.close()
+                for fut in self._pending.values():
+                    if not fut.done():
+                        fut.set_exception(RuntimeError("Bot process connection lost"))
+                self._pending.clear()
+                # don't serve another process's stale boards; it resends them on reconnect
+                self.snapshots.clear()
+                self.status = "stopped"
+                self.last_error = "Bot process connection lost"
+            await asyncio.sleep(delay)
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            msg = json.loads(line)
+            if "event" in msg:
+                self._on_event(msg)
+                continue
+            fut = self._pending.pop(msg.get("id"), None)
+            if fut is None or fut.done():
+                continue
+            if msg.get("ok"):
+                fut.set_result(msg.get("result"))
+            else:
+                fut.set_exception(RuntimeError(msg.get("error") or "bot process error"))
+
+    def _on_event(self, msg: dict) -> None:
+        if msg["event"] == "state":
+            state = msg["state"]
+            self.status = state["status"]
+            self.last_error = state["last_error"]
+            self.timings.data = state["timings"]
+            self.cfg = Settings(**state["config"]) if state["config"] else None
+        elif msg["event"] == "snapshot":
+            self.snapshots.restore(Snapshot(
+                msg["board"], None, msg["body"].encode(), msg["etag"], msg["taken_at"], msg["changed_at"],
+            ))
+
+    async def _call(self, op: str, timeout: float = CALL_TIMEOUT_SECONDS, **args):
+        writer = self._writer
+        if writer is None:
+            raise RuntimeError(self.last_error or "Bot process not connected")
+        rid = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[rid] = fut
+        try:
+            writer.write(_encode({"id": rid, "op": op, "args": args}))
+            await writer.drain()
+            return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"Bot process did not answer {op} within {timeout:.0f}s")
+        finally:
+            self._pending.pop(rid, None)
+
+    # ---------- BotManager surface used by the admin app ----------
+    async def metrics(self) -> dict:
+        return await self._call("metrics")
+
+    async def memory_report(self) -> dict:
+        return await self._call("memory")
+
+    async def trends_report(self, resolution: str = "1h", points: int = 24) -> dict:
+        return await self._call("trends", resolution=resolution, points=points)
+
+    async def thumbnail(self, key: str) -> Optional[tuple[str, str]]:
+        try:
+            found = await self._call("thumbnail", key=key)
+        except RuntimeError as e:
+            log.warning("Thumbnail %s unavailable: %s", key, e)
+            return None
+        return tuple(found) if found else None
+
+    async def arr_event(self, service: str, payload: dict) -> str:
+        return await self._call("arr_event", service=service, payload=payload)
+
+    async def activity_changed(self) -> str:
+        return await self._call("activity_changed")
+
+    async def reload(self, cfg: Settings) -> None:
+        await self._call("reload", timeout=SLOW_CALL_TIMEOUT_SECONDS, config=cfg.model_dump())
+
+    async def restart(self, cfg: Settings) -> None:
+        await self._call("restart", timeout=SLOW_CALL_TIMEOUT_SECONDS, config=cfg.model_dump())
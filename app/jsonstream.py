@@ -0,0 +1,92 @@
+import codecs
+import json
+import re
+from typing import Iterable, Iterator
+
+# Optional decoders, used when installed: ijson (with its yajl2 C backend)
+# streams array elements straight off the socket; orjson decodes whole
+# documents several times faster than the json module.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_BYTES = 64 * 1024
+_WS = re.compile(r"[ \t\n\r]*")
+
+
+def loads(data: bytes):
+    """Decode a whole JSON document."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_array(chunks: Iterable[bytes]) -> Iterator:
+    """
+    Yield the elements of a top-level JSON array as the bytes arrive, so
+    only one element (plus a chunk of input) is ever decoded and held at a
+    time. Elements are decoded with the json module's C scanner; a chunk
+    boundary inside an element just means it is retried with more input.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    source = iter(chunks)
+    buf = ""
+    pos = 0
+    started = False
+
+    def more() -> bool:
+        nonlocal buf, pos
+        for chunk in source:
+            text = utf8.decode(chunk)
+            if text:
+                buf, pos = buf[pos:] + text, 0
+                return True
+        tail = utf8.decode(b"", final=True)
+        if tail:
+            buf, pos = buf[pos:] + tail, 0
+            return True
+        return False
+
+    while True:
+        pos = _WS.match(buf, pos).end()
+        if pos >= len(buf):
+            if not more():
+                raise ValueError("truncated JSON array" if started else "empty JSON document")
+            continue
+        c = buf[pos]
+        if not started:
+            if c != "[":
+                raise ValueError("expected a JSON array")
+            started = True
+            pos += 1
+            continue
+        if c == "]":
+            return
+        if c == ",":
+            pos += 1
+            continue
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if not more():
+                raise
+            continue
+        if end >= len(buf) and more():
+            # a bare number may continue in the next chunk; decode it again
+            continue
+        pos = end
+        yield value
+
+
+def iter_response_array(resp) -> Iterator:
+    """Stream the elements of a JSON array from a ``requests`` response opened with ``stream=True``."""
+    if ijson is not None:
+        resp.raw.decode_content = True
+        return ijson.items(resp.raw, "item", use_float=True)
+    return iter_array(resp.iter_content(CHUNK_BYTES))
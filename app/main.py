@@ -1,20 +1,60 @@
-import asyncio, logging
+import time
+_T0 = time.perf_counter()
+
+import asyncio, logging, os
 import uvicorn
 from app.admin import build_app
 from app.store import load_config, load_admin
-from app.bot import BotManager
+from app.timing import StartupTimer
 
 logging.basicConfig(level=logging.INFO)
 
-bot = BotManager()
-app = build_app(bot)
+# all:   bot and admin app in one process (default)
+# bot:   the Discord bot alone, serving admin processes on IPC_SOCKET (python -m app.main)
+# admin: the admin app alone, talking to a bot process; safe to run with uvicorn --workers N
+ROLE = os.environ.get("MEDIABOT_ROLE", "all")
+IPC_SOCKET = os.environ.get("MEDIABOT_IPC_SOCKET", "/data/bot.sock")
+# append upstream and Discord traffic to this cassette, for python -m bench.replay
+RECORD = os.environ.get("MEDIABOT_RECORD") or None
+
+timings = StartupTimer(_T0)
+if ROLE == "admin":
+    from app.ipc import BotProxy
+    bot = BotProxy(IPC_SOCKET)
+else:
+    # only a process that runs the bot pays for discord.py and the board stack
+    from app.bot import BotManager
+    bot = BotManager(timings, record=RECORD)
+app = build_app(bot) if ROLE != "bot" else None
+timings.end("import")
+
+if app is not None:
+    @app.on_event("startup")
+    async def startup():
+        if ROLE == "admin":
+            bot.start()
+            return
+        timings.begin("config_load")
+        cfg = load_config()
+        timings.end("config_load")
+        # Start bot only if a setup exists or you can still run (it simply won't start without token)
+        asyncio.create_task(bot.start(cfg))
 
-@app.on_event("startup")
-async def startup():
+
+async def run_bot():
+    """Bot process of the two-process mode: the bot and its IPC server, no web app."""
+    from app.ipc import IpcServer
+    server = IpcServer(bot, IPC_SOCKET)
+    await server.start()
+    timings.begin("config_load")
     cfg = load_config()
-    # Start bot only if a setup exists or you can still run (it simply won't start without token)
-    asyncio.create_task(bot.start(cfg))
+    timings.end("config_load")
+    await bot.start(cfg)
+    await asyncio.Event().wait()
 
-if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8080, reload=False)
 
+if __name__ == "__main__":
+    if ROLE == "bot":
+        asyncio.run(run_bot())
+    else:
+        uvicorn.run("app.main:app", host="0.0.0.0", port=8080, reload=False)
@@ -0,0 +1,169 @@
+import logging
+import sys
+import tracemalloc
+from typing import Callable, Optional
+
+log = logging.getLogger("memory")
+
+TRACE_FRAMES = 1
+TOP_ALLOCATORS = 15
+_ATOMS = (str, bytes, bytearray, int, float, complex, bool, type(None))
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """
+    Approximate bytes held by ``obj`` and everything reachable from it
+    through containers, ``__dict__`` and ``__slots__``. Objects whose ids
+    are in ``seen`` are skipped, so callers can exclude data they share
+    with another cache.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, _ATOMS) or isinstance(o, type) or callable(o):
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        else:
+            d = getattr(o, "__dict__", None)
+            if d is not None:
+                stack.append(d)
+            for cls in type(o).__mro__:
+                slots = cls.__dict__.get("__slots__", ())
+                for name in (slots,) if isinstance(slots, str) else slots:
+                    v = getattr(o, name, None)
+                    if v is not None:
+                        stack.append(v)
+    return total
+
+
+def rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def set_tracing(enabled: bool) -> None:
+    """Start or stop tracemalloc; it slows every allocation down, so it is opt-in."""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+        log.info("tracemalloc started")
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+        log.info("tracemalloc stopped")
+
+
+def top_allocators(limit: int = TOP_ALLOCATORS) -> Optional[list]:
+    """Source lines holding the most traced memory, or None when tracing is off. Slow; run off the loop."""
+    if not tracemalloc.is_tracing():
+        return None
+    snap = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    return [
+        {"where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "bytes": s.size, "count": s.count}
+        for s in snap.statistics("lineno")[:limit]
+    ]
+
+
+class _Account:
+    __slots__ = ("name", "priority", "size", "evict")
+
+    def __init__(self, name: str, priority: int, size: Callable[[], int], evict: Optional[Callable[[int], int]]):
+        self.name = name
+        self.priority = priority
+        self.size = size
+        self.evict = evict
+
+
+class MemoryBudget:
+    """
+    Per-cache accounting against one global budget.
+
+    Each cache registers a callable reporting its size in bytes and, if it
+    can shed data, one that frees at least the given number of bytes (least
+    valuable entries first) and returns how many it freed. ``enforce``
+    evicts from the lowest-priority caches first until the accounted total
+    fits the budget. Caches without an evict callable are reported only.
+
+    Sizing walks every cache, so ``sizes`` only reads: callers on the event
+    loop run it with ``asyncio.to_thread`` and hand the result to
+    ``enforce`` or ``report``. Evictions mutate the caches and stay on the loop.
+    """
+
+    def __init__(self):
+        self._accounts: dict[str, _Account] = {}
+        self.evictions: dict[str, int] = {}
+
+    def register(self, name: str, size: Callable[[], int], evict: Optional[Callable[[int], int]] = None,
+                 priority: int = 0) -> None:
+        self._accounts[name] = _Account(name, priority, size, evict)
+
+    def sizes(self) -> dict[str, int]:
+        out = {}
+        for name, acct in self._accounts.items():
+            try:
+                out[name] = int(acct.size() or 0)
+            except Exception as e:
+                log.warning("Sizing %s failed: %s", name, e)
+                out[name] = 0
+        return out
+
+    def enforce(self, budget: int, sizes: Optional[dict[str, int]] = None) -> dict[str, int]:
+        """Evict until the accounted total is within ``budget`` bytes; returns bytes freed per cache."""
+        sizes = self.sizes() if sizes is None else sizes
+        total = sum(sizes.values())
+        freed: dict[str, int] = {}
+        if total <= budget:
+            return freed
+        for acct in sorted(self._accounts.values(), key=lambda a: a.priority):
+            excess = total - budget
+            if excess <= 0:
+                break
+            if acct.evict is None or not sizes.get(acct.name):
+                continue
+            try:
+                n = int(acct.evict(excess) or 0)
+            except Exception as e:
+                log.warning("Evicting from %s failed: %s", acct.name, e)
+                continue
+            if n:
+                freed[acct.name] = n
+                self.evictions[acct.name] = self.evictions.get(acct.name, 0) + 1
+                total -= n
+        if total > budget:
+            log.warning("Caches still use %.1f MB after eviction (budget %.1f MB)", total / 2**20, budget / 2**20)
+        return freed
+
+    def report(self, budget: Optional[int], sizes: Optional[dict[str, int]] = None) -> dict:
+        sizes = self.sizes() if sizes is None else sizes
+        return {
+            "budget_bytes": budget,
+            "accounted_bytes": sum(sizes.values()),
+            "rss_bytes": rss_bytes(),
+            "caches": {
+                name: {
+                    "bytes": sizes[name],
+                    "priority": acct.priority,
+                    "evictable": acct.evict is not None,
+                    "evictions": self.evictions.get(name, 0),
+                }
+                for name, acct in self._accounts.items()
+            },
+        }
@@ -0,0 +1,211 @@
+import copy
+import datetime
+from functools import lru_cache
+
+import pytz
+
+
+def _int(x, default: int = 0) -> int:
+    try:
+        if x in (None, "", "None"):
+            return default
+        return int(float(x))
+    except (TypeError, ValueError):
+        return default
+
+
+def _float(x, default: float = 0.0) -> float:
+    try:
+        return float(x or 0)
+    except (TypeError, ValueError):
+        return default
+
+
+@lru_cache(maxsize=32)
+def _timezone(name: str):
+    return pytz.timezone(name)
+
+
+class RenderContext:
+    """Timezone and wall clock resolved once per render cycle and shared by every embed."""
+
+    __slots__ = ("tz", "now", "clock")
+
+    def __init__(self, tz_name: str, now: datetime.datetime | None = None):
+        self.tz = _timezone(tz_name)
+        self.now = now or datetime.datetime.now(self.tz)
+        day = self.now.day
+        suffix = "th" if 11 <= day <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
+        self.clock = self.now.strftime(f"%d{suffix} %B %H:%M")
+
+    def eta(self, seconds: int) -> str:
+        return (self.now + datetime.timedelta(seconds=seconds)).strftime("%H:%M %Z")
+
+    def hhmm(self, ts: float) -> str:
+        return datetime.datetime.fromtimestamp(ts, self.tz).strftime("%H:%M")
+
+
+class StreamSession:
+    """
+    A Tautulli activity session with the fields the boards use, converted
+    once when the payload arrives instead of on every ``sess.get`` in the
+    builders.
+    """
+
+    __slots__ = (
+        "server", "server_key", "session_key", "full_title", "title", "grandparent_title", "summary", "user", "state", "media_type",
+        "year", "season", "episode", "progress", "duration_ms", "view_offset_ms", "remaining_s",
+        "transcode", "decision", "stream", "bandwidth",
+        "thumb", "grandparent_thumb", "tvdb_id", "imdb_id", "tmdb_id",
+    )
+
+    @classmethod
+    def from_tautulli(cls, d: dict) -> "StreamSession":
+        s = cls.__new__(cls)
+        g = d.get
+        # set by TautulliGroup: the server's label and its client key
+        s.server = g("server") or ""
+        s.server_key = g("server_key") or ""
+        s.session_key = str(g("session_key") or g("session_id") or "")
+        s.full_title = g("full_title") or None
+        s.title = g("title") or None
+        s.grandparent_title = g("grandparent_title") or None
+        s.summary = (g("summary") or "")[:1000]
+        s.user = g("friendly_name") or "—"
+        s.state = str(g("state") or "").lower()
+        s.media_type = g("media_type") or ""
+        s.year = g("year") or None
+        s.season = g("parent_media_index") or None
+        s.episode = g("media_index") or None
+
+        duration = _int(g("duration"))
+        total = duration or _int(g("media_duration"))
+        viewed = _int(g("view_offset"))
+        pct = _float(g("progress_percent"))
+        if duration > 0:
+            s.progress = max(0, min(100, int(round(viewed / duration * 100))))
+        else:
+            s.progress = int(round(pct))
+        if viewed <= 0 and total > 0:
+            viewed = int(total * pct / 100.0)
+        s.duration_ms = total
+        s.view_offset_ms = viewed
+        s.remaining_s = max(0, (total - viewed) // 1000)
+
+        decision = g("transcode_decision") or ""
+        s.transcode = decision.lower() == "transcode"
+        s.decision = (decision or "Direct Play").capitalize()
+        vcodec = (g("video_codec") or "—").upper()
+        vres = g("video_resolution") or ""
+        vdr = g("video_dynamic_range") or ""
+        s.stream = f"{s.decision} ({vcodec} {vres}{' ' + vdr if vdr else ''})".strip()
+        s.bandwidth = _int(g("bandwidth"))
+
+        s.thumb = g("thumb") or None
+        s.grandparent_thumb = g("grandparent_thumb") or None
+        s.tvdb_id = g("tvdb_id") or None
+        s.imdb_id = g("imdb_id") or None
+        s.tmdb_id = g("tmdb_id") or None
+        return s
+
+    _PUBLIC = ("server", "full_title", "user", "state", "media_type", "year", "season", "episode", "progress",
+               "duration_ms", "remaining_s", "transcode", "decision", "stream", "bandwidth")
+
+    @property
+    def paused(self) -> bool:
+        return self.state == "paused"
+
+    def as_dict(self) -> dict:
+        """JSON-ready view for the snapshot API (no summaries or Plex-internal paths)."""
+        return {k: getattr(self, k) for k in self._PUBLIC}
+
+    def advanced(self, seconds: float) -> "StreamSession":
+        """This session ``seconds`` later, assuming playback carries on at normal speed."""
+        if self.state != "playing" or seconds <= 0 or self.duration_ms <= 0:
+            return self
+        s = copy.copy(self)
+        s.view_offset_ms = min(self.duration_ms, self.view_offset_ms + int(seconds * 1000))
+        s.progress = max(0, min(100, int(round(s.view_offset_ms / self.duration_ms * 100))))
+        s.remaining_s = (self.duration_ms - s.view_offset_ms) // 1000
+        return s
+
+    def eta_or_left(self, ctx: RenderContext) -> tuple[str, str]:
+        if self.duration_ms <= 0:
+            return ("ETA" if self.state == "playing" else "Left", "—")
+        rem = self.remaining_s
+        if self.state in ("playing", "buffering"):
+            return ("ETA", ctx.eta(rem))
+        if rem <= 0:
+            return ("Left", "0m left")
+        h, m = rem // 3600, (rem % 3600) // 60
+        return ("Left", f"{h}h {m}m left" if h else f"{m}m left")
+
+
+class Torrent:
+    """The downloading-torrent fields the downloads board reads, copied out of qbittorrent-api's dict wrapper."""
+
+    __slots__ = ("name", "progress", "dlspeed", "eta", "amount_left", "category", "state")
+
+    @classmethod
+    def from_qbit(cls, d) -> "Torrent":
+        t = cls.__new__(cls)
+        g = d.get
+        t.name = g("name") or ""
+        t.progress = g("progress") or 0.0
+        t.dlspeed = g("dlspeed") or 0
+        t.eta = g("eta") or 0
+        t.amount_left = g("amount_left") or 0
+        t.category = g("category") or ""
+        t.state = (g("state") or "").lower()
+        return t
+
+    def as_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+def remote_poster(images) -> str | None:
+    """An arr item's poster URL: its "poster" cover, else any cover with a remote URL."""
+    images = images or []
+    for im in images:
+        if im.get("coverType") == "poster" and im.get("remoteUrl"):
+            return im["remoteUrl"]
+    for im in images:
+        if im.get("remoteUrl"):
+            return im["remoteUrl"]
+    return None
+
+
+class LibraryItem:
+    """
+    A Radarr movie or Sonarr series reduced to what poster matching reads,
+    instead of the full API object with its images, ratings, file and
+    statistics sub-trees.
+    """
+
+    __slots__ = ("id", "title", "original_title", "alternate_titles", "year",
+                 "imdb_id", "tmdb_id", "tvdb_id", "poster")
+
+    @classmethod
+    def from_arr(cls, d: dict) -> "LibraryItem":
+        it = cls.__new__(cls)
+        g = d.get
+        it.id = g("id")
+        it.title = g("title") or ""
+        it.original_title = g("originalTitle") or None
+        alts = ((a.get("title") if isinstance(a, dict) else a) for a in g("alternateTitles") or ())
+        it.alternate_titles = tuple(t for t in alts if t)
+        it.year = _int(g("year")) or None
+        it.imdb_id = g("imdbId") or None
+        it.tmdb_id = _int(g("tmdbId")) or None
+        it.tvdb_id = _int(g("tvdbId")) or None
+        it.poster = remote_poster(g("images"))
+        return it
+
+    def as_dict(self) -> dict:
+        """Arr-shaped, so ``from_arr`` reads it back."""
+        return {
+            "id": self.id, "title": self.title, "originalTitle": self.original_title,
+            "alternateTitles": list(self.alternate_titles), "year": self.year,
+            "imdbId": self.imdb_id, "tmdbId": self.tmdb_id, "tvdbId": self.tvdb_id,
+            "images": [{"coverType": "poster", "remoteUrl": self.poster}] if self.poster else [],
+        }
@@ -1,19 +1,68 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
 import requests
-from functools import lru_cache
+from app import cassette, jsonstream
+from app.memory import deep_sizeof
+from app.models import LibraryItem, remote_poster
 from app.sslutil import build_requests_kwargs
+from app.titleindex import TitleIndex
+
+log = logging.getLogger("posters")
+
+# Fuzzy library matches scoring below this fall back to remote lookups
+FUZZY_THRESHOLD = 0.75
+CACHE_ENTRIES = 128
+LIBRARY_PATH = {"radarr": "/api/v3/movie", "sonarr": "/api/v3/series"}
+LIBRARY_PATHS = tuple(LIBRARY_PATH.values())
+# a library fetch that failed is retried after this long, not cached
+LIBRARY_RETRY_SECONDS = 60
+# Connect webhook events that take an item out of the library; any other
+# event naming a movie/series re-reads that one item
+REMOVE_EVENTS = {"MovieDelete", "SeriesDelete"}
 
 def _params_key(params: dict | None) -> tuple | None:
     if not params:
         return None
     return tuple(sorted((str(k), str(v)) for k, v in params.items()))
 
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def _norm_title(title) -> str:
+    """Lower-case alphanumerics only, so "Spider-Man: No Way Home" == "spider man no way home"."""
+    return _NON_ALNUM.sub(" ", str(title or "").lower()).strip()
+
 class PosterResolver:
-    def __init__(self, radarr_url, radarr_key, sonarr_url, sonarr_key, ca_cert_path=None, insecure=False):
+    def __init__(self, radarr_url, radarr_key, sonarr_url, sonarr_key, ca_cert_path=None, insecure=False, local_covers=False):
         self.radarr_url = (radarr_url or "").rstrip("/")
         self.radarr_key = radarr_key or ""
         self.sonarr_url = (sonarr_url or "").rstrip("/")
         self.sonarr_key = sonarr_key or ""
         self._requests_kwargs = build_requests_kwargs(ca_cert_path, insecure)
+        # Prefer the arr's own resized MediaCover over hotlinking TMDB/TVDB
+        self.local_covers = local_covers
+        self._indexes: dict = {}
+        self._fuzzy: dict[str, TitleIndex] = {}
+        # (service, path, params key) -> (response, bytes), least recently used first.
+        # Lookups run on worker threads, hence the lock.
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # library key -> monotonic time its last fetch failed
+        self._library_failed: dict[tuple, float] = {}
+
+    def warm(self) -> None:
+        """
+        Fetch the Radarr/Sonarr libraries (and build their fuzzy title
+        indexes) up front so the first render doesn't pay for it. Blocking
+        and CPU-bound; call from a worker thread.
+        """
+        if self.radarr_url and self.radarr_key:
+            self._radarr_get("/api/v3/movie")
+        if self.sonarr_url and self.sonarr_key:
+            self._sonarr_get("/api/v3/series")
 
     # MOVIES
     def movie_poster(self, title: str | None, year: int | str | None, imdb_id: str | None, tmdb_id: str | int | None) -> str | None:
@@ -22,14 +71,16 @@ class PosterResolver:
         movies = self._radarr_get("/api/v3/movie")
         if movies is not None:
             if imdb_id:
-                u = self._radarr_match_key(movies, "imdbId", str(imdb_id))
+                u = self._radarr_match_key(movies, "imdb_id", str(imdb_id))
                 if u: return u
             if tmdb_id is not None and str(tmdb_id).isdigit():
-                u = self._radarr_match_key(movies, "tmdbId", int(str(tmdb_id)))
+                u = self._radarr_match_key(movies, "tmdb_id", int(str(tmdb_id)))
                 if u: return u
             if title:
                 u = self._radarr_match_title_year(movies, title, year)
                 if u: return u
+                u = self._fuzzy_poster("radarr", title, year)
+                if u: return u
         if imdb_id:
             u = self._first_poster(self._radarr_get("/api/v3/movie/lookup", {"imdbId": str(imdb_id)}))
             if u: return u
@@ -40,18 +91,17 @@ class PosterResolver:
             return self._poster_term_title_year(self._radarr_get("/api/v3/movie/lookup", {"term": title}), title, year)
         return None
 
-    def _radarr_match_key(self, movies, key, value):
+    def _radarr_match_key(self, movies, attr, value):
         for m in movies or []:
-            if str(m.get(key)) == str(value):
-                return self._first_poster(m)
+            if getattr(m, attr) == value:
+                return self._library_poster(m, self.radarr_url, self.radarr_key)
         return None
 
     def _radarr_match_title_year(self, movies, title, year):
-        t = (title or "").strip().lower()
         y = str(year) if year is not None else None
-        for m in movies or []:
-            if str(m.get("title","")).strip().lower() == t and (y is None or str(m.get("year")) == y):
-                return self._first_poster(m)
+        for m in self._title_index("radarr", movies).get(_norm_title(title), ()):
+            if y is None or str(m.year) == y:
+                return self._library_poster(m, self.radarr_url, self.radarr_key)
         return None
 
     # TV
@@ -61,11 +111,13 @@ class PosterResolver:
         series = self._sonarr_get("/api/v3/series")
         if series is not None:
             if tvdb_id is not None and str(tvdb_id).isdigit():
-                u = self._sonarr_match_key(series, "tvdbId", int(str(tvdb_id)))
+                u = self._sonarr_match_key(series, "tvdb_id", int(str(tvdb_id)))
                 if u: return u
             if title:
                 u = self._sonarr_match_title(series, title)
                 if u: return u
+                u = self._fuzzy_poster("sonarr", title, None)
+                if u: return u
         if tvdb_id is not None and str(tvdb_id).isdigit():
             u = self._first_poster(self._sonarr_get("/api/v3/series/lookup", {"term": f"tvdb:{int(str(tvdb_id))}"}))
             if u: return u
@@ -73,67 +125,220 @@ class PosterResolver:
             return self._poster_term_title(self._sonarr_get("/api/v3/series/lookup", {"term": title}), title)
         return None
 
-    def _sonarr_match_key(self, series, key, value):
+    def _sonarr_match_key(self, series, attr, value):
         for s in series or []:
-            if str(s.get(key)) == str(value):
-                return self._first_poster(s)
+            if getattr(s, attr) == value:
+                return self._library_poster(s, self.sonarr_url, self.sonarr_key)
         return None
 
     def _sonarr_match_title(self, series, title):
-        t = (title or "").strip().lower()
-        for s in series or []:
-            if str(s.get("title","")).strip().lower() == t:
-                return self._first_poster(s)
+        for s in self._title_index("sonarr", series).get(_norm_title(title), ()):
+            return self._library_poster(s, self.sonarr_url, self.sonarr_key)
         return None
 
     # Shared helpers
+    def _fuzzy_poster(self, name: str, title: str, year) -> str | None:
+        index = self._fuzzy.get(name)
+        if index is None:
+            # not built yet (it is built off the loop with the library); don't block here
+            return None
+        item, score = index.best(title, year)
+        if item is None or score < FUZZY_THRESHOLD:
+            return None
+        if name == "radarr":
+            return self._library_poster(item, self.radarr_url, self.radarr_key)
+        return self._library_poster(item, self.sonarr_url, self.sonarr_key)
+
+    def _title_index(self, name: str, items) -> dict:
+        """Normalized title -> library items, rebuilt only when the library list changes."""
+        cached = self._indexes.get(name)
+        if cached is not None and cached[0] is items:
+            return cached[1]
+        index: dict = {}
+        for it in items or []:
+            index.setdefault(_norm_title(it.title), []).append(it)
+        # the items belong to the library cache; count only the index itself
+        nbytes = deep_sizeof(index, {id(it) for it in items or []})
+        self._indexes[name] = (items, index, nbytes)
+        return index
+
+    def _library_poster(self, item: LibraryItem, base: str, api_key: str) -> str | None:
+        # Library items (not lookup results) have an id the arr serves a cover for
+        if self.local_covers and item.id:
+            return f"{base}/api/v3/mediacover/{item.id}/poster-500.jpg?apikey={api_key}"
+        return item.poster
+
     def _first_poster(self, item_or_list) -> str | None:
+        """Poster of a lookup result (or the first of a list of them)."""
         item = item_or_list
         if isinstance(item_or_list, list):
             if not item_or_list: return None
             item = item_or_list[0]
-        imgs = (item or {}).get("images", []) or []
-        for im in imgs:
-            if im.get("coverType") == "poster" and im.get("remoteUrl"):
-                return im["remoteUrl"]
-        for im in imgs:
-            if im.get("remoteUrl"):
-                return im["remoteUrl"]
-        return None
+        return remote_poster((item or {}).get("images"))
 
-    @lru_cache(maxsize=128)
-    def _radarr_get_cached(self, path: str, params_key: tuple | None):
-        params = dict(params_key) if params_key else {}
-        try:
-            r = requests.get(f"{self.radarr_url}{path}",
-                             headers={"X-Api-Key": self.radarr_key},
-                             params=params,
-                             timeout=10,
-                             **self._requests_kwargs)
-            r.raise_for_status()
-            return r.json()
-        except Exception:
+    def _get(self, service: str, path: str, params: dict | None = None):
+        key = (service, path, _params_key(params))
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit[0]
+        library = path in LIBRARY_PATHS and not key[2]
+        if library and time.monotonic() - self._library_failed.get(key, float("-inf")) < LIBRARY_RETRY_SECONDS:
             return None
+        value = self._fetch(service, path, key[2])
+        if library:
+            if value is None:
+                # not cached: local matching resumes as soon as the arr answers
+                self._library_failed[key] = time.monotonic()
+                return None
+            self._library_failed.pop(key, None)
+            self._fuzzy[service] = TitleIndex(value)
+        nbytes = deep_sizeof(value)
+        with self._cache_lock:
+            self._cache[key] = (value, nbytes)
+            self._cache.move_to_end(key)
+            while len(self._cache) > CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        return value
 
-    @lru_cache(maxsize=128)
-    def _sonarr_get_cached(self, path: str, params_key: tuple | None):
+    def _fetch(self, service: str, path: str, params_key: tuple | None):
+        """
+        A library comes back as a list of LibraryItem, stream-parsed so the
+        full API objects are never all in memory at once; lookups as the
+        decoded JSON.
+        """
+        return cassette.call_sync("arr", f"{service} {path}", dict(params_key or ()),
+                                  lambda: self._download(service, path, params_key))
+
+    def _download(self, service: str, path: str, params_key: tuple | None):
+        base, api_key = (self.radarr_url, self.radarr_key) if service == "radarr" else (self.sonarr_url, self.sonarr_key)
         params = dict(params_key) if params_key else {}
+        library = path in LIBRARY_PATHS and not params_key
         try:
-            r = requests.get(f"{self.sonarr_url}{path}",
-                             headers={"X-Api-Key": self.sonarr_key},
-                             params=params,
-                             timeout=10,
-                             **self._requests_kwargs)
-            r.raise_for_status()
-            return r.json()
-        except Exception:
+            with requests.get(f"{base}{path}",
+                              headers={"X-Api-Key": api_key},
+                              params=params,
+                              timeout=10,
+                              stream=library,
+                              **self._requests_kwargs) as r:
+                r.raise_for_status()
+                if library:
+                    return [LibraryItem.from_arr(d) for d in jsonstream.iter_response_array(r)]
+                return jsonstream.loads(r.content)
+        except Exception as e:
+            log.warning("%s %s failed: %s", service, path, e)
             return None
 
     def _radarr_get(self, path: str, params: dict | None = None):
-        return self._radarr_get_cached(path, _params_key(params))
+        return self._get("radarr", path, params)
 
     def _sonarr_get(self, path: str, params: dict | None = None):
-        return self._sonarr_get_cached(path, _params_key(params))
+        return self._get("sonarr", path, params)
+
+    # ---------- Webhooks ----------
+    def apply_event(self, service: str, payload: dict) -> str:
+        """
+        Apply a Radarr/Sonarr Connect webhook: upsert or remove the one
+        movie/series it names in the cached library and its title indexes,
+        and forget per-title lookups for it. Blocking (an upsert re-reads
+        the item from the arr); call from a worker thread. Returns what was
+        done, for the log.
+        """
+        event = payload.get("eventType") or "unknown"
+        if event == "Test":
+            # the Connect "Test" button sends a placeholder item
+            return f"{service} test event received"
+        obj = payload.get("movie" if service == "radarr" else "series") or {}
+        item_id = obj.get("id")
+        if not item_id:
+            return f"{service} {event} event ignored"
+        if event in REMOVE_EVENTS:
+            item = LibraryItem.from_arr(obj)
+            self._update_library(service, item_id, None)
+            self._forget_lookups(service, item)
+            return f"removed {service} item {item_id} ({item.title})"
+        full = self._fetch(service, f"{LIBRARY_PATH[service]}/{item_id}", None)
+        if not isinstance(full, dict):
+            # not trusting the payload's copy (it lacks alternate titles and,
+            # on older arrs, images); drop the item, lookups cover it remotely
+            item = LibraryItem.from_arr(obj)
+            self._update_library(service, item_id, None)
+            self._forget_lookups(service, item)
+            return f"{service} {event}: item {item_id} ({item.title}) could not be re-read, removed"
+        item = LibraryItem.from_arr(full)
+        self._update_library(service, item_id, item)
+        self._forget_lookups(service, item)
+        return f"{service} {event}: updated item {item_id} ({item.title})"
+
+    def _update_library(self, service: str, item_id, item: LibraryItem | None) -> None:
+        key = (service, LIBRARY_PATH[service], None)
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is None:
+                # not loaded; the next fetch sees the change anyway
+                return
+            items, nbytes = hit
+            # a new list: threads iterating the old one are unaffected and the
+            # exact-title index sees the change
+            fresh = [it for it in items if it.id != item_id]
+            nbytes -= sum(deep_sizeof(it) for it in items if it.id == item_id)
+            if item is not None:
+                fresh.append(item)
+                nbytes += deep_sizeof(item)
+            self._cache[key] = (fresh, nbytes)
+            fuzzy = self._fuzzy.get(service)
+            if fuzzy is not None:
+                if item is None:
+                    fuzzy.discard(item_id)
+                else:
+                    fuzzy.upsert(item)
+
+    def _forget_lookups(self, service: str, item: LibraryItem) -> None:
+        terms = {str(v) for v in (item.title, item.imdb_id, item.tmdb_id) if v}
+        if item.tvdb_id:
+            terms.add(f"tvdb:{item.tvdb_id}")
+        with self._cache_lock:
+            for key in [k for k in self._cache if k[0] == service and k[2]]:
+                if any(v in terms for _, v in key[2]):
+                    del self._cache[key]
+
+    # ---------- Memory accounting ----------
+    def cache_bytes(self, kind: str) -> int:
+        """Bytes held by ``kind``: "libraries" (full library lists), "lookups" (per-title searches) or "indexes"."""
+        if kind == "indexes":
+            return (sum(ix.nbytes for ix in list(self._fuzzy.values()))
+                    + sum(entry[2] for entry in list(self._indexes.values())))
+        library = kind == "libraries"
+        with self._cache_lock:
+            return sum(nbytes for (_, path, params), (_, nbytes) in self._cache.items()
+                       if (path in LIBRARY_PATHS and not params) == library)
+
+    def evict(self, kind: str, nbytes: int) -> int:
+        """
+        Drop "lookups" or "libraries" entries, least recently used first,
+        until ``nbytes`` are freed; returns bytes freed. A library goes
+        together with its title indexes, which hold the same items; all
+        three are rebuilt the next time that library is needed.
+        """
+        library = kind == "libraries"
+        freed = 0
+        dropped = []
+        with self._cache_lock:
+            for key in list(self._cache):
+                if freed >= nbytes:
+                    break
+                if (key[1] in LIBRARY_PATHS and not key[2]) == library:
+                    freed += self._cache.pop(key)[1]
+                    dropped.append(key[0])
+        if library:
+            for service in dropped:
+                fuzzy = self._fuzzy.pop(service, None)
+                exact = self._indexes.pop(service, None)
+                freed += (fuzzy.nbytes if fuzzy else 0) + (exact[2] if exact else 0)
+            if dropped:
+                log.info("Evicted %s library cache (%d KB)", "/".join(dropped), freed // 1024)
+        return freed
 
     def _poster_term_title_year(self, items, title, year):
         if not items: return None
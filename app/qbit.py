@@ -3,6 +3,8 @@ import requests
 import logging
 import time
 import qbittorrentapi
+from app import cassette
+from app.models import Torrent
 from app.sslutil import build_requests_kwargs
 
 log = logging.getLogger("qbit")
@@ -84,15 +86,21 @@ class QbitClient:
             return None
 
         try:
-            torrents = self.client.torrents_info()
+            torrents = cassette.call_sync("qbit", "torrents_info", {"status_filter": "downloading"},
+                                          self._fetch_downloading)
             # If we can talk to qBittorrent, reset backoff
             self._reset_backoff()
-            return [t for t in torrents if (getattr(t, "state", "") or "").lower() == "downloading"]
+            return torrents
         except Exception as e:
             # Connection dropped mid-loop; mark as disconnected and backoff
             self._on_failure(e)
             return None
 
+    def _fetch_downloading(self):
+        # let qBittorrent drop seeding/completed torrents before they are serialized
+        parsed = (Torrent.from_qbit(t) for t in self.client.torrents_info(status_filter="downloading"))
+        return [t for t in parsed if t.state == "downloading"]
+
     def status_text(self) -> str | None:
         """
         Human text for current state if disconnected, else None.
@@ -0,0 +1,142 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# Every pattern below is matched against a single token with fullmatch and
+# bounded quantifiers, and the name is tokenised in one pass, so parsing is
+# linear in the length of the name no matter how it is malformed.
+_TOKEN = re.compile(r"[^\s._\[\]()]+")
+_YEAR = re.compile(r"(19[0-9]{2}|20[0-9]{2})")
+_SEASON_EP = re.compile(r"[sS]([0-9]{1,2})(?:[eE]([0-9]{1,3}))?(?:-?[eE][0-9]{1,3})*")
+_CROSS_EP = re.compile(r"([0-9]{1,2})[xX]([0-9]{1,3})")
+_RESOLUTION = re.compile(r"([0-9]{3,4})[pPiI]")
+_NUMBER = re.compile(r"[0-9]{1,3}")
+
+_QUALITY = frozenset("""
+    2160p 1080p 720p 576p 480p 4k uhd web webdl web-dl webrip web-rip bluray blu-ray bdrip brrip
+    dvdrip hdtv hdrip remux hdr hdr10 hdr10+ dv dovi hevc h264 h265 h.264 h.265 x264 x265 avc
+    xvid aac aac2 ac3 eac3 ddp ddp5 dd5 dts dts-hd truehd atmos flac opus mp3 10bit 8bit
+    hybrid proper repack extended unrated remastered imax internal limited multi dubbed subbed
+    complete criterion amzn nf dsnp hmax atvp
+""".split())
+_SEASON_WORDS = frozenset(("season", "saison", "staffel"))
+
+
+class ReleaseInfo(NamedTuple):
+    title: str
+    year: Optional[int] = None
+    season: Optional[int] = None
+    episode: Optional[int] = None
+    resolution: Optional[str] = None
+    group: Optional[str] = None
+
+    @property
+    def is_tv(self) -> bool:
+        return self.season is not None or self.episode is not None
+
+
+def _has_marker(tokens: list[str]) -> bool:
+    """Whether ``tokens`` hold a year (not the first token), episode, resolution or quality tag."""
+    return any(
+        (i > 0 and _YEAR.fullmatch(tok)) or _SEASON_EP.fullmatch(tok) or _CROSS_EP.fullmatch(tok)
+        or _RESOLUTION.fullmatch(tok) or tok.lower() in _QUALITY
+        for i, tok in enumerate(tokens)
+    )
+
+
+def _split_group(name: str) -> tuple[str, Optional[str], str]:
+    """
+    Strip a leading [Group] tag or trailing -GROUP / [HASH] tag. Returns the
+    rest, the group and the trailing bracketed tag, which may hold the
+    resolution ("Movie (2020) [1080p]"). A trailing dash only starts a group
+    after a release marker, so a bare "Spider-Man" keeps its title.
+    """
+    group = None
+    tag = ""
+    name = name.strip()
+    if name.startswith("["):
+        end = name.find("]")
+        if end > 0:
+            group = name[1:end].strip() or None
+            name = name[end + 1:].strip()
+    if name.endswith("]"):
+        start = name.rfind("[")
+        if start > 0:
+            tag = name[start + 1:-1]
+            name = name[:start].strip()
+    dash = name.rfind("-")
+    if dash > 0 and group is None:
+        tail = name[dash + 1:]
+        head = _TOKEN.findall(name[:dash])
+        # "WEB-DL", "Blu-Ray": the dash is inside a source tag, not before a group
+        compound = f"{head[-1]}-{tail}".lower() if head else ""
+        if (tail and not any(c in tail for c in " ._[]()") and not tail.isdigit()
+                and compound not in _QUALITY and _has_marker(head)):
+            group = tail
+            name = name[:dash]
+    return name, group, tag
+
+
+def _resolution(tok: str) -> Optional[str]:
+    if m := _RESOLUTION.fullmatch(tok):
+        return f"{m.group(1)}p"
+    if tok.lower() in ("4k", "uhd"):
+        return "2160p"
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_release(name: str) -> ReleaseInfo:
+    """
+    Parse a torrent/release name into title, year, season/episode, resolution
+    and release group. Results are memoized, so re-parsing the same queue on
+    every downloads tick is a dict lookup.
+    """
+    if not name:
+        return ReleaseInfo("")
+    body, group, tag = _split_group(name)
+    tokens = _TOKEN.findall(body)
+
+    title_end = None
+    year = season = episode = None
+    resolution = None
+    for i, tok in enumerate(tokens):
+        low = tok.lower()
+        marker = False
+        if _YEAR.fullmatch(tok):
+            # a year first, or followed by another year, is part of the title
+            # ("2012.2009", "Blade.Runner.2049.2017")
+            if i > 0 and not (i + 1 < len(tokens) and _YEAR.fullmatch(tokens[i + 1])):
+                if year is None:
+                    year = int(tok)
+                marker = True
+        elif m := _SEASON_EP.fullmatch(tok):
+            season = int(m.group(1)) if season is None else season
+            if m.group(2) and episode is None:
+                episode = int(m.group(2))
+            marker = True
+        elif m := _CROSS_EP.fullmatch(tok):
+            if season is None:
+                season, episode = int(m.group(1)), int(m.group(2))
+            marker = True
+        elif _RESOLUTION.fullmatch(tok) or low in _QUALITY:
+            resolution = resolution or _resolution(tok)
+            marker = True
+        elif low in _SEASON_WORDS and i + 1 < len(tokens) and _NUMBER.fullmatch(tokens[i + 1]):
+            season = int(tokens[i + 1]) if season is None else season
+            marker = True
+        elif tok == "-" and i + 1 < len(tokens) and _NUMBER.fullmatch(tokens[i + 1]) and i > 0:
+            # anime style "Show - 06"
+            if episode is None:
+                episode = int(tokens[i + 1])
+                season = season if season is not None else 1
+            marker = True
+        if marker and title_end is None and i > 0:
+            title_end = i
+
+    if resolution is None:
+        resolution = next(filter(None, map(_resolution, _TOKEN.findall(tag))), None)
+
+    title_tokens = tokens[:title_end] if title_end is not None else tokens
+    title = " ".join(t for t in title_tokens if t != "-").strip()
+    return ReleaseInfo(title, year, season, episode, resolution, group)
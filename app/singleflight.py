@@ -0,0 +1,29 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one in-flight execution.
+    Callers arriving while a call is running await its result instead of
+    starting their own; nothing is cached once it completes.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(fn())
+            self._inflight[key] = fut
+
+            def _done(f, key=key):
+                if self._inflight.get(key) is f:
+                    del self._inflight[key]
+            fut.add_done_callback(_done)
+        # shield: one caller being cancelled must not cancel the shared call
+        return await asyncio.shield(fut)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Optional
+
+from app.memory import deep_sizeof
+
+SUBSCRIBER_QUEUE = 32
+
+
+class Snapshot:
+    """
+    The last rendering of one board: its embed pages, the normalized data
+    behind them as serialized JSON, and when it was produced. ``etag`` is a
+    hash of the data alone, so it only changes when the content does.
+    """
+
+    __slots__ = ("board", "pages", "body", "etag", "taken_at", "changed_at")
+
+    def __init__(self, board: str, pages: list | None, body: bytes | None, etag: str | None,
+                 taken_at: float, changed_at: float):
+        self.board = board
+        self.pages = pages
+        self.body = body
+        self.etag = etag
+        self.taken_at = taken_at
+        self.changed_at = changed_at
+
+    def age(self) -> float:
+        return time.time() - self.taken_at
+
+
+class SnapshotCache:
+    """
+    Latest worker output per board, kept in memory so readers (slash
+    commands, the JSON API and its event stream) are answered without
+    another upstream request.
+    """
+
+    def __init__(self):
+        self._snapshots: dict[str, Snapshot] = {}
+        self._subscribers: set[asyncio.Queue] = set()
+
+    def put(self, board: str, pages: list | None = None, data: dict | None = None) -> Snapshot:
+        now = time.time()
+        prev = self._snapshots.get(board)
+        body = etag = None
+        changed_at = now
+        if data is not None:
+            digest = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+            etag = f'"{digest[:20]}"'
+            if prev is not None and prev.etag == etag:
+                body, changed_at = prev.body, prev.changed_at
+            else:
+                body = json.dumps({"board": board, "updated_at": now, "data": data}, default=str).encode()
+        snap = Snapshot(board, pages, body, etag, now, changed_at)
+        self._snapshots[board] = snap
+        if etag is not None and (prev is None or prev.etag != etag):
+            self._publish(snap)
+        return snap
+
+    def restore(self, snap: Snapshot) -> None:
+        """Store a snapshot rendered elsewhere (the bot process, in two-process mode) as is."""
+        prev = self._snapshots.get(snap.board)
+        self._snapshots[snap.board] = snap
+        if snap.etag is not None and (prev is None or prev.etag != snap.etag):
+            self._publish(snap)
+
+    def get(self, board: str) -> Optional[Snapshot]:
+        return self._snapshots.get(board)
+
+    def all(self) -> list[Snapshot]:
+        return [s for s in self._snapshots.values() if s.body is not None]
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+
+    # ---------- Memory accounting ----------
+    def nbytes(self) -> int:
+        return sum(deep_sizeof(s) for s in list(self._snapshots.values()))
+
+    def evict(self, nbytes: int) -> int:
+        """Drop the oldest snapshots until ``nbytes`` are freed; the next worker cycle puts them back."""
+        freed = 0
+        for snap in sorted(self._snapshots.values(), key=lambda s: s.taken_at):
+            if freed >= nbytes:
+                break
+            freed += deep_sizeof(snap)
+            del self._snapshots[snap.board]
+        return freed
+
+    # ---------- Change notifications ----------
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue) -> None:
+        self._subscribers.discard(q)
+
+    def _publish(self, snap: Snapshot) -> None:
+        for q in self._subscribers:
+            try:
+                q.put_nowait(snap)
+            except asyncio.QueueFull:
+                # a consumer this far behind only needs the newest state;
+                # drop its oldest pending event
+                try:
+                    q.get_nowait()
+                    q.put_nowait(snap)
+                except (asyncio.QueueEmpty, asyncio.QueueFull):
+                    pass
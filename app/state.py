@@ -0,0 +1,172 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from app.memory import deep_sizeof
+
+log = logging.getLogger("state")
+
+FLUSH_DELAY_SECONDS = 0.25
+_DELETE = object()
+
+
+class StateStore:
+    """
+    Namespaced key/value state (message IDs, render fingerprints, cache
+    metadata) on a single SQLite database in WAL mode.
+
+    Reads are served from an in-memory mirror loaded once per namespace.
+    Writes update the mirror immediately and are queued; the queue is flushed
+    in one transaction on a worker thread shortly after the first write, so
+    workers writing at the same moment never overwrite each other's keys and
+    the event loop never blocks on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated REAL NOT NULL,"
+            " PRIMARY KEY (ns, key))"
+        )
+        self._mirror: dict[str, dict[str, Any]] = {}
+        self._pending: dict[tuple[str, str], Any] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    # ---------- Reads ----------
+    def load(self, ns: str) -> dict:
+        """Return (a copy of) every key in a namespace."""
+        return dict(self._namespace(ns))
+
+    def get(self, ns: str, key: str, default=None):
+        return self._namespace(ns).get(str(key), default)
+
+    def _namespace(self, ns: str) -> dict:
+        data = self._mirror.get(ns)
+        if data is None:
+            with self._lock:
+                rows = self._conn.execute("SELECT key, value FROM kv WHERE ns = ?", (ns,)).fetchall()
+            data = {k: json.loads(v) for k, v in rows}
+            self._mirror[ns] = data
+        return data
+
+    # ---------- Writes ----------
+    def set(self, ns: str, key: str, value: Any) -> None:
+        key = str(key)
+        self._namespace(ns)[key] = value
+        self._pending[(ns, key)] = value
+        self._schedule_flush()
+
+    def delete(self, ns: str, key: str) -> None:
+        key = str(key)
+        self._namespace(ns).pop(key, None)
+        self._pending[(ns, key)] = _DELETE
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(self._take_pending())
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(FLUSH_DELAY_SECONDS)
+        await self.flush()
+
+    async def flush(self) -> None:
+        # writes queued while a batch is on the worker thread go out in the next one
+        while self._pending:
+            await asyncio.to_thread(self._write, self._take_pending())
+
+    def _take_pending(self) -> dict:
+        batch, self._pending = self._pending, {}
+        return batch
+
+    def _write(self, batch: dict) -> None:
+        if not batch:
+            return
+        now = time.time()
+        upserts = [(ns, k, json.dumps(v), now) for (ns, k), v in batch.items() if v is not _DELETE]
+        deletes = [(ns, k) for (ns, k), v in batch.items() if v is _DELETE]
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    if upserts:
+                        self._conn.executemany(
+                            "INSERT INTO kv (ns, key, value, updated) VALUES (?, ?, ?, ?) "
+                            "ON CONFLICT (ns, key) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+                            upserts,
+                        )
+                    if deletes:
+                        self._conn.executemany("DELETE FROM kv WHERE ns = ? AND key = ?", deletes)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except Exception as e:
+            log.error("Failed to write %d state entries to %s: %s", len(batch), self.path, e)
+
+    # ---------- Memory accounting ----------
+    def nbytes(self) -> int:
+        return deep_sizeof(self._mirror)
+
+    def evict(self, nbytes: int) -> int:
+        """
+        Drop mirrored namespaces, largest first, until ``nbytes`` are freed;
+        each is reloaded from the database on its next read. Namespaces with
+        unflushed writes are kept, since the mirror is their only copy.
+        """
+        dirty = {ns for ns, _ in self._pending}
+        sizes = sorted(((deep_sizeof(data), ns) for ns, data in self._mirror.items() if ns not in dirty), reverse=True)
+        freed = 0
+        for size, ns in sizes:
+            if freed >= nbytes:
+                break
+            del self._mirror[ns]
+            freed += size
+        return freed
+
+    # ---------- Lifecycle ----------
+    def import_json(self, ns: str, path: str) -> int:
+        """
+        One-time import of a legacy JSON dict (e.g. message_ids.json) into a
+        namespace. Keys already in the store win. Returns the number imported.
+        """
+        marker = f"imported:{ns}:{os.path.abspath(path)}"
+        if self.get("meta", marker) or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r") as f:
+                data = json.load(f) or {}
+        except Exception as e:
+            log.error("Failed to import %s: %s", path, e)
+            return 0
+        existing = self._namespace(ns)
+        fresh = {str(k): v for k, v in data.items() if str(k) not in existing}
+        for k, v in fresh.items():
+            self.set(ns, k, v)
+        self.set("meta", marker, True)
+        log.info("Imported %d %s entries from %s", len(fresh), ns, path)
+        return len(fresh)
+
+    async def close(self) -> None:
+        # let a running flush finish rather than cancel it mid-write and overlap it
+        if self._flush_task and not self._flush_task.done():
+            await self._flush_task
+        await self.flush()
+        with self._lock:
+            self._conn.close()
@@ -35,32 +35,6 @@ def save_config(cfg: Settings) -> None:
         except Exception:
             pass
 
-# ------- message ids persistence -------
-def load_message_ids(path: str) -> dict:
-    ensure_data_dir()
-    try:
-        d = os.path.dirname(path) or "/data"
-        os.makedirs(d, exist_ok=True)
-        if not os.path.exists(path):
-            return {}
-        with open(path, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        log.error("Failed to load message ids from %s: %s", path, e)
-        return {}
-
-def save_message_ids(path: str, data: dict) -> None:
-    ensure_data_dir()
-    try:
-        d = os.path.dirname(path) or "/data"
-        os.makedirs(d, exist_ok=True)
-        tmp_fd, tmp_path = tempfile.mkstemp(dir=d, prefix="msg-", suffix=".json")
-        with os.fdopen(tmp_fd, "w") as f:
-            json.dump(data, f)
-        os.replace(tmp_path, path)
-    except Exception as e:
-        log.error("Failed to save message ids to %s: %s", path, e)
-
 # ---------------- Admin user store ----------------
 def _new_secret() -> str:
     return base64.urlsafe_b64encode(secrets.token_bytes(32)).decode().rstrip("=")
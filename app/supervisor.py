@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from app import cassette
+
+log = logging.getLogger("supervisor")
+
+BACKOFF_SECONDS = 5
+BACKOFF_MAX_SECONDS = 300
+
+
+class _Worker:
+    __slots__ = ("name", "cycle", "interval", "task", "state", "started_at", "cycles", "failures",
+                 "consecutive_failures", "restarts", "last_success", "last_error", "retry_at")
+
+    def __init__(self, name: str, cycle: Callable[[], Awaitable], interval: Callable[[], float]):
+        self.name = name
+        self.cycle = cycle
+        self.interval = interval
+        self.task: Optional[asyncio.Task] = None
+        self.state = "starting"
+        self.started_at = time.time()
+        self.cycles = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.restarts = 0
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.retry_at: Optional[float] = None
+
+    def backoff(self) -> float:
+        """Exponential in consecutive failures, never longer than the worker's own interval."""
+        delay = BACKOFF_SECONDS * 2 ** max(0, self.consecutive_failures - 1)
+        return min(delay, BACKOFF_MAX_SECONDS, max(BACKOFF_SECONDS, self.interval()))
+
+
+class WorkerSupervisor:
+    """
+    Owns the board worker tasks.
+
+    A worker is one ``cycle`` coroutine function run in a loop with
+    ``interval()`` seconds between runs. ``ensure`` starts a worker only if
+    one of that name is not already running, so Discord firing ``on_ready``
+    again after a gateway reconnect never duplicates a worker. A cycle that
+    raises is logged and retried after an exponential backoff (capped at the
+    worker's interval); if the loop itself dies it is restarted the same
+    way. Per-worker state, cycle counts and the last success are kept for
+    the admin API.
+    """
+
+    def __init__(self, sleep: Callable[[Callable[[], float]], Awaitable]):
+        # sleep(seconds_fn) waits, re-evaluating seconds_fn when the config changes
+        self._sleep = sleep
+        self._workers: dict[str, _Worker] = {}
+
+    def names(self) -> list[str]:
+        return list(self._workers)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._workers
+
+    def ensure(self, name: str, cycle: Callable[[], Awaitable], interval: Callable[[], float]) -> bool:
+        """Start ``name`` unless it is already supervised; returns whether it was started."""
+        if name in self._workers:
+            return False
+        w = self._workers[name] = _Worker(name, cycle, interval)
+        self._spawn(w)
+        return True
+
+    async def stop(self, name: str) -> None:
+        w = self._workers.pop(name, None)
+        if w is None or w.task is None or w.task.done():
+            return
+        w.task.cancel()
+        try:
+            await w.task
+        except asyncio.CancelledError:
+            pass
+        except BaseException:
+            pass
+
+    async def stop_all(self) -> None:
+        for name in list(self._workers):
+            await self.stop(name)
+
+    def _spawn(self, w: _Worker) -> None:
+        w.task = asyncio.create_task(self._run(w), name=f"worker:{w.name}")
+        w.task.add_done_callback(lambda t, w=w: self._on_exit(w, t))
+
+    async def _run(self, w: _Worker) -> None:
+        while True:
+            w.state = "running"
+            w.retry_at = None
+            try:
+                with cassette.cycle(w.name):
+                    await w.cycle()
+            except Exception as e:
+                w.cycles += 1
+                w.failures += 1
+                w.consecutive_failures += 1
+                w.last_error = f"{type(e).__name__}: {e}"
+                delay = w.backoff()
+                w.state = "backoff"
+                w.retry_at = time.time() + delay
+                log.exception("%s worker cycle failed; retrying in %ds", w.name, delay)
+                await self._sleep(lambda: delay)
+                continue
+            w.cycles += 1
+            w.consecutive_failures = 0
+            w.last_success = time.time()
+            w.last_error = None
+            w.state = "idle"
+            await self._sleep(w.interval)
+
+    def _on_exit(self, w: _Worker, task: asyncio.Task) -> None:
+        if task.cancelled() or self._workers.get(w.name) is not w:
+            w.state = "stopped"
+            return
+        # the loop never returns on its own; anything here is a crash outside a cycle
+        exc = task.exception()
+        w.consecutive_failures += 1
+        w.restarts += 1
+        w.last_error = f"{type(exc).__name__}: {exc}" if exc else "worker exited"
+        delay = w.backoff()
+        w.state = "backoff"
+        w.retry_at = time.time() + delay
+        log.error("%s worker crashed (%s); restarting in %ds", w.name, w.last_error, delay)
+        asyncio.get_running_loop().call_later(delay, self._restart, w)
+
+    def _restart(self, w: _Worker) -> None:
+        if self._workers.get(w.name) is w:
+            self._spawn(w)
+
+    def report(self) -> dict:
+        now = time.time()
+        return {
+            name: {
+                "state": w.state,
+                "cycles": w.cycles,
+                "failures": w.failures,
+                "restarts": w.restarts,
+                "last_success": w.last_success,
+                "last_error": w.last_error,
+                "retry_in": round(max(0.0, w.retry_at - now), 1) if w.retry_at else None,
+                "uptime": round(now - w.started_at, 1),
+            }
+            for name, w in self._workers.items()
+        }
@@ -1,36 +1,138 @@
+import asyncio
+import logging
+import time
 import aiohttp
 from urllib.parse import quote
+from app import cassette
+from app.breaker import CircuitBreaker
 from app.sslutil import build_aiohttp_ssl
 
+log = logging.getLogger("tautulli")
+
+_MISSING = object()
+# how long a caller holding a cached value waits for a fresh one
+FRESH_WAIT_SECONDS = 2.0
+
 
 class TautulliClient:
-    def __init__(self, base_url: str, api_key: str, ca_cert_path: str | None = None, insecure: bool = False):
+    def __init__(self, base_url: str, api_key: str, ca_cert_path: str | None = None, insecure: bool = False,
+                 name: str = ""):
+        # history key of this server; "" for the primary one
+        self.name = name
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
         self._ssl_context = build_aiohttp_ssl(ca_cert_path, insecure)
+        self._session: aiohttp.ClientSession | None = None
+        self.breaker = CircuitBreaker()
+        # (cmd, params) -> (value, fetched_at); the last good response per endpoint
+        self._last_good: dict[tuple, tuple] = {}
+        # (cmd, params) -> fetched_at of the stale value last served, if any
+        self._stale: dict[tuple, float] = {}
+        self._revalidating: set[tuple] = set()
 
     async def _get(self, cmd: str, params: dict | None = None) -> dict:
         params = params or {}
+        op = f"{self.name}:{cmd}" if self.name else cmd
+        return await cassette.call("tautulli", op, params, lambda: self._request(cmd, params))
+
+    async def _request(self, cmd: str, params: dict) -> dict:
         url = f"{self.base_url}/api/v2"
         q = {"apikey": self.api_key, "cmd": cmd}
         q.update(params)
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                url,
-                params=q,
-                timeout=10,
-                ssl=self._ssl_context
-            ) as resp:
-                resp.raise_for_status()
-                return await resp.json()
-
-    async def get_activity(self) -> list[dict]:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        async with self._session.get(url, params=q, ssl=self._ssl_context) as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    # ---------- Stale-while-revalidate ----------
+    async def _cached(self, cmd: str, params: dict | None, extract, default=None, cache: bool = True):
+        """
+        Fetch ``cmd`` through the circuit breaker. On failure, or while the
+        breaker is open, serve the last good value for this endpoint and mark
+        it stale. A caller that has a cached value waits at most
+        FRESH_WAIT_SECONDS for the fetch, which carries on in the background
+        if it is slower (at most one per endpoint), so callers never wait on
+        a hung Tautulli; once the backoff expires the half-open probe runs
+        the same way, answered from the cache right away.
+        """
+        key = (cmd, tuple(sorted((params or {}).items())))
+        cached = self._last_good.get(key) if cache else None
+
+        if not self.breaker.allow():
+            return self._serve_stale(key, cached, default)
+        if cached is None:
+            value = await self._fetch(key, cmd, params, extract, cache)
+            return self._serve_stale(key, None, default) if value is _MISSING else value
+        if key in self._revalidating:
+            return self._serve_stale(key, cached, default)
+
+        self._revalidating.add(key)
+        task = asyncio.create_task(self._revalidate(key, cmd, params, extract))
+        if self.breaker.state != "half_open":
+            done, _ = await asyncio.wait({task}, timeout=FRESH_WAIT_SECONDS)
+            if done and task.result() is not _MISSING:
+                return task.result()
+        return self._serve_stale(key, cached, default)
+
+    async def _fetch(self, key, cmd, params, extract, cache):
         try:
-            data = await self._get("get_activity")
-            return data.get("response", {}).get("data", {}).get("sessions", []) or []
-        except Exception:
-            return []
+            value = extract(await self._get(cmd, params))
+        except Exception as e:
+            self.breaker.failure(e)
+            log.warning("Tautulli %s%s failed (%s, breaker %s)", f"{self.name} " if self.name else "",
+                        cmd, e, self.breaker.state)
+            return _MISSING
+        self.breaker.success()
+        if cache:
+            self._last_good[key] = (value, time.time())
+        self._stale.pop(key, None)
+        return value
+
+    async def _revalidate(self, key, cmd, params, extract):
+        try:
+            return await self._fetch(key, cmd, params, extract, True)
+        finally:
+            self._revalidating.discard(key)
+
+    def _serve_stale(self, key, cached, default):
+        if cached is None:
+            self._stale.pop(key, None)
+            return default
+        self._stale[key] = cached[1]
+        return cached[0]
+
+    def stale_since(self, cmd: str) -> float | None:
+        """When the data last served for ``cmd`` was fetched, if it was served stale."""
+        times = [t for (c, _), t in self._stale.items() if c == cmd]
+        return min(times) if times else None
+
+    def down_text(self) -> str:
+        b = self.breaker
+        text = f"Tautulli unreachable: {b.last_error or 'no response'}."
+        retry = b.retry_in()
+        if retry:
+            text += f" Retrying in {int(retry)}s."
+        return text
+
+    def status(self) -> dict:
+        return {
+            "breaker": self.breaker.status(),
+            "stale_endpoints": sorted({c for c, _ in self._stale}),
+        }
+
+    # ---------- Endpoints ----------
+    async def get_activity(self) -> list[dict] | None:
+        """Current sessions; the last good list if Tautulli is down, None if there is none."""
+        return await self._cached(
+            "get_activity", None,
+            lambda data: data.get("response", {}).get("data", {}).get("sessions", []) or [],
+        )
 
     async def get_home_stats(
         self,
@@ -39,21 +141,38 @@ class TautulliClient:
         length: int = 5,
         order_column: str = "total_plays"
     ):
-        try:
-            params = {
-                "stats_type": stats_type,
-                "time_range": time_range,
-                "length": length,
-                "order_column": order_column,
-            }
-            data = await self._get("get_home_stats", params=params)
+        params = {
+            "stats_type": stats_type,
+            "time_range": time_range,
+            "length": length,
+            "order_column": order_column,
+        }
+
+        def extract(data):
             items = data.get("response", {}).get("data", []) or []
             for block in items:
                 if block.get("stat_id") == stats_type:
                     return block.get("rows", []) or []
-        except Exception:
             return []
-        return []
+
+        return await self._cached("get_home_stats", params, extract, default=[])
+
+    async def get_history(self, start: int = 0, length: int = 1000, after: str | None = None) -> list[dict] | None:
+        """One page of ungrouped play history, latest stopped first; None if the page could not be fetched."""
+        params = {
+            "start": start,
+            "length": length,
+            "order_column": "stopped",
+            "order_dir": "desc",
+            "grouping": 0,
+        }
+        if after:
+            params["after"] = after
+        return await self._cached(
+            "get_history", params,
+            lambda data: data.get("response", {}).get("data", {}).get("data", []) or [],
+            cache=False,
+        )
 
     def image_proxy_url(self, img_path: str, width: int = 400, height: int = 600) -> str:
         q_img = quote(img_path, safe="/:?=&")
@@ -64,19 +183,94 @@ class TautulliClient:
 
     # ---------- Plex status helpers ----------
 
-    async def count_library(self, section_type: str) -> int:
+    async def count_library(self, section_type: str) -> int | None:
         """Return number of items in libraries filtered by section_type ('movie' or 'show')."""
-        libs = await self._get("get_libraries")
-        libs = libs.get("response", {}).get("data", []) or []
-        count = 0
-        for lib in libs:
-            if lib.get("section_type") == section_type:
-                count += int(lib.get("count", 0))
-        return count
-
-    async def count_users(self) -> int:
+        libs = await self._cached(
+            "get_libraries", None,
+            lambda data: data.get("response", {}).get("data", []) or [],
+        )
+        if libs is None:
+            return None
+        return sum(int(lib.get("count", 0)) for lib in libs if lib.get("section_type") == section_type)
+
+    async def count_users(self) -> int | None:
         """Return total number of users in Tautulli."""
-        users = await self._get("get_users")
-        users = users.get("response", {}).get("data", []) or []
-        return len(users)
+        return await self._cached(
+            "get_users", None,
+            lambda data: len(data.get("response", {}).get("data", []) or []),
+        )
+
+
+class TautulliGroup:
+    """
+    One or more Tautulli servers behind the calls the boards make. Each
+    server is queried concurrently and a failing one only drops out of the
+    merge (its own client still serves stale data while its breaker is
+    open). With more than one server, sessions are tagged with the
+    server's label; library and user counts are summed.
+    """
+
+    def __init__(self, clients: list[TautulliClient], labels: dict[str, str]):
+        self.clients = {c.name: c for c in clients}
+        self.labels = labels
+
+    @property
+    def labelled(self) -> bool:
+        """Whether boards should say which server a session is on."""
+        return len(self.clients) > 1
+
+    async def _each(self, call, only=None) -> list[tuple[str, object]]:
+        names = [n for n in self.clients if only is None or n in only]
+        results = await asyncio.gather(*(call(self.clients[n]) for n in names), return_exceptions=True)
+        out = []
+        for name, res in zip(names, results):
+            if isinstance(res, BaseException):
+                log.warning("Tautulli %s failed: %s", self.labels.get(name) or "primary", res)
+                continue
+            out.append((name, res))
+        return out
+
+    async def activity_by_server(self, names) -> dict[str, list[dict] | None]:
+        """
+        Sessions of the named servers, fetched concurrently and tagged with
+        ``server`` (the label) and ``server_key``; None for a server with no
+        data. A server that raised is left out.
+        """
+        names = set(names)
+        out = {}
+        for name, sessions in await self._each(lambda c: c.get_activity(), names):
+            label = self.labels.get(name, name) if self.labelled else ""
+            # copies: the client keeps the originals as its last good response
+            out[name] = None if sessions is None else [{**d, "server": label, "server_key": name} for d in sessions]
+        return out
+
+    async def count_library(self, section_type: str) -> int | None:
+        counts = [n for _, n in await self._each(lambda c: c.count_library(section_type)) if n is not None]
+        return sum(counts) if counts else None
+
+    async def count_users(self) -> int | None:
+        counts = [n for _, n in await self._each(lambda c: c.count_users()) if n is not None]
+        return sum(counts) if counts else None
+
+    def image_proxy_url(self, img_path: str, width: int = 400, height: int = 600, server: str = "") -> str:
+        client = self.clients.get(server) or next(iter(self.clients.values()))
+        return client.image_proxy_url(img_path, width, height)
+
+    def stale_since(self, cmd: str) -> float | None:
+        times = [t for t in (c.stale_since(cmd) for c in self.clients.values()) if t is not None]
+        return min(times) if times else None
+
+    def down_text(self) -> str:
+        if not self.labelled:
+            return next(iter(self.clients.values())).down_text()
+        return " ".join(f"{self.labels[name]}: {c.down_text()}" for name, c in self.clients.items()
+                        if c.breaker.last_error) or "Tautulli unreachable."
+
+    def status(self) -> dict:
+        if not self.labelled:
+            return next(iter(self.clients.values())).status()
+        return {self.labels[name]: c.status() for name, c in self.clients.items()}
 
+    async def close(self) -> None:
+        for c in self.clients.values():
+            await c.close()
@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Callable
+
+import aiohttp
+
+from app.singleflight import SingleFlight
+from app.sslutil import build_aiohttp_ssl
+
+log = logging.getLogger("thumbs")
+
+THUMB_SIZE = (200, 300)
+JPEG_QUALITY = 80
+MAX_SOURCE_BYTES = 10 * 1024 * 1024
+# keys not rendered for this long are forgotten, with their images
+MAX_IDLE_DAYS = 30
+
+
+def _shrink(raw: bytes) -> bytes:
+    """Resize to thumbnail size and recompress; returns the source untouched if Pillow is missing."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return raw
+    with Image.open(io.BytesIO(raw)) as im:
+        im = im.convert("RGB")
+        im.thumbnail(THUMB_SIZE)
+        out = io.BytesIO()
+        im.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+class ThumbnailCache:
+    """
+    Poster thumbnails served by the admin app from a content-addressed disk cache.
+
+    ``register(ref)`` maps an image reference to an opaque, stable key and
+    returns the public URL embeds should use. A reference names the image
+    without credentials (a Tautulli server, image path and size; an arr
+    MediaCover path; a remote URL); ``resolve`` turns it into a fetchable
+    URL with the current API keys, so rotating a key leaves every key valid
+    and no secret is written to the state database. The image is fetched,
+    resized and recompressed the first time its key is requested, stored
+    under the SHA-1 of its bytes and served from disk from then on.
+
+    Keys record the day they were last rendered; once a day, keys idle for
+    MAX_IDLE_DAYS are dropped, along with images no key refers to.
+    """
+
+    def __init__(self, cache_dir: str, public_url: str, state, resolve: Callable[[dict], str | None],
+                 ca_cert_path: str | None = None, insecure: bool = False):
+        self.cache_dir = cache_dir
+        self.public_url = public_url.rstrip("/")
+        self._state = state
+        self._resolve = resolve
+        self._ssl = build_aiohttp_ssl(ca_cert_path, insecure)
+        self._session: aiohttp.ClientSession | None = None
+        self._flight = SingleFlight()
+        self._pruned_day: int | None = None
+        self._tasks: set[asyncio.Task] = set()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def register(self, ref: dict | None) -> str | None:
+        if not ref:
+            return None
+        key = hashlib.sha256(json.dumps(ref, sort_keys=True).encode()).hexdigest()[:32]
+        today = int(time.time()) // 86400
+        meta = self._state.get("thumbs", key)
+        if meta is None or meta.get("used") != today:
+            self._state.set("thumbs", key, {**(meta or {}), "ref": ref, "used": today})
+        if self._pruned_day != today:
+            self._pruned_day = today
+            t = asyncio.get_running_loop().create_task(self.prune(today))
+            self._tasks.add(t)
+            t.add_done_callback(self._tasks.discard)
+        return f"{self.public_url}/thumbs/{key}.jpg"
+
+    async def prune(self, today: int) -> None:
+        """Forget keys idle for MAX_IDLE_DAYS (and pre-reference ones, which held URLs with API keys)."""
+        entries = self._state.load("thumbs")
+        stale = [k for k, m in entries.items() if "ref" not in m or m.get("used", 0) < today - MAX_IDLE_DAYS]
+        for key in stale:
+            self._state.delete("thumbs", key)
+        live = {m["sha"] for k, m in entries.items() if m.get("sha") and k not in stale}
+        removed = await asyncio.to_thread(self._remove_unreferenced, live)
+        if stale or removed:
+            log.info("Pruned %d thumbnail keys and %d cached images", len(stale), removed)
+
+    def _remove_unreferenced(self, live: set) -> int:
+        # images written in the last hour may belong to a fetch not yet recorded
+        cutoff = time.time() - 3600
+        removed = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".jpg") and name[:-4] not in live:
+                    try:
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                            removed += 1
+                    except OSError as e:
+                        log.warning("Could not remove %s: %s", path, e)
+        return removed
+
+    def _path(self, sha: str) -> str:
+        return os.path.join(self.cache_dir, sha[:2], f"{sha}.jpg")
+
+    async def get(self, key: str) -> tuple[str, str] | None:
+        """Return (path, etag) for a registered key, fetching it on first use."""
+        meta = self._state.get("thumbs", key)
+        if not meta:
+            return None
+        sha = meta.get("sha")
+        if sha and os.path.exists(self._path(sha)):
+            return self._path(sha), sha
+        source = self._resolve(meta["ref"]) if "ref" in meta else None
+        if not source:
+            return None
+        sha = await self._flight.do(key, lambda: self._fetch(key, source))
+        return (self._path(sha), sha) if sha else None
+
+    async def _fetch(self, key: str, source: str) -> str | None:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+        try:
+            async with self._session.get(source, ssl=self._ssl) as resp:
+                resp.raise_for_status()
+                raw = bytearray()
+                async for chunk in resp.content.iter_chunked(64 * 1024):
+                    raw += chunk
+                    if len(raw) > MAX_SOURCE_BYTES:
+                        raise ValueError("source image too large")
+            sha = await asyncio.to_thread(self._store, bytes(raw))
+        except Exception as e:
+            log.warning("Thumbnail fetch failed for %s: %s", key, e)
+            return None
+        meta = self._state.get("thumbs", key)
+        if meta is not None:
+            self._state.set("thumbs", key, {**meta, "sha": sha})
+        return sha
+
+    def _store(self, raw: bytes) -> str:
+        data = _shrink(raw)
+        sha = hashlib.sha1(data).hexdigest()
+        path = self._path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix="thumb-", suffix=".jpg")
+            with os.fdopen(tmp_fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return sha
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+from array import array
+
+log = logging.getLogger("timeseries")
+
+METRICS = (
+    "streams",           # concurrent sessions
+    "transcodes",        # sessions being transcoded
+    "direct_plays",      # direct play / direct stream sessions
+    "stream_bandwidth",  # total session bandwidth, kbps
+    "downloads",         # torrents downloading
+    "download_speed",    # aggregate download speed, bytes/s
+)
+
+# name -> (bucket seconds, buckets kept)
+RESOLUTIONS = {
+    "1m": (60, 1440),     # one day of minutes
+    "1h": (3600, 720),    # thirty days of hours
+    "1d": (86400, 365),   # a year of days
+}
+
+SAVE_INTERVAL_SECONDS = 300
+_MAGIC = b"DMTS1"
+_SPARKS = "▁▂▃▄▅▆▇█"
+
+
+class _Ring:
+    """Fixed-size ring of (bucket start, sum, max, count) rollups for one metric at one resolution."""
+    __slots__ = ("step", "size", "stamp", "sum", "max", "count")
+
+    def __init__(self, step: int, size: int):
+        self.step = step
+        self.size = size
+        self.stamp = array("q", [-1]) * size
+        self.sum = array("d", [0.0]) * size
+        self.max = array("d", [0.0]) * size
+        self.count = array("I", [0]) * size
+
+    def add(self, ts: float, value: float) -> None:
+        bucket = int(ts) // self.step
+        i = bucket % self.size
+        if self.stamp[i] != bucket:
+            self.stamp[i] = bucket
+            self.sum[i] = value
+            self.max[i] = value
+            self.count[i] = 1
+            return
+        self.sum[i] += value
+        if value > self.max[i]:
+            self.max[i] = value
+        self.count[i] += 1
+
+    def points(self, now: float, n: int) -> list:
+        """The last ``n`` buckets up to ``now``, oldest first: (bucket start, avg, max) or None."""
+        last = int(now) // self.step
+        out = []
+        for bucket in range(last - min(n, self.size) + 1, last + 1):
+            i = bucket % self.size
+            if self.stamp[i] == bucket and self.count[i]:
+                out.append((bucket * self.step, self.sum[i] / self.count[i], self.max[i]))
+            else:
+                out.append(None)
+        return out
+
+    def arrays(self):
+        return (self.stamp, self.sum, self.max, self.count)
+
+
+class TimeSeriesStore:
+    """
+    Bounded, array-backed history of what the workers observe. Every sample is
+    rolled up into 1m/1h/1d buckets as it arrives, so memory is fixed (a few
+    hundred KB) no matter how long the bot runs, and trends never need an
+    extra upstream query.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._rings = {
+            m: {r: _Ring(step, size) for r, (step, size) in RESOLUTIONS.items()}
+            for m in METRICS
+        }
+        self._latest: dict[str, float] = {}
+        self._saved_at = time.time()
+        self._load()
+
+    # ---------- Recording ----------
+    def record(self, ts: float | None = None, **values: float) -> None:
+        ts = time.time() if ts is None else ts
+        for metric, value in values.items():
+            rings = self._rings.get(metric)
+            if rings is None or value is None:
+                continue
+            value = float(value)
+            for ring in rings.values():
+                ring.add(ts, value)
+            self._latest[metric] = value
+
+    # ---------- Queries ----------
+    def latest(self, metric: str) -> float | None:
+        return self._latest.get(metric)
+
+    def series(self, metric: str, resolution: str = "1h", points: int = 24, now: float | None = None) -> list:
+        ring = self._rings[metric][resolution]
+        return ring.points(time.time() if now is None else now, points)
+
+    def report(self, resolution: str = "1h", points: int = 24) -> dict:
+        step = RESOLUTIONS[resolution][0]
+        return {
+            "resolution": resolution,
+            "step": step,
+            "metrics": {
+                m: [
+                    None if p is None else {"t": p[0], "avg": round(p[1], 2), "max": round(p[2], 2)}
+                    for p in self.series(m, resolution, points)
+                ]
+                for m in METRICS
+            },
+        }
+
+    # ---------- Persistence ----------
+    async def persist(self, force: bool = False) -> None:
+        """Write to disk off-loop, at most every SAVE_INTERVAL_SECONDS unless forced."""
+        if not force and time.time() - self._saved_at < SAVE_INTERVAL_SECONDS:
+            return
+        self._saved_at = time.time()
+        blob = self._dump()
+        await asyncio.to_thread(self._write, blob)
+
+    def _layout(self) -> bytes:
+        return json.dumps({"metrics": METRICS, "resolutions": RESOLUTIONS}, sort_keys=True).encode()
+
+    def _dump(self) -> bytes:
+        header = self._layout()
+        parts = [_MAGIC, struct.pack("<I", len(header)), header]
+        for m in METRICS:
+            for r in RESOLUTIONS:
+                parts.extend(a.tobytes() for a in self._rings[m][r].arrays())
+        return b"".join(parts)
+
+    def _write(self, blob: bytes) -> None:
+        d = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(d, exist_ok=True)
+            tmp_fd, tmp_path = tempfile.mkstemp(dir=d, prefix="ts-", suffix=".bin")
+            with os.fdopen(tmp_fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            log.error("Failed to save time series to %s: %s", self.path, e)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                blob = f.read()
+            if not blob.startswith(_MAGIC):
+                raise ValueError("bad magic")
+            off = len(_MAGIC)
+            (hlen,) = struct.unpack_from("<I", blob, off)
+            off += 4
+            if blob[off:off + hlen] != self._layout():
+                log.warning("Time series layout changed; starting fresh")
+                return
+            off += hlen
+            for m in METRICS:
+                for r in RESOLUTIONS:
+                    for a in self._rings[m][r].arrays():
+                        n = len(a) * a.itemsize
+                        a[:] = array(a.typecode, blob[off:off + n])
+                        off += n
+        except Exception as e:
+            log.error("Failed to load time series from %s: %s", self.path, e)
+
+
+def sparkline(points: list) -> str:
+    """Render rollup points (avg) as a unicode sparkline; gaps become spaces."""
+    vals = [p[1] for p in points if p is not None]
+    if not vals:
+        return ""
+    lo, hi = min(vals), max(vals)
+    span = (hi - lo) or 1.0
+    return "".join(
+        " " if p is None else _SPARKS[min(len(_SPARKS) - 1, int((p[1] - lo) / span * (len(_SPARKS) - 1) + 0.5))]
+        for p in points
+    )
@@ -0,0 +1,46 @@
+import time
+import logging
+
+log = logging.getLogger("timing")
+
+
+class StartupTimer:
+    """
+    Records when each start-up phase began and ended, relative to process start.
+    Phases may overlap (client init runs alongside the gateway login), so each
+    one is reported with its own offset and duration. Only the first cold start
+    is recorded; later restarts leave the report untouched.
+    """
+    PHASES = ("import", "config_load", "client_init", "gateway_ready", "first_board")
+
+    def __init__(self, t0: float | None = None):
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self._start: dict[str, float] = {}
+        self._end: dict[str, float] = {}
+        self._logged = False
+
+    def begin(self, phase: str) -> None:
+        self._start.setdefault(phase, time.perf_counter() - self.t0)
+
+    def end(self, phase: str) -> None:
+        if phase in self._end:
+            return
+        self._start.setdefault(phase, 0.0)
+        self._end[phase] = time.perf_counter() - self.t0
+        if not self._logged and all(p in self._end for p in self.PHASES):
+            self._logged = True
+            log.info("Startup timings: %s", ", ".join(
+                f"{p} {self._end[p] - self._start[p]:.2f}s" for p in self.PHASES
+            ) + f" (total {self._end['first_board']:.2f}s)")
+
+    def report(self) -> dict:
+        phases = {}
+        for p in self.PHASES:
+            if p not in self._start:
+                continue
+            end = self._end.get(p)
+            phases[p] = {
+                "start": round(self._start[p], 3),
+                "duration": round(end - self._start[p], 3) if end is not None else None,
+            }
+        return {"phases": phases, "complete": self._logged}
@@ -0,0 +1,156 @@
+import heapq
+import re
+from collections import defaultdict
+
+from app.memory import deep_sizeof
+from app.models import LibraryItem
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_LEADING_ARTICLE = re.compile(r"^(the|a|an) ")
+
+# Candidates are gathered from the query's rarest trigrams only, then the
+# best few are scored exactly.
+_PROBE_GRAMS = 8
+_CANDIDATES = 16
+
+
+def normalize(title) -> str:
+    """Lower-case alphanumerics with single spaces and no leading article."""
+    t = _NON_ALNUM.sub(" ", str(title or "").lower()).strip()
+    return _LEADING_ARTICLE.sub("", t)
+
+
+def trigrams(norm: str) -> set[str]:
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    In-memory fuzzy index over a Radarr/Sonarr library (``LibraryItem`` records).
+
+    Every title variant (title, original title, alternate titles) becomes a
+    document; an inverted index maps trigrams to documents. A query collects
+    candidates from the posting lists of its rarest trigrams and scores the
+    top few by the Dice coefficient of the two trigram sets, nudged by year
+    agreement. Build it off the event loop; querying is pure dict/set work.
+
+    ``upsert``/``discard`` change single items (from arr webhooks) without a
+    rebuild: a removed item becomes a tombstone its documents still point
+    at, skipped by queries and dropped when the library is next rebuilt.
+    Writers must be serialized by the caller; queries may run alongside.
+    """
+
+    def __init__(self, items):
+        self.items: list[LibraryItem | None] = []
+        self._by_id: dict = {}
+        self._doc_item: list[int] = []
+        self._doc_norm: list[str] = []
+        self._exact: dict[str, list[int]] = {}
+        self._grams: dict[str, list[int]] = {}
+        for item in items or []:
+            self._add(item)
+        # the items belong to the library cache; count only the index
+        self.nbytes = deep_sizeof((self._by_id, self._doc_item, self._doc_norm, self._exact, self._grams))
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def _add(self, item: LibraryItem) -> None:
+        idx = len(self.items)
+        self.items.append(item)
+        self._by_id[item.id] = idx
+        for variant in self._variants(item):
+            norm = normalize(variant)
+            if not norm:
+                continue
+            doc = len(self._doc_item)
+            self._doc_item.append(idx)
+            self._doc_norm.append(norm)
+            self._exact.setdefault(norm, []).append(doc)
+            for g in trigrams(norm):
+                self._grams.setdefault(g, []).append(doc)
+
+    def upsert(self, item: LibraryItem) -> None:
+        """Add ``item``, replacing any item with the same id."""
+        self.discard(item.id)
+        self._add(item)
+
+    def discard(self, item_id) -> bool:
+        idx = self._by_id.pop(item_id, None)
+        if idx is None:
+            return False
+        self.items[idx] = None
+        return True
+
+    @staticmethod
+    def _variants(item):
+        seen = set()
+        for t in (item.title, item.original_title, *item.alternate_titles):
+            if t and t not in seen:
+                seen.add(t)
+                yield t
+
+    def best(self, title: str, year=None) -> tuple[LibraryItem | None, float]:
+        """Best matching library item and its score in [0, 1]."""
+        norm = normalize(title)
+        if not norm or not self._doc_item:
+            return None, 0.0
+
+        exact = [d for d in self._exact.get(norm, ()) if self.items[self._doc_item[d]] is not None]
+        if exact:
+            item = self._pick_year(exact, year)
+            return self.items[self._doc_item[item]], 1.0 if year is None or self._year_ok(item, year) else 0.7
+
+        qgrams = trigrams(norm)
+        postings = sorted((self._grams[g] for g in qgrams if g in self._grams), key=len)
+        hits: dict[int, int] = defaultdict(int)
+        for plist in postings[:_PROBE_GRAMS]:
+            for doc in plist:
+                hits[doc] += 1
+        if not hits:
+            return None, 0.0
+
+        best_doc, best_score = None, 0.0
+        for doc in heapq.nlargest(_CANDIDATES, hits, key=hits.__getitem__):
+            item = self.items[self._doc_item[doc]]
+            if item is None:
+                continue
+            dgrams = trigrams(self._doc_norm[doc])
+            score = 2.0 * len(qgrams & dgrams) / (len(qgrams) + len(dgrams))
+            if self._doc_norm[doc].startswith(norm + " "):
+                # "Frieren" vs "Frieren: Beyond Journey's End"
+                score = max(score, 0.85)
+            score = self._year_adjust(score, item, year)
+            if score > best_score:
+                best_doc, best_score = doc, score
+        if best_doc is None:
+            return None, 0.0
+        return self.items[self._doc_item[best_doc]], round(min(best_score, 1.0), 3)
+
+    def _year_adjust(self, score: float, item: LibraryItem, year) -> float:
+        if year is None:
+            return score
+        iy = item.year
+        if iy is None:
+            return score
+        try:
+            diff = abs(iy - int(year))
+        except (TypeError, ValueError):
+            return score
+        if diff == 0:
+            return score + 0.05
+        if diff == 1:
+            return score
+        return score * 0.8
+
+    def _year_ok(self, doc: int, year) -> bool:
+        iy = self.items[self._doc_item[doc]].year
+        return iy is None or str(iy) == str(year)
+
+    def _pick_year(self, docs: list[int], year) -> int:
+        if year is not None:
+            for doc in docs:
+                if self._year_ok(doc, year):
+                    return doc
+        return docs[0]
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+import discord
+
+log = logging.getLogger("webhooks")
+
+WEBHOOK_NAME = "Media Bot"
+UNKNOWN_WEBHOOK = 10015  # Discord JSON error code
+
+
+class WebhookChannel:
+    """
+    Stand-in for a text channel that posts through the channel's webhook.
+    ``send`` / ``fetch_message`` return webhook messages, which have the
+    same ``edit(embed=...|embeds=...)`` and ``delete()`` the workers use on
+    gateway messages; ``edit(name=...)`` renames the channel over REST.
+    """
+
+    def __init__(self, transport: "WebhookClient", channel_id: int):
+        self._transport = transport
+        self.id = channel_id
+
+    async def send(self, *, embed: Optional[discord.Embed] = None, embeds: Optional[list] = None):
+        kwargs = {"embed": embed} if embed is not None else {"embeds": embeds or []}
+        wh = await self._transport.webhook(self.id)
+        try:
+            return await wh.send(wait=True, **kwargs)
+        except discord.NotFound as e:
+            if e.code != UNKNOWN_WEBHOOK:
+                raise
+            # deleted from the channel settings; make a new one
+            self._transport.forget_webhook(self.id)
+            wh = await self._transport.webhook(self.id)
+            return await wh.send(wait=True, **kwargs)
+
+    async def fetch_message(self, message_id: int):
+        wh = await self._transport.webhook(self.id)
+        try:
+            return await wh.fetch_message(message_id)
+        except discord.NotFound as e:
+            if e.code == UNKNOWN_WEBHOOK:
+                self._transport.forget_webhook(self.id)
+            raise
+
+    async def edit(self, **kwargs):
+        channel = await self._transport.rest_channel(self.id)
+        return await channel.edit(**kwargs)
+
+
+class WebhookClient:
+    """
+    Gateway-less replacement for ``discord.Client`` covering what the board
+    workers call: ``get_channel``, ``is_closed``, ``is_ready``,
+    ``wait_until_ready``, ``start``/``close`` and the ``event`` decorator.
+
+    ``start`` logs in over REST (no websocket, identify or READY) and fires
+    ``on_ready`` straight away. Messages go through one webhook per channel,
+    created on first use with the bot token and remembered in the state
+    store; all webhook traffic shares one pooled HTTP session.
+    """
+
+    def __init__(self, state):
+        self._state = state
+        self._rest = discord.Client(intents=discord.Intents.none())
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._channels: dict[int, WebhookChannel] = {}
+        self._webhooks: dict[int, discord.Webhook] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._handlers: dict = {}
+        self._ready = asyncio.Event()
+        self._closed = asyncio.Event()
+
+    # ---------- discord.Client surface ----------
+    def event(self, coro):
+        self._handlers[coro.__name__] = coro
+        return coro
+
+    @property
+    def user(self):
+        return self._rest.user
+
+    def is_closed(self) -> bool:
+        return self._closed.is_set()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    async def wait_until_ready(self) -> None:
+        await self._ready.wait()
+
+    def get_channel(self, channel_id: int) -> WebhookChannel:
+        ch = self._channels.get(channel_id)
+        if ch is None:
+            ch = self._channels[channel_id] = WebhookChannel(self, channel_id)
+        return ch
+
+    async def start(self, token: str) -> None:
+        await self._rest.login(token)
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+        self._ready.set()
+        handler = self._handlers.get("on_ready")
+        if handler:
+            await handler()
+        await self._closed.wait()
+
+    async def close(self) -> None:
+        self._closed.set()
+        self._ready.clear()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        await self._rest.close()
+
+    # ---------- Webhooks ----------
+    async def rest_channel(self, channel_id: int):
+        return self._rest.get_channel(channel_id) or await self._rest.fetch_channel(channel_id)
+
+    async def webhook(self, channel_id: int) -> discord.Webhook:
+        wh = self._webhooks.get(channel_id)
+        if wh is not None:
+            return wh
+        lock = self._locks.setdefault(channel_id, asyncio.Lock())
+        async with lock:
+            wh = self._webhooks.get(channel_id)
+            if wh is None:
+                wh = self._webhooks[channel_id] = await self._resolve_webhook(channel_id)
+        return wh
+
+    async def _resolve_webhook(self, channel_id: int) -> discord.Webhook:
+        saved = self._state.get("webhooks", str(channel_id))
+        if saved:
+            return discord.Webhook.partial(saved["id"], saved["token"], session=self._session)
+
+        channel = await self.rest_channel(channel_id)
+        found = None
+        for wh in await channel.webhooks():
+            if wh.token and wh.name == WEBHOOK_NAME and wh.user and wh.user.id == self.user.id:
+                found = wh
+                break
+        if found is None:
+            found = await channel.create_webhook(name=WEBHOOK_NAME, reason="Board posting without a gateway connection")
+            log.info("Created webhook for channel %s", channel_id)
+        self._state.set("webhooks", str(channel_id), {"id": found.id, "token": found.token})
+        return discord.Webhook.partial(found.id, found.token, session=self._session)
+
+    def forget_webhook(self, channel_id: int) -> None:
+        """Drop a webhook that Discord no longer knows, so the next post recreates it."""
+        self._webhooks.pop(channel_id, None)
+        self._state.delete("webhooks", str(channel_id))
@@ -0,0 +1,174 @@
+"""
+Discord client memory benchmark: lean profile vs discord.py's default client.
+
+    python -m bench.client_memory_bench [--channels N] [--voice N] [--messages N] [--typing N]
+
+Each profile runs in its own interpreter. A fake large guild is fed
+straight into the client's connection state the way the gateway would
+deliver it for that profile's intents: the default client gets the
+guild with voice states (and those members), then a stream of message
+and typing events; the lean client, subscribed to guilds only, gets the
+guild without voice states and no message or typing events. The script
+reports resident memory after the guild arrives and after the events,
+and the time spent dispatching them.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import subprocess
+import sys
+import time
+
+GUILD_ID = 1 << 40
+BOT_ID = GUILD_ID + 1
+
+
+def rss_kb() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _user(uid: int) -> dict:
+    return {"id": str(uid), "username": f"user{uid % 100000}", "discriminator": "0",
+            "global_name": None, "avatar": None}
+
+
+def _member(uid: int) -> dict:
+    return {"user": _user(uid), "roles": [], "joined_at": "2024-01-01T00:00:00+00:00",
+            "deaf": False, "mute": False, "flags": 0}
+
+
+def guild_payload(channels: int, voice: int, with_voice: bool) -> dict:
+    chans = [{"id": str(GUILD_ID + 10 + i), "type": 0 if i % 5 else 2, "name": f"channel-{i}",
+              "position": i, "permission_overwrites": [], "guild_id": str(GUILD_ID),
+              "bitrate": 64000, "user_limit": 0}
+             for i in range(channels)]
+    roles = [{"id": str(GUILD_ID + 100000 + i), "name": f"role-{i}", "color": 0, "hoist": False,
+              "position": i, "permissions": "0", "managed": False, "mentionable": False, "flags": 0}
+             for i in range(200)]
+    roles.append({"id": str(GUILD_ID), "name": "@everyone", "color": 0, "hoist": False, "position": 0,
+                  "permissions": "0", "managed": False, "mentionable": False, "flags": 0})
+    data = {
+        "id": str(GUILD_ID), "name": "Big Guild", "owner_id": str(BOT_ID), "member_count": 250000,
+        "large": True, "channels": chans, "roles": roles, "emojis": [], "stickers": [], "threads": [],
+        "features": [], "members": [_member(BOT_ID)], "voice_states": [], "presences": [],
+        "stage_instances": [], "guild_scheduled_events": [], "premium_tier": 0,
+        "preferred_locale": "en-US", "verification_level": 0, "explicit_content_filter": 0,
+        "default_message_notifications": 0, "mfa_level": 0, "nsfw_level": 0, "system_channel_flags": 0,
+    }
+    if with_voice:
+        voice_chans = [c["id"] for c in chans if c["type"] == 2]
+        for i in range(voice):
+            uid = GUILD_ID + 1_000_000 + i
+            data["members"].append(_member(uid))
+            data["voice_states"].append({
+                "user_id": str(uid), "channel_id": voice_chans[i % len(voice_chans)], "session_id": f"s{i}",
+                "deaf": False, "mute": False, "self_deaf": False, "self_mute": False,
+                "self_video": False, "suppress": False, "request_to_speak_timestamp": None,
+            })
+    return data
+
+
+def message_payload(i: int, channels: int) -> dict:
+    uid = GUILD_ID + 2_000_000 + (i % 50000)
+    return {
+        "id": str(GUILD_ID + 10_000_000 + i), "channel_id": str(GUILD_ID + 10 + (i % channels) // 5 * 5 + 1),
+        "guild_id": str(GUILD_ID), "author": _user(uid), "member": {k: v for k, v in _member(uid).items() if k != "user"},
+        "content": "some chatter in a busy channel " * 4, "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+        "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0, "flags": 0,
+    }
+
+
+def typing_payload(i: int, channels: int) -> dict:
+    uid = GUILD_ID + 2_000_000 + (i % 50000)
+    return {"channel_id": str(GUILD_ID + 11), "guild_id": str(GUILD_ID), "user_id": str(uid),
+            "timestamp": int(time.time()), "member": _member(uid)}
+
+
+async def run_profile(profile: str, args) -> dict:
+    import discord
+    from app.gateway import build_client
+
+    client = build_client(profile)
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=_user(BOT_ID) | {"bot": True, "verified": True,
+                                                                       "mfa_enabled": False, "flags": 0})
+    intents = client.intents
+    gc.collect()
+    base = rss_kb()
+
+    state.parse_guild_create(guild_payload(args.channels, args.voice, with_voice=intents.voice_states))
+    gc.collect()
+    after_guild = rss_kb()
+
+    # the gateway only delivers events for subscribed intents
+    start = time.perf_counter()
+    if intents.guild_messages:
+        for i in range(args.messages):
+            state.parse_message_create(message_payload(i, args.channels))
+    if intents.guild_typing:
+        for i in range(args.typing):
+            state.parse_typing_start(typing_payload(i, args.channels))
+    dispatch = time.perf_counter() - start
+    await asyncio.sleep(0)
+    gc.collect()
+    after_events = rss_kb()
+
+    guild = client.get_guild(GUILD_ID)
+    result = {
+        "profile": profile,
+        "guild_kb": after_guild - base,
+        "events_kb": after_events - after_guild,
+        "total_kb": after_events - base,
+        "dispatch_ms": dispatch * 1e3,
+        "cached_messages": len(client.cached_messages),
+        "cached_members": len(guild.members) if guild else 0,
+        "channels": len(guild.channels) if guild else 0,
+    }
+    await client.close()
+    return result
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--profile", help=argparse.SUPPRESS)
+    ap.add_argument("--channels", type=int, default=500)
+    ap.add_argument("--voice", type=int, default=5000)
+    ap.add_argument("--messages", type=int, default=20000)
+    ap.add_argument("--typing", type=int, default=20000)
+    args = ap.parse_args()
+
+    if args.profile:
+        print(json.dumps(asyncio.run(run_profile(args.profile, args))))
+        return 0
+
+    results = []
+    for profile in ("default", "lean"):
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.client_memory_bench", "--profile", profile,
+             "--channels", str(args.channels), "--voice", str(args.voice),
+             "--messages", str(args.messages), "--typing", str(args.typing)],
+            check=True, capture_output=True, text=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"fake guild: {args.channels} channels, {args.voice} voice members, "
+          f"{args.messages} messages, {args.typing} typing events")
+    print(f"{'profile':<9} {'guild':>10} {'events':>10} {'total':>10} {'dispatch':>10} {'msgs':>6} {'members':>8}")
+    for r in results:
+        print(f"{r['profile']:<9} {r['guild_kb'] / 1024:>8.1f}MB {r['events_kb'] / 1024:>8.1f}MB "
+              f"{r['total_kb'] / 1024:>8.1f}MB {r['dispatch_ms']:>8.0f}ms {r['cached_messages']:>6} {r['cached_members']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Radarr library ingestion benchmark: whole-document r.json() vs streaming into LibraryItem.
+
+    python -m bench.library_bench [--movies N]
+
+A fake /api/v3/movie payload shaped like Radarr's (images, ratings,
+movieFile with media info, alternate titles, statistics) is served from a
+local HTTP server. The legacy path decodes the whole response with
+``r.json()`` and keeps every object; the new path is PosterResolver's own
+fetch, which stream-parses the response into compact LibraryItem records.
+Reported: best wall time of three untraced runs, peak traced allocation
+during a fourth, and the memory the result keeps.
+"""
+import argparse
+import http.server
+import json
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+import requests
+
+from app import jsonstream
+from app.memory import deep_sizeof
+from app.posters import PosterResolver
+
+
+def movie(i: int, rnd: random.Random) -> dict:
+    tmdb = 1000 + i
+    return {
+        "id": i + 1, "title": f"Movie Title {i}", "originalTitle": f"Original Title {i}",
+        "originalLanguage": {"id": 1, "name": "English"}, "sortTitle": f"movie title {i}",
+        "alternateTitles": [{"sourceType": "tmdb", "movieMetadataId": i, "title": f"Alt {i} {k}", "id": i * 10 + k}
+                            for k in range(rnd.randint(0, 4))],
+        "secondaryYearSourceId": 0, "sizeOnDisk": rnd.randint(10**9, 6 * 10**10), "status": "released",
+        "overview": "A plot overview sentence. " * rnd.randint(4, 12), "inCinemas": "2019-05-01T00:00:00Z",
+        "physicalRelease": "2019-09-01T00:00:00Z", "digitalRelease": "2019-08-01T00:00:00Z",
+        "images": [{"coverType": t, "url": f"/MediaCover/{i + 1}/{t}.jpg?lastWrite=1",
+                    "remoteUrl": f"https://image.tmdb.org/t/p/original/{t}{tmdb}.jpg"}
+                   for t in ("poster", "fanart", "clearlogo")],
+        "website": "", "year": 1980 + i % 45, "youTubeTrailerId": "abcdefghijk", "studio": "Studio",
+        "path": f"/movies/Movie Title {i} ({1980 + i % 45})", "qualityProfileId": 1, "hasFile": True,
+        "movieFileId": i + 1, "monitored": True, "minimumAvailability": "released", "isAvailable": True,
+        "folderName": f"/movies/Movie Title {i}", "runtime": rnd.randint(80, 180), "cleanTitle": f"movietitle{i}",
+        "imdbId": f"tt{1000000 + i}", "tmdbId": tmdb, "titleSlug": str(tmdb), "certification": "PG-13",
+        "genres": ["Drama", "Thriller"], "tags": [], "added": "2020-01-01T00:00:00Z",
+        "ratings": {k: {"votes": rnd.randint(0, 10**6), "value": round(rnd.uniform(1, 10), 1), "type": "user"}
+                    for k in ("imdb", "tmdb", "metacritic", "rottenTomatoes")},
+        "movieFile": {
+            "movieId": i + 1, "relativePath": f"Movie Title {i} (2019) Bluray-1080p.mkv",
+            "path": f"/movies/Movie Title {i}/Movie Title {i} (2019) Bluray-1080p.mkv", "size": 10**10,
+            "dateAdded": "2020-01-01T00:00:00Z", "releaseGroup": "GROUP", "edition": "",
+            "languages": [{"id": 1, "name": "English"}],
+            "quality": {"quality": {"id": 7, "name": "Bluray-1080p", "source": "bluray", "resolution": 1080,
+                                    "modifier": "none"}, "revision": {"version": 1, "real": 0, "isRepack": False}},
+            "customFormats": [], "customFormatScore": 0, "indexerFlags": 0,
+            "mediaInfo": {"audioBitrate": 640000, "audioChannels": 5.1, "audioCodec": "AC3", "audioLanguages": "eng",
+                          "audioStreamCount": 1, "videoBitDepth": 8, "videoBitrate": 10**7, "videoCodec": "x264",
+                          "videoDynamicRangeType": "", "videoFps": 23.976, "resolution": "1920x800",
+                          "runTime": "2:01:00", "scanType": "Progressive", "subtitles": "eng/fre/ger"},
+            "qualityCutoffNotMet": False, "id": i + 1,
+        },
+        "collection": {"title": f"Collection {i % 500}", "tmdbId": 9000 + i % 500},
+        "popularity": rnd.uniform(0, 100), "statistics": {"movieFileCount": 1, "sizeOnDisk": 10**10, "releaseGroups": ["GROUP"]},
+    }
+
+
+def serve(body: bytes):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(fn, runs: int = 3):
+    """Best wall time over untraced runs, then one traced run for the allocation peak."""
+    elapsed = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--movies", type=int, default=10000)
+    args = ap.parse_args()
+
+    rnd = random.Random(11)
+    body = json.dumps([movie(i, rnd) for i in range(args.movies)]).encode()
+    server = serve(body)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def legacy():
+        r = requests.get(f"{url}/api/v3/movie", headers={"X-Api-Key": "k"}, timeout=30)
+        r.raise_for_status()
+        return r.json()
+
+    resolver = PosterResolver(url, "k", "", "")
+    old, old_t, old_peak = measure(legacy)
+    new, new_t, new_peak = measure(lambda: resolver._fetch("radarr", "/api/v3/movie", None))
+    server.shutdown()
+    assert len(new) == len(old)
+
+    print(f"{args.movies} movies, {len(body) / 2**20:.1f} MB of JSON "
+          f"(ijson: {'yes' if jsonstream.ijson else 'no'}, orjson: {'yes' if jsonstream.orjson else 'no'})")
+    print(f"{'path':<22} {'time':>8} {'peak':>10} {'retained':>10}")
+    for name, t, peak, kept in (("r.json() dicts", old_t, old_peak, deep_sizeof(old)),
+                                ("stream -> LibraryItem", new_t, new_peak, deep_sizeof(new))):
+        print(f"{name:<22} {t * 1e3:>6.0f}ms {peak / 2**20:>8.1f}MB {kept / 2**20:>8.1f}MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
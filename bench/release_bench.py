@@ -0,0 +1,107 @@
+"""
+Release-name parser benchmark, including adversarial names.
+
+    python -m bench.release_bench
+
+Times parse_release against the regex chain the downloads board used before
+(_clean_title), on realistic names and on long/malformed ones designed to
+trigger backtracking. Exits non-zero if any single parse takes longer than
+MAX_SECONDS, which would mean the parser is no longer linear, or if a name in
+EXPECTED parses to a different title or group.
+"""
+import re
+import sys
+import time
+
+from app.release import parse_release
+
+MAX_SECONDS = 0.05
+
+REALISTIC = [
+    "The.Matrix.1999.1080p.BluRay.x264-SPARKS",
+    "[SubsPlease] Frieren - 06 (1080p) [F123ABC]",
+    "Breaking.Bad.S05E14.720p.HDTV.x264-IMMERSE",
+    "Spider-Man.No.Way.Home.2021.2160p.WEB-DL.DDP5.1.Atmos.HDR.HEVC-TEPES",
+    "Dune Part Two (2024) [2160p] [4K] [WEB] [5.1] [YTS.MX]",
+    "Show Name Season 2 Complete 1080p",
+]
+
+ADVERSARIAL = {
+    "long dotted title": "A." * 20000 + "2020.1080p",
+    "whitespace run": "Title" + " " * 20000 + "- 1",
+    "dash run": "-" * 20000,
+    "unclosed brackets": "[" * 20000,
+    "nested parens": "(" * 10000 + "1080p" + ")" * 10000,
+    "repeated markers": "S01E01." * 5000,
+    "quality soup": "(" + "web-dl " * 5000,
+    "digits": "1" * 20000,
+    "unicode": "Amélie.ÆØÅ." * 3000 + "2001",
+}
+
+# name -> (title, group)
+EXPECTED = {
+    "The.Matrix.1999.1080p.BluRay.x264-SPARKS": ("The Matrix", "SPARKS"),
+    "Show.S01E02.1080p.WEB-DL": ("Show", None),
+    "Spider-Man": ("Spider-Man", None),
+    "Spider-Man.No.Way.Home.2021.2160p.WEB-DL.DDP5.1.Atmos.HDR.HEVC-TEPES": ("Spider-Man No Way Home", "TEPES"),
+    "X-Men Days of Future Past": ("X-Men Days of Future Past", None),
+}
+
+
+def legacy_clean_title(raw: str) -> str:
+    cleaned = re.sub(r'^\[[^\]]+\]\s*', '', raw)
+    cleaned = re.sub(r'\[[^\]]+\]\s*$', '', cleaned)
+    cleaned = re.sub(r'\s*-\s*\d{1,3}\s*$', '', cleaned)
+    cleaned = re.sub(
+        r'\s*\(?(?:\d{3,4}p|web[- ]?dl|bluray|hdr|dv|hevc|h26[45]|atmos|ddp|aac|dts|remux|hybrid).*?\)?',
+        '', cleaned, flags=re.I,
+    )
+    return cleaned.strip()
+
+
+def _time(fn, arg, repeat=1) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> int:
+    failed = False
+    print(f"{'case':<22} {'parse (cold)':>14} {'parse (memo)':>14} {'legacy':>12}")
+    cases = [(n[:20], n) for n in REALISTIC] + list(ADVERSARIAL.items())
+    for label, name in cases:
+        parse_release.cache_clear()
+        cold = _time(parse_release, name)
+        warm = _time(parse_release, name, repeat=1000)
+        legacy = _time(legacy_clean_title, name)
+        flag = ""
+        if cold > MAX_SECONDS:
+            failed = True
+            flag = "  <-- too slow"
+        print(f"{label:<22} {cold * 1e6:>12.1f}us {warm * 1e6:>12.2f}us {legacy * 1e6:>10.1f}us{flag}")
+
+    for name, want in EXPECTED.items():
+        info = parse_release(name)
+        if (info.title, info.group) != want:
+            failed = True
+            print(f"{name!r}: got {(info.title, info.group)!r}, want {want!r}")
+
+    # a realistic queue re-parsed every tick
+    queue = REALISTIC * 200
+    parse_release.cache_clear()
+    start = time.perf_counter()
+    for _ in range(100):
+        for n in queue:
+            parse_release(n)
+    per_tick = (time.perf_counter() - start) / 100
+    start = time.perf_counter()
+    for n in queue:
+        legacy_clean_title(n)
+    legacy_tick = time.perf_counter() - start
+    print(f"\n{len(queue)}-torrent tick: parse {per_tick * 1e3:.2f}ms, legacy {legacy_tick * 1e3:.2f}ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
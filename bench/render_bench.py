@@ -0,0 +1,166 @@
+"""
+Streams board render benchmark on a 500-session Tautulli payload.
+
+    python -m bench.render_bench
+
+Compares the per-embed work the streams builder used to do on raw session
+dicts (a pytz lookup and clock format per embed, float()/int() conversions
+in the progress and ETA helpers) with parsing each session once into a
+StreamSession and sharing one RenderContext across the cycle. Discord
+embed construction is the same in both paths and is left out. Peak
+allocation for the model path includes the parsed session list, which
+the legacy path never built.
+"""
+import datetime
+import random
+import sys
+import time
+import tracemalloc
+
+import pytz
+
+from app.models import RenderContext, StreamSession
+
+SESSIONS = 500
+CYCLES = 20
+TZ = "Europe/Stockholm"
+
+
+def payload(n: int = SESSIONS) -> list[dict]:
+    rnd = random.Random(7)
+    out = []
+    for i in range(n):
+        episode = i % 3 != 0
+        duration = rnd.randint(20, 180) * 60_000
+        out.append({
+            "full_title": f"Show {i} - Episode {i % 20}" if episode else f"Movie {i}",
+            "title": f"Episode {i % 20}" if episode else f"Movie {i}",
+            "grandparent_title": f"Show {i}" if episode else "",
+            "summary": "A plot summary. " * rnd.randint(2, 40),
+            "friendly_name": f"user{i % 40}",
+            "state": rnd.choice(["playing", "paused", "buffering"]),
+            "media_type": "episode" if episode else "movie",
+            "year": str(rnd.randint(1970, 2024)),
+            "parent_media_index": str(rnd.randint(1, 9)),
+            "media_index": str(rnd.randint(1, 24)),
+            "duration": str(duration),
+            "view_offset": str(rnd.randint(0, duration)),
+            "progress_percent": str(rnd.randint(0, 100)),
+            "transcode_decision": rnd.choice(["transcode", "direct play", "copy"]),
+            "video_codec": rnd.choice(["h264", "hevc"]),
+            "video_resolution": rnd.choice(["1080", "4k", "720"]),
+            "video_dynamic_range": rnd.choice(["SDR", "HDR", ""]),
+            "bandwidth": str(rnd.randint(1000, 40000)),
+            "thumb": f"/library/metadata/{i}/thumb",
+        })
+    return out
+
+
+# --- the builder's previous per-embed helpers, on raw dicts ---------------
+
+def legacy_now_str(tz_name: str) -> str:
+    tz = pytz.timezone(tz_name)
+    now = datetime.datetime.now(tz)
+    suffix = "th" if 11 <= now.day <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(now.day % 10, 'th')
+    return now.strftime(f"%d{suffix} %B %H:%M")
+
+
+def legacy_progress_percent(sess: dict) -> int:
+    try:
+        total = int(float(sess.get("duration", 0) or 0))
+        viewed = int(float(sess.get("view_offset", 0) or 0))
+        if total > 0:
+            return max(0, min(100, int(round(viewed / total * 100))))
+    except Exception:
+        pass
+    try:
+        return int(round(float(sess.get("progress_percent", 0) or 0)))
+    except Exception:
+        return 0
+
+
+def legacy_eta_or_left(sess: dict, tz_name: str) -> tuple[str, str]:
+    def to_int(x, default=0):
+        try:
+            if x in (None, "", "None"): return default
+            return int(float(x))
+        except Exception:
+            return default
+    total_ms = to_int(sess.get("duration")) or to_int(sess.get("media_duration"))
+    viewed_ms = to_int(sess.get("view_offset"))
+    if viewed_ms <= 0 and total_ms > 0:
+        try:
+            viewed_ms = int(total_ms * (float(sess.get("progress_percent") or 0.0) / 100.0))
+        except Exception:
+            viewed_ms = 0
+    if total_ms <= 0:
+        return ("ETA" if str(sess.get("state", "")).lower() == "playing" else "Left", "—")
+    rem = max(0, (total_ms - viewed_ms) // 1000)
+    if str(sess.get("state", "")).lower() in ("playing", "buffering"):
+        tz = pytz.timezone(tz_name)
+        eta = datetime.datetime.now(tz) + datetime.timedelta(seconds=rem)
+        return ("ETA", eta.strftime("%H:%M %Z"))
+    if rem <= 0:
+        return ("Left", "0m left")
+    h, m = rem // 3600, (rem % 3600) // 60
+    return ("Left", f"{h}h {m}m left" if h else f"{m}m left")
+
+
+def legacy_cycle(raw: list[dict]) -> list:
+    out = []
+    for sess in raw:
+        user = sess.get("friendly_name") or "—"
+        status = f"{str(sess.get('state', '')).capitalize()} • {legacy_progress_percent(sess)}%"
+        lbl, val = legacy_eta_or_left(sess, TZ)
+        decision = (sess.get("transcode_decision") or "Direct Play").capitalize()
+        vcodec = (sess.get("video_codec") or "—").upper()
+        vres = sess.get("video_resolution") or ""
+        vdr = sess.get("video_dynamic_range") or ""
+        stream = f"{decision} ({vcodec} {vres}{' ' + vdr if vdr else ''})".strip()
+        out.append((sess.get("full_title") or "—", (sess.get("summary") or "")[:1000],
+                    user, status, stream, lbl, val, legacy_now_str(TZ)))
+    return out
+
+
+def model_cycle(raw: list[dict]) -> list:
+    ctx = RenderContext(TZ)
+    out = []
+    for sess in [StreamSession.from_tautulli(d) for d in raw]:
+        lbl, val = sess.eta_or_left(ctx)
+        out.append((sess.full_title or "—", sess.summary, sess.user,
+                    f"{sess.state.capitalize()} • {sess.progress}%", sess.stream, lbl, val, ctx.clock))
+    return out
+
+
+def measure(fn, raw) -> tuple[float, int]:
+    fn(raw)  # warm caches (pytz, lru)
+    start = time.perf_counter()
+    for _ in range(CYCLES):
+        fn(raw)
+    per_cycle = (time.perf_counter() - start) / CYCLES
+    tracemalloc.start()
+    fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_cycle, peak
+
+
+def main() -> int:
+    raw = payload()
+    legacy_t, legacy_mem = measure(legacy_cycle, raw)
+    model_t, model_mem = measure(model_cycle, raw)
+    print(f"{SESSIONS} sessions, mean of {CYCLES} cycles")
+    print(f"{'':<10} {'time/cycle':>12} {'peak alloc':>12}")
+    print(f"{'legacy':<10} {legacy_t * 1e3:>10.2f}ms {legacy_mem / 1024:>10.1f}KB")
+    print(f"{'models':<10} {model_t * 1e3:>10.2f}ms {model_mem / 1024:>10.1f}KB")
+    print(f"speedup {legacy_t / model_t:.1f}x")
+
+    # what a parsed session costs to keep around, slotted vs a dict of the same fields
+    sess = StreamSession.from_tautulli(raw[0])
+    as_dict = {k: getattr(sess, k) for k in StreamSession.__slots__}
+    print(f"parsed session record: {sys.getsizeof(sess)}B slotted, {sys.getsizeof(as_dict)}B as a dict")
+    return 0 if model_t < legacy_t else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+Replay a recorded cassette against BotManager, with no network, and fail
+if any board worker now makes more upstream or Discord calls per cycle.
+
+    MEDIABOT_RECORD=/data/cassette.jsonl   # on the production bot, for a while
+    python -m bench.replay /data/cassette.jsonl [--json report.json] [--no-alloc]
+
+Every board cycle in the cassette is re-run in recorded order, at the
+virtual time it was recorded (the activity model's clock), back to back.
+Tautulli, Radarr/Sonarr and qBittorrent are answered from the cassette;
+Discord is an in-memory fake that counts the REST calls the real client
+would make. Reported per worker: upstream and Discord calls per cycle as
+recorded and as replayed, the recorded cycle and upstream latency, the
+replayed cycle time and the memory it allocated. Replayed times include
+tracemalloc's overhead unless --no-alloc is given. Exit status 1 if a
+worker's replayed upstream or Discord calls exceed the recorded ones, if a
+cycle raises or logs more errors on replay than when recorded (a cycle
+that fails makes fewer calls), or if the code under test made calls the
+cassette cannot answer.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+from app import cassette
+from app.activity import ActivityModel
+from app.bot import BotManager
+from app.config import Settings
+from app.models import LibraryItem, Torrent
+from app.qbit import QbitClient
+
+_TYPES = {"Torrent": Torrent.from_qbit, "LibraryItem": LibraryItem.from_arr}
+UPSTREAM = ("tautulli", "arr", "qbit")
+
+
+def _decode(d: dict):
+    kind = d.pop("__type__", None)
+    return _TYPES[kind](d) if kind in _TYPES else d
+
+
+def load(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line, object_hook=_decode) for line in f if line.strip()]
+
+
+def _key(kind: str, op: str, args: dict) -> tuple:
+    return kind, op, json.dumps(args, sort_keys=True, default=str)
+
+
+class Player:
+    """
+    Answers upstream calls from the cassette. A call made during cycle N is
+    answered by the earliest unused recording of the same call in cycle N;
+    failing that (the code under test calls something cycle N did not) by
+    the latest recording made before cycle N started, else the first one.
+    Arguments that depend on local state (the history cursor) may differ
+    from the recording; such a call is answered by a recording of the same
+    op in cycle N. Recorded errors are raised as ConnectionError.
+    """
+
+    def __init__(self, entries: list[dict]):
+        self._calls: dict[tuple, list] = defaultdict(list)
+        self._ops: dict[tuple, list] = defaultdict(list)
+        self._cycle_pos: dict[int, int] = {}
+        for pos, e in enumerate(entries):
+            if e["type"] == "call" and e["kind"] != "discord":
+                rec = [pos, e["cycle"], e, False]
+                self._calls[_key(e["kind"], e["op"], e["args"])].append(rec)
+                self._ops[(e["kind"], e["op"])].append(rec)
+            elif e["type"] == "cycle":
+                self._cycle_pos[e["seq"]] = pos
+        # cycle seq -> kind -> calls made while replaying it
+        self.counts: dict[int, dict] = defaultdict(lambda: defaultdict(int))
+        self.misses: dict[tuple, int] = defaultdict(int)
+
+    def note(self, kind: str, op: str) -> None:
+        cur = cassette.current_cycle()
+        if cur is not None:
+            self.counts[cur[1]][kind] += 1
+
+    def serve(self, kind: str, op: str, args: dict, cur):
+        self.note(kind, op)
+        seq = cur[1] if cur else None
+        recorded = self._calls.get(_key(kind, op, args))
+        if not recorded:
+            recorded = [r for r in self._ops.get((kind, op), ()) if r[1] == seq]
+        if not recorded:
+            self.misses[(kind, op)] += 1
+            raise ConnectionError(f"{kind} {op} is not in the cassette")
+        hit = next((r for r in recorded if r[1] == seq and not r[3]), None)
+        if hit is not None:
+            hit[3] = True
+        else:
+            start = self._cycle_pos.get(seq, 0)
+            earlier = [r for r in recorded if r[0] < start]
+            hit = earlier[-1] if earlier else recorded[0]
+        entry = hit[2]
+        if "error" in entry:
+            raise ConnectionError(entry["error"])
+        return entry.get("result")
+
+
+class FakeMessage:
+    def __init__(self, player: Player, channel_id: int, message_id: int):
+        self._player = player
+        self.channel_id = channel_id
+        self.id = message_id
+
+    async def edit(self, **kwargs):
+        self._player.note("discord", "PATCH /channels/{channel_id}/messages/{message_id}")
+        return self
+
+    async def delete(self):
+        self._player.note("discord", "DELETE /channels/{channel_id}/messages/{message_id}")
+
+
+class FakeChannel:
+    def __init__(self, client: "FakeDiscord", channel_id: int):
+        self._client = client
+        self.id = channel_id
+
+    async def send(self, **kwargs):
+        self._client.player.note("discord", "POST /channels/{channel_id}/messages")
+        return FakeMessage(self._client.player, self.id, next(self._client.ids))
+
+    async def fetch_message(self, message_id: int):
+        self._client.player.note("discord", "GET /channels/{channel_id}/messages/{message_id}")
+        return FakeMessage(self._client.player, self.id, message_id)
+
+    async def edit(self, **kwargs):
+        self._client.player.note("discord", "PATCH /channels/{channel_id}")
+        return self
+
+
+class FakeDiscord:
+    """The parts of discord.Client the workers touch, counting what would be REST calls."""
+
+    user = None
+
+    def __init__(self, player: Player):
+        self.player = player
+        self.ids = itertools.count(1)
+        self._channels: dict[int, FakeChannel] = {}
+
+    def get_channel(self, channel_id: int) -> FakeChannel:
+        return self._channels.setdefault(channel_id, FakeChannel(self, channel_id))
+
+    def is_ready(self) -> bool:
+        return True
+
+    def is_closed(self) -> bool:
+        return False
+
+    async def close(self) -> None:
+        pass
+
+
+def _replay_settings(config: dict, workdir: str) -> Settings:
+    cfg = Settings(**config)
+    g = cfg.general
+    g.state_db = os.path.join(workdir, "state.db")
+    g.message_id_file = os.path.join(workdir, "message_ids.json")
+    # no thumbnail cache: its image downloads are not in the cassette
+    g.public_url = None
+    g.trace_memory = False
+    g.memory_budget_mb = None
+    # secrets were blanked when recording; the clients only need them to be set
+    if g.webhook_token == "":
+        # blanked, so it was set: activity was extrapolated between fetches
+        g.webhook_token = "replay"
+    if cfg.tautulli_url:
+        cfg.tautulli_api_key = "replay"
+    for server in cfg.tautulli_servers:
+        server.api_key = "replay"
+    if cfg.arr.radarr_host:
+        cfg.arr.radarr_api_key = "replay"
+    if cfg.arr.sonarr_host:
+        cfg.arr.sonarr_api_key = "replay"
+    if cfg.qbit.host:
+        cfg.qbit.username = cfg.qbit.password = "replay"
+    return cfg
+
+
+def _replay_qbit() -> QbitClient:
+    # QbitClient logs in from __init__; the replay one starts connected instead
+    q = QbitClient.__new__(QbitClient)
+    q.client = None
+    q.connected = True
+    q._backoff = 5
+    q._backoff_max = 300
+    q._next_try_at = 0.0
+    q._last_error = None
+    return q
+
+
+async def replay(entries: list[dict], player: Player, trace: bool) -> dict:
+    header = next((e for e in entries if e["type"] == "header"), None)
+    if header is None:
+        raise SystemExit("cassette has no header")
+    if header.get("version") != cassette.FORMAT_VERSION:
+        raise SystemExit(f"cassette format {header.get('version')}, expected {cassette.FORMAT_VERSION}")
+
+    workdir = tempfile.mkdtemp(prefix="replay-")
+    vt = [0.0]
+    bot = BotManager()
+    bot.cfg = _replay_settings(header["config"], workdir)
+    await bot._open_state()
+    bot._normalize(bot.cfg)
+    bot._activity = ActivityModel(clock=lambda: vt[0])
+    cassette.set_player(player)
+    bot._tautulli = bot._build_tautulli()
+    bot._posters = bot._build_posters(warm=True)
+    bot._qbit = _replay_qbit() if bot.cfg.qbit.host and bot.cfg.qbit.channel_id else None
+    bot.client = FakeDiscord(player)
+    workers = bot._wanted_workers()
+
+    results: dict[int, dict] = {}
+    skipped: dict[str, int] = defaultdict(int)
+    if trace:
+        tracemalloc.start()
+    try:
+        for e in entries:
+            if e["type"] == "event" and e["op"] == "activity_changed":
+                vt[0] = e["t"]
+                bot._activity.invalidate()
+            if e["type"] != "cycle":
+                continue
+            name = e["worker"]
+            if name not in workers:
+                skipped[name] += 1
+                continue
+            vt[0] = e["t"]
+            if trace:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            started = time.perf_counter()
+            with cassette.cycle(name, e["seq"]) as errors:
+                try:
+                    await workers[name][0]()
+                except Exception as exc:
+                    errors.append(f"{type(exc).__name__}: {exc}")
+            elapsed = time.perf_counter() - started
+            results[e["seq"]] = {
+                "worker": name,
+                "ms": elapsed * 1e3,
+                "alloc": tracemalloc.get_traced_memory()[1] - base if trace else None,
+                "errors": errors,
+            }
+    finally:
+        if trace:
+            tracemalloc.stop()
+        cassette.set_player(None)
+        if bot._tautulli is not None:
+            await bot._tautulli.close()
+        await bot._state.close()
+        await asyncio.to_thread(bot._history.close)
+    return {"cycles": results, "skipped": dict(skipped)}
+
+
+def _p(values: list, q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(entries: list[dict], player: Player, replayed: dict) -> dict:
+    recorded_calls: dict[int, dict] = defaultdict(lambda: defaultdict(int))
+    recorded_latency: dict[int, float] = defaultdict(float)
+    recorded_ms: dict[int, float] = {}
+    recorded_errors: dict[int, int] = {}
+    for e in entries:
+        if e["type"] == "call" and e["cycle"] is not None:
+            recorded_calls[e["cycle"]][e["kind"]] += 1
+            if e["kind"] in UPSTREAM:
+                recorded_latency[e["cycle"]] += e["ms"]
+        elif e["type"] == "cycle_end":
+            recorded_ms[e["seq"]] = e["ms"]
+            recorded_errors[e["seq"]] = len(e.get("errors") or ())
+
+    workers: dict[str, dict] = {}
+    for seq, r in replayed["cycles"].items():
+        w = workers.setdefault(r["worker"], {
+            "cycles": 0, "errors": 0, "new_errors": 0, "upstream_recorded": 0, "upstream_replayed": 0,
+            "discord_recorded": 0, "discord_replayed": 0, "recorded_ms": [], "upstream_ms": [],
+            "replay_ms": [], "alloc": [],
+        })
+        rec, rep = recorded_calls[seq], player.counts[seq]
+        w["cycles"] += 1
+        w["errors"] += bool(r["errors"])
+        w["new_errors"] += len(r["errors"]) > recorded_errors.get(seq, 0)
+        w["upstream_recorded"] += sum(rec[k] for k in UPSTREAM)
+        w["upstream_replayed"] += sum(rep[k] for k in UPSTREAM)
+        w["discord_recorded"] += rec["discord"]
+        w["discord_replayed"] += rep["discord"]
+        if seq in recorded_ms:
+            w["recorded_ms"].append(recorded_ms[seq])
+        w["upstream_ms"].append(recorded_latency[seq])
+        w["replay_ms"].append(r["ms"])
+        if r["alloc"] is not None:
+            w["alloc"].append(r["alloc"])
+
+    out = {}
+    for name, w in sorted(workers.items()):
+        n = w["cycles"]
+        out[name] = {
+            "cycles": n,
+            "errors": w["errors"],
+            "new_errors": w["new_errors"],
+            "upstream_per_cycle": {"recorded": w["upstream_recorded"] / n, "replayed": w["upstream_replayed"] / n},
+            "discord_per_cycle": {"recorded": w["discord_recorded"] / n, "replayed": w["discord_replayed"] / n},
+            "recorded_cycle_ms_p50": _p(w["recorded_ms"], 0.5),
+            "recorded_upstream_ms_per_cycle": sum(w["upstream_ms"]) / n,
+            "replay_ms_p50": _p(w["replay_ms"], 0.5),
+            "replay_ms_p95": _p(w["replay_ms"], 0.95),
+            "alloc_bytes_per_cycle": sum(w["alloc"]) / len(w["alloc"]) if w["alloc"] else None,
+            "regression": (w["upstream_replayed"] > w["upstream_recorded"]
+                           or w["discord_replayed"] > w["discord_recorded"]
+                           or w["new_errors"] > 0),
+        }
+    return {"workers": out, "skipped": replayed["skipped"],
+            "not_in_cassette": {f"{k} {op}": n for (k, op), n in player.misses.items()}}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cassette")
+    ap.add_argument("--json", help="also write the report here")
+    ap.add_argument("--no-alloc", action="store_true", help="skip tracemalloc for undistorted timings")
+    args = ap.parse_args()
+
+    entries = load(args.cassette)
+    player = Player(entries)
+    replayed = asyncio.run(replay(entries, player, trace=not args.no_alloc))
+    rep = report(entries, player, replayed)
+
+    print(f"{'worker':<14} {'cycles':>6} {'upstream/cycle':>16} {'discord/cycle':>15} "
+          f"{'rec ms':>8} {'upstr ms':>9} {'replay ms':>10} {'p95':>8} {'alloc KB':>9}")
+    for name, w in rep["workers"].items():
+        up, dc = w["upstream_per_cycle"], w["discord_per_cycle"]
+        alloc = f"{w['alloc_bytes_per_cycle'] / 1024:9.0f}" if w["alloc_bytes_per_cycle"] is not None else f"{'—':>9}"
+        rec_ms = f"{w['recorded_cycle_ms_p50']:8.1f}" if w["recorded_cycle_ms_p50"] is not None else f"{'—':>8}"
+        print(f"{name:<14} {w['cycles']:>6} {up['recorded']:>7.2f} → {up['replayed']:<6.2f} "
+              f"{dc['recorded']:>6.2f} → {dc['replayed']:<6.2f} {rec_ms} "
+              f"{w['recorded_upstream_ms_per_cycle']:9.1f} {w['replay_ms_p50']:10.2f} {w['replay_ms_p95']:8.2f} {alloc}"
+              + (f"  ({w['errors']} failed)" if w["errors"] else ""))
+    if rep["skipped"]:
+        print("not replayed (worker not enabled by the recorded config):",
+              ", ".join(f"{k} ×{n}" for k, n in rep["skipped"].items()))
+    if rep["not_in_cassette"]:
+        print("calls not in the cassette:", ", ".join(f"{k} ×{n}" for k, n in rep["not_in_cassette"].items()))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rep, f, indent=2)
+
+    regressed = [name for name, w in rep["workers"].items() if w["regression"]]
+    if regressed:
+        print(f"FAIL: more calls per cycle than recorded, or cycles failing that did not: {', '.join(regressed)}")
+    if rep["not_in_cassette"]:
+        print("FAIL: calls the cassette cannot answer")
+    return 1 if regressed or rep["not_in_cassette"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())